@@ -16,7 +16,7 @@ from dad_player.core.player_engine import PlayerEngine
 from dad_player.core.library_manager import LibraryManager
 from dad_player.core.image_utils import get_app_icon_path, get_placeholder_album_art_path
 
-from dad_player.constants import APP_NAME, APP_VERSION, CONFIG_KEY_LAST_VOLUME
+from dad_player.constants import APP_NAME, APP_VERSION, CONFIG_KEY_LAST_VOLUME, CONFIG_KEY_MUSIC_FOLDERS, SUPPORTED_AUDIO_EXTENSIONS
 
 class DadPlayerApp(App):
     def __init__(self, **kwargs):
@@ -36,8 +36,13 @@ class DadPlayerApp(App):
             self.player_engine = None
 
         self.library_manager = LibraryManager(settings_manager=self.settings_manager)
+        if self.player_engine:
+            self.library_manager.play_history.attach(self.player_engine)
         Logger.info("DadPlayerApp: LibraryManager initialized.")
         self.screen_manager = None # Will be set in build()
+        self._pending_dropped_paths = []
+        self._dropped_paths_trigger = Clock.create_trigger(self._process_dropped_paths, 0.2)
+        self._known_music_folders = list(self.settings_manager.get_music_folders())
 
         Logger.info(f"DadPlayerApp: Kivy User data directory is: {self.user_data_dir}")
 
@@ -141,49 +146,80 @@ class DadPlayerApp(App):
             Logger.critical("DadPlayerApp: Displaying error screen due to MainScreen load failure.")
 
         Window.bind(on_drop_file=self.handle_dropped_file_app)
+        # Any input counts as activity; idle database maintenance only runs while there is none
+        Window.bind(on_touch_down=self._on_user_activity, on_key_down=self._on_user_activity,
+                    mouse_pos=self._on_user_activity)
         Logger.info("DadPlayerApp: Build method finished successfully.")
         return self.screen_manager
 
     def handle_dropped_file_app(self, window_instance, file_path_bytes, x, y, *args):
-        Logger.info("DadPlayerApp: Entered handle_dropped_file_app")
+        # Kivy fires on_drop_file once per dropped item; collect them and handle the whole drop together.
         try:
-            file_path = file_path_bytes.decode('utf-8')
-            Logger.info(f"DadPlayerApp: File dropped: {file_path} at ({x}, {y})")
-
-            if not self.player_engine:
-                Logger.error("DadPlayerApp: PlayerEngine not available to play dropped file.")
-                return
-
-            supported_extensions = ('.mp3', '.wav', '.ogg', '.flac', '.m4a', '.aac')
-            if file_path.lower().endswith(supported_extensions):
-                Logger.info(f"DadPlayerApp: Attempting to load and play dropped file: {file_path}")
-                success = self.player_engine.load_media(file_path, play_immediately=True)
-                if success:
-                    self.switch_to_now_playing_tab()
-                else:
-                    Logger.error(f"DadPlayerApp: Failed to load dropped file: {file_path} via PlayerEngine.")
+            file_path = file_path_bytes.decode('utf-8') if isinstance(file_path_bytes, bytes) else str(file_path_bytes)
+        except UnicodeDecodeError as e:
+            Logger.error(f"DadPlayerApp: Could not decode dropped path: {e}")
+            return
+        Logger.info(f"DadPlayerApp: Path dropped: {file_path} at ({x}, {y})")
+        self._pending_dropped_paths.append(file_path)
+        self._dropped_paths_trigger()
+
+    def _process_dropped_paths(self, dt=None):
+        dropped_paths = self._pending_dropped_paths
+        self._pending_dropped_paths = []
+        if not dropped_paths:
+            return
+        if not self.player_engine:
+            Logger.error("DadPlayerApp: PlayerEngine not available to play dropped files.")
+            return
+
+        playable_paths = [p for p in dropped_paths if os.path.isdir(p) or p.lower().endswith(SUPPORTED_AUDIO_EXTENSIONS)]
+        if not playable_paths:
+            Logger.warning(f"DadPlayerApp: Dropped files are not recognized audio types or folders: {dropped_paths}")
+            return
+
+        Logger.info(f"DadPlayerApp: Importing {len(playable_paths)} dropped path(s) in the background.")
+        queue_state = {'started': False}
+
+        def on_tracks_ready(filepaths):
+            if not queue_state['started']:
+                # First playable file replaces the queue and starts playing right away
+                queue_state['started'] = True
+                self.player_engine.load_playlist(filepaths, play_index=0, clear_current=True)
+                self.switch_to_now_playing_tab()
             else:
-                Logger.warning(f"DadPlayerApp: Dropped file is not a recognized audio type: {file_path}")
+                self.player_engine.add_to_playlist(filepaths)
 
-        except Exception as e:
-            Logger.error(f"DadPlayerApp: Error processing dropped file: {e}", exc_info=True)
+        def on_import_done(message):
+            Logger.info(f"DadPlayerApp: Drop import finished: {message}")
+            if not queue_state['started']:
+                Logger.warning("DadPlayerApp: No playable audio files found in the dropped paths.")
+            self.refresh_library_view_if_current()
+
+        self.library_manager.import_dropped_paths(playable_paths, on_tracks_ready, on_done=on_import_done)
 
 
     def on_start(self):
         Logger.info(f"{APP_NAME} v{APP_VERSION} started.")
         Clock.schedule_once(self._initial_library_check, 1)
+        if self.library_manager:
+            self.library_manager.start_idle_maintenance()
+
+    def _on_user_activity(self, *args):
+        if self.library_manager:
+            self.library_manager.notify_user_activity()
+        return False # Observe only; let the event reach the widgets
 
     def _initial_library_check(self, dt=None):
         if self.library_manager and self.settings_manager:
             music_folders = self.settings_manager.get_music_folders()
             try:
-                artists = self.library_manager.get_all_artists()
+                library_has_tracks = self.library_manager.get_library_stats()["track_count"] > 0
             except AttributeError as e:
-                Logger.error(f"DadPlayerApp: LibraryManager missing get_all_artists method: {e}")
-                artists = []
+                Logger.error(f"DadPlayerApp: LibraryManager missing get_library_stats method: {e}")
+                library_has_tracks = False
             except Exception as e:
                 Logger.error(f"DadPlayerApp: Error checking library during initial check: {e}")
-                artists = []
+                library_has_tracks = False
 
             main_screen_instance = self.get_screen_instance('main_screen')
             if not main_screen_instance or isinstance(main_screen_instance, Screen) and main_screen_instance.name == 'error_screen':
@@ -191,7 +227,7 @@ class DadPlayerApp(App):
                  return
 
             if hasattr(main_screen_instance, 'set_initial_scan_prompt'):
-                if music_folders and not artists:
+                if music_folders and not library_has_tracks:
                     Logger.info("DadPlayerApp: Music folders are set but library appears empty. Suggesting scan.")
                     main_screen_instance.set_initial_scan_prompt("Library empty. Add folders and scan in Settings.")
                 elif not music_folders:
@@ -210,8 +246,36 @@ class DadPlayerApp(App):
             self.player_engine.shutdown()
         if self.library_manager and hasattr(self.library_manager, 'stop_scan_music_library'):
             self.library_manager.stop_scan_music_library()
+            self.library_manager.stop_imports()
+            self.library_manager.close()
         Logger.info(f"{APP_NAME} stopped.")
 
+    def on_config_change_custom(self, settings_manager, key, value):
+        """Called by SettingsManager.put whenever a setting is saved."""
+        if key == CONFIG_KEY_MUSIC_FOLDERS:
+            new_folders = list(value or [])
+            added = [folder for folder in new_folders if folder not in self._known_music_folders]
+            removed = [folder for folder in self._known_music_folders if folder not in new_folders]
+            self._known_music_folders = new_folders
+            for folder in removed if self.library_manager else []:
+                Logger.info(f"DadPlayerApp: Music folder removed: {folder}. Purging its tracks.")
+                self.library_manager.purge_music_root(folder, on_done=self._on_music_root_purged)
+            if self.library_manager:
+                # Folders whose tracks are already in the library (nested in another root, or
+                # restored from a snapshot) need no scan
+                added = [folder for folder in added if not self.library_manager.has_tracks_under(folder)]
+            if added and self.library_manager:
+                # Only walk the new folders; the rest of the library is unchanged
+                Logger.info(f"DadPlayerApp: Music folders added: {added}. Starting targeted scan.")
+                self.library_manager.start_scan_music_library(
+                    progress_callback=self.global_scan_progress_update,
+                    roots=added
+                )
+
+    def _on_music_root_purged(self, message):
+        Logger.info(f"DadPlayerApp: {message}")
+        self.refresh_library_view_if_current()
+
     def on_pause(self):
         return True
 
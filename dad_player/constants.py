@@ -7,6 +7,7 @@ APP_VERSION = "3.0.0 BETA Overhaul" # New version for the rewrite
 DATABASE_NAME = "dad_player_library.sqlite"
 SETTINGS_FILE = "dad_player_settings.json"
 ART_THUMBNAIL_DIR = "art_thumbnails" # Subdirectory within cache
+ART_CACHE_ORPHAN_GRACE_SECONDS = 3600 # Unreferenced art files younger than this may belong to a running scan
 
 # Supported audio file extensions
 SUPPORTED_AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.flac', '.m4a', '.aac', '.opus')
@@ -27,6 +28,9 @@ CONFIG_KEY_AUTOPLAY = "autoplay"
 CONFIG_KEY_SHUFFLE = "shuffle"
 CONFIG_KEY_REPEAT = "repeat_mode"
 CONFIG_KEY_LAST_VOLUME = "last_volume"
+CONFIG_KEY_SCAN_IN_SUBPROCESS = "scan_in_subprocess"
+CONFIG_KEY_ALBUM_SORT = "album_sort"
+CONFIG_KEY_DATABASE_PER_ROOT = "database_per_root"
 
 # Repeat Modes
 REPEAT_NONE = 0
@@ -42,3 +46,79 @@ REPEAT_MODES_TEXT = {
 DB_TRACKS_TABLE = "tracks"
 DB_ALBUMS_TABLE = "albums"
 DB_ARTISTS_TABLE = "artists"
+DB_SCAN_QUARANTINE_TABLE = "scan_quarantine" # Files that failed to parse, skipped until they change
+DB_PLAYLISTS_TABLE = "playlists"
+DB_PLAYLIST_TRACKS_TABLE = "playlist_tracks"
+DB_TRACK_STATS_TABLE = "track_stats" # Play/skip counts, e.g. imported from iTunes or Rhythmbox
+DB_TRACKS_FTS_TABLE = "tracks_fts" # FTS5 index over track title/artist/album/genre
+DB_ALBUM_SUMMARY_TABLE = "album_summary" # Per-album browse row, maintained by triggers
+DB_ALBUM_GENRES_TABLE = "album_genres" # Track count per (genre, album), maintained by triggers
+DB_LIBRARY_STATS_TABLE = "library_stats" # Single row of library totals, maintained by triggers
+DB_MAINTENANCE_LOG_TABLE = "db_maintenance_log" # One row per idle maintenance step
+DB_PLAY_HISTORY_TABLE = "play_history" # Append-only log of play/finish/skip events; rolled up into track_stats
+DB_SMART_PLAYLISTS_TABLE = "smart_playlists" # Rule-based playlists, rules stored as JSON
+DB_SMART_PLAYLIST_TRACKS_TABLE = "smart_playlist_tracks" # Materialized members, kept current from library changes
+DB_LIBRARY_SHARDS_TABLE = "library_shards" # Music roots with a database file of their own (see library_shards)
+DB_ALBUM_GENRE_SUMMARY_VIEW = "album_genre_summary" # View: album_summary row per (genre, album), for genre pages
+DB_BUSY_TIMEOUT = 10 # Seconds a writer waits for another writer's lock
+DB_MMAP_SIZE = 256 * 1024 * 1024 # Bytes of the database file read through memory mapping
+DB_CACHE_SIZE_KB = 32 * 1024 # Page cache per connection
+SQL_MAX_VARIABLES = 900 # Below SQLite's historic 999 host parameter limit
+
+# Scanner tuning
+TRACK_PATH_INDEX_MAX_ENTRIES = 500000 # Per-root in-memory path index cap (~100 bytes/track); beyond it lookups hit the DB
+PURGE_BATCH_SIZE = 500 # Tracks deleted per transaction when a music root is removed
+TRACK_CACHE_MAX_ENTRIES = 20000 # Track detail records kept by LibraryManager's LRU cache (~1 KB each)
+
+# Per-root databases (optional, see library_shards)
+LIBRARY_SHARD_DIR = "shards" # Subdirectory of the app data directory holding them
+LIBRARY_SHARD_ID_SPAN = 1 << 40 # Ids in root database n start at n * span, so they stay unique across the library
+LIBRARY_SHARD_LIMIT = 10 # SQLite attaches at most 10 databases to a connection by default
+
+# Idle database maintenance
+MAINTENANCE_IDLE_SECONDS = 120 # No input for this long before maintenance may start
+MAINTENANCE_CHECK_INTERVAL = 30 # Seconds between idle checks
+MAINTENANCE_STEP_SECONDS = 5 # Time box of one step; an unfinished step resumes in the next idle window
+MAINTENANCE_CONVERT_SECONDS = 60 # Time box of the one-off VACUUM that enables incremental vacuuming
+MAINTENANCE_CONVERT_MAX_BYTES = 512 * 1024 * 1024 # Larger databases are never converted; VACUUM would hold the write lock too long
+MAINTENANCE_CONVERT_ATTEMPTS = 3 # Conversions that timed out or failed before it is given up for good
+MAINTENANCE_VACUUM_PAGES = 256 # Free pages returned per incremental_vacuum call
+
+# Browsing
+BROWSE_PAGE_SIZE = 200 # Rows per page when LibraryView lazily loads artists/albums
+BROWSE_PREFETCH_SCROLL = 0.15 # Load the next page when scrolled within this fraction of the end
+SORT_IGNORED_ARTICLES = ("the", "a", "an") # Leading words skipped by artist/album sort keys
+SORT_KEY_NUMBER_WIDTH = 10 # Digits numbers are zero-padded to in sort keys, so 2 sorts before 10
+
+# Album sort orders
+ALBUM_SORT_NAME = "name"
+ALBUM_SORT_YEAR = "year"
+ALBUM_SORT_ADDED = "added" # Most recently added first
+ALBUM_SORT_ARTIST = "artist"
+ALBUM_SORT_TEXT = {
+    ALBUM_SORT_NAME: "Sort: Name",
+    ALBUM_SORT_YEAR: "Sort: Year",
+    ALBUM_SORT_ADDED: "Sort: Recently Added",
+    ALBUM_SORT_ARTIST: "Sort: Artist"
+}
+
+# Play history
+PLAY_HISTORY_BATCH_SIZE = 50 # Buffered playback events that trigger an immediate write
+PLAY_HISTORY_FLUSH_SECONDS = 60 # Longest a playback event waits in memory before being written
+PLAY_HISTORY_TOP_LIMIT = 100 # Default row count of the most/recently played and most skipped lists
+
+# Smart playlists
+SMART_PLAYLIST_CLOCK_REFRESH_SECONDS = 3600 # Rules like "not played in 30 days" drift with the clock; re-evaluate when older
+
+# Search
+SEARCH_RESULT_LIMIT = 200
+SEARCH_RANK_CANDIDATES = 2000 # Matches ranked per query (in rowid order); broader queries are ranked approximately
+SEARCH_DEBOUNCE_SECONDS = 0.25 # Typing pause before LibraryView runs a search
+
+# Library import (iTunes/Rhythmbox XML, M3U)
+IMPORT_EXTENSIONS = ('.xml', '.m3u', '.m3u8')
+IMPORT_BATCH_SIZE = 5000 # Entries resolved and written per transaction
+
+# Library snapshots
+SNAPSHOT_EXTENSION = ".dadlib"
+SNAPSHOT_FORMAT_VERSION = 1
@@ -0,0 +1,55 @@
+# dad_player/core/art_cache.py
+import hashlib
+import os
+import time
+from kivy.logger import Logger
+
+from dad_player.constants import DB_TRACKS_TABLE, DB_ALBUMS_TABLE, ART_CACHE_ORPHAN_GRACE_SECONDS
+
+
+def art_cache_key(image_bytes):
+    """Content key of a cached thumbnail; it changes whenever the picture does."""
+    return hashlib.md5(image_bytes).hexdigest()[:16]
+
+
+def reconcile_art_cache(conn, art_cache_dir, remove_orphans=True, schemas=("main",)):
+    """
+    Makes the albums' has_art flags agree with the art cache directory, from one directory listing
+    rather than a stat per album. Albums whose file has gone lose has_art, and one of their tracks
+    is marked for re-reading so the next scan extracts the art again. With remove_orphans, cached
+    files no album refers to are deleted once they are old enough not to belong to a running scan.
+    schemas are the attached databases holding albums (see library_shards); they share the cache.
+    Returns (albums_marked_missing, files_removed). The caller commits.
+    """
+    try:
+        cached_files = set(os.listdir(art_cache_dir))
+    except FileNotFoundError:
+        cached_files = set()
+    referenced, missing_count = set(), 0
+    for schema in schemas:
+        cursor = conn.execute(f"SELECT id, art_filename, has_art FROM {schema}.{DB_ALBUMS_TABLE} WHERE art_filename IS NOT NULL")
+        missing, present = [], []
+        for album_id, art_filename, has_art in cursor.fetchall():
+            referenced.add(art_filename)
+            if art_filename not in cached_files and has_art:
+                missing.append((album_id,))
+            elif art_filename in cached_files and not has_art:
+                present.append((album_id,))
+        conn.executemany(f"UPDATE {schema}.{DB_ALBUMS_TABLE} SET has_art = 0 WHERE id = ?", missing)
+        conn.executemany(f"UPDATE {schema}.{DB_ALBUMS_TABLE} SET has_art = 1 WHERE id = ?", present)
+        conn.executemany(f"""UPDATE {schema}.{DB_TRACKS_TABLE} SET last_modified = 0
+                             WHERE id = (SELECT MIN(id) FROM {schema}.{DB_TRACKS_TABLE} WHERE album_id = ?)""", missing)
+        missing_count += len(missing)
+
+    removed_files = 0
+    if remove_orphans:
+        cutoff = time.time() - ART_CACHE_ORPHAN_GRACE_SECONDS
+        for art_filename in cached_files - referenced:
+            art_path = os.path.join(art_cache_dir, art_filename)
+            try:
+                if os.path.getmtime(art_path) < cutoff:
+                    os.remove(art_path)
+                    removed_files += 1
+            except OSError as e:
+                Logger.warning(f"ArtCache: Could not remove orphaned art {art_filename}: {e}")
+    return missing_count, removed_files
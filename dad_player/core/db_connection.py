@@ -0,0 +1,77 @@
+# dad_player/core/db_connection.py
+import sqlite3
+import threading
+from kivy.logger import Logger
+
+from dad_player.constants import DB_BUSY_TIMEOUT, DB_CACHE_SIZE_KB, DB_MMAP_SIZE
+
+
+def connect(db_path):
+    """
+    Opens a library database connection with the shared pragmas applied. Every component that
+    touches the database (manager, scanner thread or process, importer) connects through here.
+    """
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    # Only takes effect on a new, empty database (and must precede journal_mode); lets idle
+    # maintenance give free pages back in small steps instead of a full VACUUM
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    # WAL is stored in the database file; readers no longer wait for a scan's commit and vice versa
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Safe with WAL: a power cut can lose the last commits but never corrupts the database
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}") # Negative means KiB rather than pages
+    return conn
+
+
+def close_connection(conn):
+    """Closes a connection, first letting SQLite refresh the statistics its query planner needs."""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        Logger.warning(f"DatabaseConnection: PRAGMA optimize failed: {e}")
+    conn.close()
+
+
+class DatabaseConnectionManager:
+    """
+    Keeps one persistent connection per thread instead of reconnecting for every query.
+    sqlite3 connections must stay on the thread that created them, so each thread gets its own.
+    prepare(conn), if given, runs on every new connection and again after invalidate().
+    """
+
+    def __init__(self, db_path, prepare=None):
+        self.db_path = db_path
+        self._prepare = prepare
+        self._generation = 0
+        self._local = threading.local()
+
+    def get_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+            self._local.generation = None
+            Logger.debug(f"DatabaseConnection: Opened connection for thread {threading.get_ident()}.")
+        # A connection in the middle of a transaction is prepared again on a later call
+        if self._prepare and self._local.generation != self._generation and not conn.in_transaction:
+            generation = self._generation
+            self._prepare(conn)
+            self._local.generation = generation
+        return conn
+
+    def invalidate(self):
+        """Makes every thread's connection run prepare(conn) again before its next use."""
+        self._generation += 1
+
+    def close_thread_connection(self):
+        """Closes the calling thread's connection. Worker threads call this before they exit."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        try:
+            close_connection(conn)
+        except sqlite3.Error as e:
+            Logger.error(f"DatabaseConnection: Error closing connection for thread {threading.get_ident()}: {e}")
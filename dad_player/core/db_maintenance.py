@@ -0,0 +1,298 @@
+# dad_player/core/db_maintenance.py
+import os
+import re
+import sqlite3
+import time
+from kivy.logger import Logger
+
+from dad_player.constants import (
+    DB_ARTISTS_TABLE, DB_TRACKS_TABLE, DB_ALBUM_SUMMARY_TABLE, DB_MAINTENANCE_LOG_TABLE,
+    MAINTENANCE_STEP_SECONDS, MAINTENANCE_CONVERT_SECONDS, MAINTENANCE_CONVERT_MAX_BYTES,
+    MAINTENANCE_CONVERT_ATTEMPTS, MAINTENANCE_VACUUM_PAGES
+)
+from .db_connection import connect, close_connection
+from .art_cache import reconcile_art_cache
+from .library_shards import attach_shards, detach_shards
+
+# Steps in the order they run, with how often each is due
+MAINTENANCE_STEP_INTERVALS = {
+    "optimize": 24 * 3600,
+    "analyze": 7 * 24 * 3600,
+    "incremental_vacuum": 24 * 3600,
+    "integrity_check": 7 * 24 * 3600,
+    "art_cache": 24 * 3600,
+}
+
+OUTCOME_DONE = "done"
+OUTCOME_PARTIAL = "partial"   # Hit its time box; picks up again in the next idle window
+OUTCOME_ABORTED = "aborted"   # The user became active
+OUTCOME_FAILED = "failed"
+
+# Prefix of the log details of an incremental_vacuum run that tried the one-off conversion
+_CONVERT_DETAILS = "auto_vacuum conversion"
+
+# Log details of an unfinished integrity_check: the last table it got through, then any problems so far
+_INTEGRITY_CURSOR = re.compile(r"^checked through (\S+)(?:; (.*))?$")
+
+# Typical browse reads, timed before and after each step to show whether maintenance paid off
+_BENCHMARK_QUERIES = (
+    f"SELECT * FROM {DB_ALBUM_SUMMARY_TABLE} ORDER BY sort_name, album_id LIMIT 200",
+    f"SELECT id, name FROM {DB_ARTISTS_TABLE} ORDER BY sort_name, id LIMIT 200",
+    f"""SELECT id, title FROM {DB_TRACKS_TABLE} WHERE album_id = (SELECT MAX(album_id) FROM {DB_ALBUM_SUMMARY_TABLE})
+        ORDER BY disc_number, track_number, title COLLATE NOCASE""",
+)
+
+
+def release_free_pages(conn, should_stop=None):
+    """
+    Gives the database's free pages back to the filesystem, MAINTENANCE_VACUUM_PAGES per transaction
+    so other writers are never held up for long. should_stop() is checked ahead of every batch and
+    ends the release early by returning true or by raising. Returns the number of pages freed, which
+    is always 0 unless the database uses auto_vacuum=INCREMENTAL.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    freed = 0
+    while True:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free_pages:
+            # The file only shrinks once the truncated pages are checkpointed out of the WAL
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            return freed
+        if should_stop and should_stop():
+            return freed
+        conn.execute(f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_PAGES})").fetchall()
+        conn.commit()
+        freed += min(free_pages, MAINTENANCE_VACUUM_PAGES)
+
+
+class _StepInterrupted(Exception):
+    def __init__(self, outcome, details=""):
+        super().__init__(outcome)
+        self.outcome = outcome
+        self.details = details # Logged with the outcome, e.g. where a resumable step got to
+
+
+class DatabaseMaintenance:
+    """
+    Runs ANALYZE, PRAGMA optimize, incremental vacuuming, PRAGMA integrity_check and the art cache
+    check on the library database, one time-boxed step at a time. A progress handler interrupts SQLite as soon as the
+    step's time box runs out or should_abort() turns true, so the app is never held up by it.
+    integrity_check is the exception to that: it checks one table at a time, stops between tables,
+    and the next run picks up after the last table it finished.
+    Every step is recorded in the maintenance log table with file size and query timings.
+    """
+
+    def __init__(self, db_path, should_abort, art_cache_dir=None, shards_dir=None):
+        self.db_path = db_path
+        self.should_abort = should_abort
+        self.art_cache_dir = art_cache_dir
+        self.shards_dir = shards_dir # Root databases whose albums share the art cache (see library_shards)
+        self._deadline = 0
+        self._interrupt_outcome = None
+        self._convert = False
+        self._skip_convert_reason = None
+        self._box_statements = True # False: the time box is only checked between statements
+
+    @staticmethod
+    def due_steps(conn, now=None, schema="main"):
+        """Steps whose last completed run is older than their interval, for the database attached as schema."""
+        now = now or time.time()
+        cursor = conn.execute(f"""SELECT step, MAX(started_at) FROM {schema}.{DB_MAINTENANCE_LOG_TABLE}
+                                  WHERE outcome = ? GROUP BY step""", (OUTCOME_DONE,))
+        last_done = {row[0]: row[1] for row in cursor.fetchall()}
+        return [step for step, interval in MAINTENANCE_STEP_INTERVALS.items()
+                if now - last_done.get(step, 0) >= interval]
+
+    def database_size(self):
+        """Size of the database file itself; the WAL is transient and gets reused in place."""
+        return os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+
+    def _progress_handler(self):
+        if self.should_abort():
+            self._interrupt_outcome = OUTCOME_ABORTED
+            return 1
+        if self._box_statements and time.monotonic() > self._deadline:
+            self._interrupt_outcome = OUTCOME_PARTIAL
+            return 1
+        return 0
+
+    def _check_time_box(self, details=""):
+        # Between statements, where the progress handler doesn't get a say
+        if self.should_abort():
+            raise _StepInterrupted(OUTCOME_ABORTED, details)
+        if time.monotonic() > self._deadline:
+            raise _StepInterrupted(OUTCOME_PARTIAL, details)
+
+    def _benchmark(self, conn):
+        """Milliseconds for the benchmark queries, or None if the user interrupted them."""
+        start_time = time.perf_counter()
+        try:
+            for query in _BENCHMARK_QUERIES:
+                conn.execute(query).fetchall()
+        except sqlite3.Error:
+            return None
+        return (time.perf_counter() - start_time) * 1000
+
+    def _conversion_blocked(self, conn, now=None):
+        """
+        Why the one-off conversion to auto_vacuum=INCREMENTAL must not run now, or None if it may.
+        The conversion is a full VACUUM that holds the write lock until it finishes, so it is skipped
+        for large databases, and after a timed out or failed attempt it waits twice as long each time
+        before giving up for good. Attempts the user interrupted don't count.
+        """
+        if self.database_size() > MAINTENANCE_CONVERT_MAX_BYTES:
+            return f"database larger than {MAINTENANCE_CONVERT_MAX_BYTES // (1024 * 1024)} MiB"
+        attempts, last_attempt = conn.execute(
+            f"""SELECT COUNT(*), MAX(started_at) FROM {DB_MAINTENANCE_LOG_TABLE}
+                WHERE step = 'incremental_vacuum' AND outcome IN (?, ?) AND details LIKE ?""",
+            (OUTCOME_PARTIAL, OUTCOME_FAILED, f"{_CONVERT_DETAILS}%")).fetchone()
+        if attempts >= MAINTENANCE_CONVERT_ATTEMPTS:
+            return f"gave up after {attempts} attempts"
+        if attempts and (now or time.time()) - last_attempt < MAINTENANCE_STEP_INTERVALS["incremental_vacuum"] * 2 ** attempts:
+            return f"backing off after {attempts} failed attempt{'s' if attempts > 1 else ''}"
+        return None
+
+    @staticmethod
+    def _format_ms(value):
+        return f"{value:.1f}" if value is not None else "?"
+
+    def run(self, steps):
+        """Runs the given steps in order, stopping at the first one that doesn't complete. Returns {step: outcome}."""
+        outcomes = {}
+        conn = connect(self.db_path)
+        try:
+            conn.set_progress_handler(self._progress_handler, 1000)
+            for step in steps:
+                if self.should_abort():
+                    break
+                outcome = self._run_step(conn, step)
+                outcomes[step] = outcome
+                if outcome != OUTCOME_DONE:
+                    break
+        finally:
+            conn.set_progress_handler(None, 0)
+            close_connection(conn)
+        return outcomes
+
+    def _run_step(self, conn, step):
+        time_limit = MAINTENANCE_STEP_SECONDS
+        self._convert = False
+        # integrity_check resumes table by table, so a table already started is allowed to finish
+        self._box_statements = step != "integrity_check"
+        if step == "incremental_vacuum" and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self._skip_convert_reason = self._conversion_blocked(conn)
+            self._convert = self._skip_convert_reason is None
+            if self._convert:
+                time_limit = MAINTENANCE_CONVERT_SECONDS # One-off full VACUUM, see _incremental_vacuum
+        started_at = time.time()
+        size_before = self.database_size()
+        self._deadline = float("inf") # Benchmarks are not part of the time box
+        query_ms_before = self._benchmark(conn)
+        self._interrupt_outcome = None
+        self._deadline = time.monotonic() + time_limit
+        start_time = time.perf_counter()
+        details = ""
+        try:
+            details = getattr(self, f"_{step}")(conn) or ""
+            outcome = OUTCOME_DONE
+        except _StepInterrupted as e:
+            outcome, details = e.outcome, e.details
+        except sqlite3.OperationalError as e:
+            if self._interrupt_outcome and "interrupt" in str(e):
+                outcome = self._interrupt_outcome
+            else:
+                outcome, details = OUTCOME_FAILED, str(e)
+        except sqlite3.Error as e:
+            outcome, details = OUTCOME_FAILED, str(e)
+        if conn.in_transaction:
+            conn.rollback()
+        if self._convert and outcome != OUTCOME_DONE:
+            # Recorded so _conversion_blocked can back off instead of retrying it every idle window
+            details = f"{_CONVERT_DETAILS} {outcome}{f': {details}' if details else ''}"
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        self._deadline = float("inf")
+        self._box_statements = True
+        query_ms_after = self._benchmark(conn)
+        size_after = self.database_size()
+
+        Logger.info(f"DatabaseMaintenance: {step} {outcome} in {duration_ms:.0f} ms; size {size_before / 1024:.0f} -> "
+                    f"{size_after / 1024:.0f} KiB; browse queries {self._format_ms(query_ms_before)} -> {self._format_ms(query_ms_after)} ms"
+                    f"{f'; {details}' if details else ''}")
+        try:
+            conn.execute(f"""INSERT INTO {DB_MAINTENANCE_LOG_TABLE}
+                             (started_at, step, outcome, duration_ms, size_before, size_after, query_ms_before, query_ms_after, details)
+                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                         (started_at, step, outcome, duration_ms, size_before, size_after, query_ms_before, query_ms_after, details))
+            conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"DatabaseMaintenance: Could not record {step}: {e}")
+        return outcome
+
+    # --- Steps ---
+    def _optimize(self, conn):
+        conn.execute("PRAGMA optimize")
+
+    def _analyze(self, conn):
+        # Sample at most ~1000 rows per index so this stays quick on huge libraries
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    def _incremental_vacuum(self, conn):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if not self._convert:
+                free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                return f"{free_pages} free pages; not converted to auto_vacuum=INCREMENTAL ({self._skip_convert_reason})"
+            # Databases created before incremental vacuuming was enabled need one full VACUUM to switch.
+            # It holds the write lock throughout, so scans and play history writes wait on it.
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+            return "converted to auto_vacuum=INCREMENTAL"
+        return f"{release_free_pages(conn, self._check_time_box)} pages freed"
+
+    def _integrity_check(self, conn):
+        # One table (with its indexes) per statement, in name order. A run that hits its time box or
+        # the user logs the last table it finished, and the next run carries on after it. The time box
+        # is only checked between tables and after the first, so every run gets at least one further.
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL%' ORDER BY name")]
+        last_run = conn.execute(f"""SELECT outcome, details FROM {DB_MAINTENANCE_LOG_TABLE}
+                                    WHERE step = 'integrity_check' ORDER BY started_at DESC LIMIT 1""").fetchone()
+        problems, details = [], ""
+        if last_run and last_run[0] != OUTCOME_DONE:
+            resume = _INTEGRITY_CURSOR.match(last_run[1] or "")
+            if resume:
+                tables = [table for table in tables if table > resume.group(1)]
+                problems = resume.group(2).split("; ") if resume.group(2) else []
+                details = last_run[1]
+        for index, table in enumerate(tables):
+            if index:
+                self._check_time_box(details)
+            try:
+                rows = conn.execute(f'PRAGMA integrity_check("{table}")').fetchall()
+            except sqlite3.OperationalError:
+                if self._interrupt_outcome:
+                    raise _StepInterrupted(self._interrupt_outcome, details)
+                raise
+            found = [row[0] for row in rows if row[0] != "ok"]
+            if found:
+                Logger.error(f"DatabaseMaintenance: integrity_check found problems in {table}: {found}")
+                problems.extend(found)
+            details = f"checked through {table}{'; ' + '; '.join(problems) if problems else ''}"
+        return "; ".join(problems) if problems else "ok"
+
+    def _art_cache(self, conn):
+        # Brings has_art back in line with the cache directory and deletes thumbnails nothing uses
+        if not self.art_cache_dir:
+            return "no art cache"
+        # Albums of every root database count, or their thumbnails would look orphaned
+        schemas = attach_shards(conn, self.shards_dir) if self.shards_dir else ["main"]
+        try:
+            missing, removed = reconcile_art_cache(conn, self.art_cache_dir, schemas=schemas)
+            conn.commit()
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            detach_shards(conn)
+        return f"{missing} albums lost their art, {removed} orphaned files removed"
@@ -0,0 +1,725 @@
+# dad_player/core/db_migrations.py
+import sqlite3
+import time
+from kivy.logger import Logger
+
+from dad_player.constants import (
+    DB_TRACKS_TABLE, DB_ALBUMS_TABLE, DB_ARTISTS_TABLE, DB_SCAN_QUARANTINE_TABLE,
+    DB_PLAYLISTS_TABLE, DB_PLAYLIST_TRACKS_TABLE, DB_TRACK_STATS_TABLE, DB_TRACKS_FTS_TABLE,
+    DB_ALBUM_SUMMARY_TABLE, DB_MAINTENANCE_LOG_TABLE, DB_PLAY_HISTORY_TABLE,
+    DB_SMART_PLAYLISTS_TABLE, DB_SMART_PLAYLIST_TRACKS_TABLE, DB_ALBUM_GENRES_TABLE, DB_LIBRARY_STATS_TABLE,
+    DB_LIBRARY_SHARDS_TABLE, DB_ALBUM_GENRE_SUMMARY_VIEW, ALBUM_ART_GRID_SIZE
+)
+from .sort_keys import sort_key
+
+# Schema versions are tracked in PRAGMA user_version. Each migration runs once, in its own
+# transaction, and bumps user_version in that same transaction. Append new migrations at the end;
+# never edit one that has shipped.
+
+
+def _column_names(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col_info['name'] for col_info in cursor.fetchall()]
+
+
+def _migration_1_baseline(cursor):
+    """Schema as it was before versioning. Idempotent, so it also adopts existing unversioned databases."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_ARTISTS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL COLLATE NOCASE
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_ALBUMS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL COLLATE NOCASE,
+            artist_id INTEGER,
+            art_filename TEXT,
+            year INTEGER,
+            UNIQUE(name, artist_id),
+            FOREIGN KEY (artist_id) REFERENCES {DB_ARTISTS_TABLE}(id) ON DELETE CASCADE 
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_TRACKS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filepath TEXT UNIQUE NOT NULL,
+            filehash TEXT,
+            title TEXT COLLATE NOCASE,
+            album_id INTEGER,
+            artist_id INTEGER,
+            track_number INTEGER,
+            disc_number INTEGER,
+            duration REAL,
+            genre TEXT COLLATE NOCASE,
+            year INTEGER,
+            last_modified REAL,
+            filesize INTEGER,
+            FOREIGN KEY (album_id) REFERENCES {DB_ALBUMS_TABLE}(id) ON DELETE SET NULL,
+            FOREIGN KEY (artist_id) REFERENCES {DB_ARTISTS_TABLE}(id) ON DELETE SET NULL
+        )
+    """)
+    # Negative cache of unparseable files
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_SCAN_QUARANTINE_TABLE} (
+            filepath TEXT PRIMARY KEY,
+            filesize INTEGER,
+            last_modified REAL,
+            error TEXT,
+            failed_at REAL
+        )
+    """)
+    # Playlists and play counts (filled by the library importer)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_PLAYLISTS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            source TEXT,
+            created_at REAL,
+            UNIQUE(name, source)
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_PLAYLIST_TRACKS_TABLE} (
+            playlist_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            track_id INTEGER NOT NULL,
+            PRIMARY KEY (playlist_id, position),
+            FOREIGN KEY (playlist_id) REFERENCES {DB_PLAYLISTS_TABLE}(id) ON DELETE CASCADE,
+            FOREIGN KEY (track_id) REFERENCES {DB_TRACKS_TABLE}(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_TRACK_STATS_TABLE} (
+            track_id INTEGER PRIMARY KEY,
+            play_count INTEGER NOT NULL DEFAULT 0,
+            skip_count INTEGER NOT NULL DEFAULT 0,
+            last_played REAL,
+            FOREIGN KEY (track_id) REFERENCES {DB_TRACKS_TABLE}(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_playlist_tracks_track_id ON {DB_PLAYLIST_TRACKS_TABLE}(track_id)")
+
+    # Columns added to tracks over time
+    column_names = _column_names(cursor, DB_TRACKS_TABLE)
+    if 'filehash' not in column_names:
+        Logger.info(f"DatabaseMigrations: Adding 'filehash' column to {DB_TRACKS_TABLE}.")
+        cursor.execute(f"ALTER TABLE {DB_TRACKS_TABLE} ADD COLUMN filehash TEXT")
+    if 'filesize' not in column_names:
+        Logger.info(f"DatabaseMigrations: Adding 'filesize' column to {DB_TRACKS_TABLE}.")
+        cursor.execute(f"ALTER TABLE {DB_TRACKS_TABLE} ADD COLUMN filesize INTEGER")
+
+
+def _migration_2_browse_indexes(cursor):
+    """
+    Indexes for the browse queries. The album/track ones match the queries' WHERE + ORDER BY, so
+    SQLite walks the index in order instead of scanning and sorting. They supersede the plain
+    foreign key indexes some databases got from earlier versions.
+    """
+    cursor.execute("DROP INDEX IF EXISTS idx_tracks_album_id")
+    cursor.execute("DROP INDEX IF EXISTS idx_albums_artist_id")
+    # get_tracks_by_album: WHERE album_id = ? ORDER BY disc_number, track_number, title
+    cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_tracks_album_order
+                       ON {DB_TRACKS_TABLE}(album_id, disc_number, track_number, title COLLATE NOCASE)""")
+    # Orphan cleanup and per-artist track lookups
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_tracks_artist_id ON {DB_TRACKS_TABLE}(artist_id)")
+    # get_albums_by_artist: WHERE artist_id = ? ORDER BY name
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_albums_artist_name ON {DB_ALBUMS_TABLE}(artist_id, name COLLATE NOCASE)")
+    # All-albums and all-artists listings are already ordered by the UNIQUE indexes on name
+
+
+def fts5_available(cursor):
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _migration_3_search_index(cursor):
+    """
+    Full-text index over title, artist, album and genre, keyed by track id. Triggers keep it in step
+    with every write to tracks (scans, dropped-file imports, purges). Skipped when this SQLite build
+    has no FTS5; LibraryManager.search() then falls back to LIKE.
+    """
+    if not fts5_available(cursor):
+        Logger.warning("DatabaseMigrations: SQLite has no FTS5 support; search will use slower LIKE matching.")
+        return
+    # remove_diacritics 2: "beyonce" matches "Beyoncé". prefix: 2/3 character prefix queries use their own index.
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {DB_TRACKS_FTS_TABLE} USING fts5(
+            title, artist, album, genre,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    # Title matches outrank artist, album and genre matches
+    cursor.execute(f"INSERT INTO {DB_TRACKS_FTS_TABLE}({DB_TRACKS_FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 5.0, 4.0, 1.0)')")
+    fts_row = f"""new.id, new.title,
+                  (SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id),
+                  (SELECT name FROM {DB_ALBUMS_TABLE} WHERE id = new.album_id),
+                  new.genre"""
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tracks_fts_insert AFTER INSERT ON {DB_TRACKS_TABLE} BEGIN
+            INSERT INTO {DB_TRACKS_FTS_TABLE}(rowid, title, artist, album, genre) VALUES ({fts_row});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tracks_fts_update AFTER UPDATE OF title, artist_id, album_id, genre ON {DB_TRACKS_TABLE} BEGIN
+            DELETE FROM {DB_TRACKS_FTS_TABLE} WHERE rowid = old.id;
+            INSERT INTO {DB_TRACKS_FTS_TABLE}(rowid, title, artist, album, genre) VALUES ({fts_row});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tracks_fts_delete AFTER DELETE ON {DB_TRACKS_TABLE} BEGIN
+            DELETE FROM {DB_TRACKS_FTS_TABLE} WHERE rowid = old.id;
+        END
+    """)
+    cursor.execute(f"""
+        INSERT INTO {DB_TRACKS_FTS_TABLE}(rowid, title, artist, album, genre)
+        SELECT t.id, t.title, ar.name, al.name, t.genre
+        FROM {DB_TRACKS_TABLE} t
+        LEFT JOIN {DB_ARTISTS_TABLE} ar ON t.artist_id = ar.id
+        LEFT JOIN {DB_ALBUMS_TABLE} al ON t.album_id = al.id
+    """)
+
+
+def _migration_4_album_name_index(cursor):
+    """
+    Keyset pages of all albums are ordered by (name, id). The UNIQUE(name, artist_id) index can't
+    give that order for albums sharing a name; an index on name alone can, as SQLite appends the rowid.
+    """
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_albums_name ON {DB_ALBUMS_TABLE}(name COLLATE NOCASE)")
+
+
+def _migration_5_album_summary(cursor):
+    """
+    One denormalised row per album with everything the album grid shows, so a grid page is a
+    single index range read. Triggers on albums, artists and tracks keep it current for every
+    writer (scanner, purge, drop imports), so nothing has to remember to refresh it.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_ALBUM_SUMMARY_TABLE} (
+            album_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL COLLATE NOCASE,
+            artist_id INTEGER,
+            artist_name TEXT,
+            year INTEGER,
+            art_filename TEXT,
+            track_count INTEGER NOT NULL DEFAULT 0,
+            total_duration REAL NOT NULL DEFAULT 0
+        )
+    """)
+    # Keyset pages: ORDER BY name, album_id (album_id is the rowid, so it is part of every index)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_album_summary_name ON {DB_ALBUM_SUMMARY_TABLE}(name COLLATE NOCASE)")
+    cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_album_summary_artist_name
+                       ON {DB_ALBUM_SUMMARY_TABLE}(artist_id, name COLLATE NOCASE)""")
+    # Superseded by idx_album_summary_name
+    cursor.execute("DROP INDEX IF EXISTS idx_albums_name")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_album_insert AFTER INSERT ON {DB_ALBUMS_TABLE} BEGIN
+            INSERT OR REPLACE INTO {DB_ALBUM_SUMMARY_TABLE}(album_id, name, artist_id, artist_name, year, art_filename)
+            VALUES (new.id, new.name, new.artist_id,
+                    (SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id), new.year, new.art_filename);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_album_update
+        AFTER UPDATE OF name, artist_id, year, art_filename ON {DB_ALBUMS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE}
+            SET name = new.name, artist_id = new.artist_id,
+                artist_name = (SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id),
+                year = new.year, art_filename = new.art_filename
+            WHERE album_id = new.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_album_delete AFTER DELETE ON {DB_ALBUMS_TABLE} BEGIN
+            DELETE FROM {DB_ALBUM_SUMMARY_TABLE} WHERE album_id = old.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_artist_update AFTER UPDATE OF name ON {DB_ARTISTS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE} SET artist_name = new.name WHERE artist_id = new.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_artist_delete AFTER DELETE ON {DB_ARTISTS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE} SET artist_name = NULL WHERE artist_id = old.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_track_insert AFTER INSERT ON {DB_TRACKS_TABLE}
+        WHEN new.album_id IS NOT NULL BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE}
+            SET track_count = track_count + 1, total_duration = total_duration + COALESCE(new.duration, 0)
+            WHERE album_id = new.album_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_track_update AFTER UPDATE OF album_id, duration ON {DB_TRACKS_TABLE}
+        WHEN old.album_id IS NOT new.album_id OR old.duration IS NOT new.duration BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE}
+            SET track_count = track_count - 1, total_duration = total_duration - COALESCE(old.duration, 0)
+            WHERE album_id = old.album_id;
+            UPDATE {DB_ALBUM_SUMMARY_TABLE}
+            SET track_count = track_count + 1, total_duration = total_duration + COALESCE(new.duration, 0)
+            WHERE album_id = new.album_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_summary_track_delete AFTER DELETE ON {DB_TRACKS_TABLE}
+        WHEN old.album_id IS NOT NULL BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE}
+            SET track_count = track_count - 1, total_duration = total_duration - COALESCE(old.duration, 0)
+            WHERE album_id = old.album_id;
+        END
+    """)
+
+    cursor.execute(f"DELETE FROM {DB_ALBUM_SUMMARY_TABLE}")
+    cursor.execute(f"""
+        INSERT INTO {DB_ALBUM_SUMMARY_TABLE}(album_id, name, artist_id, artist_name, year, art_filename, track_count, total_duration)
+        SELECT al.id, al.name, al.artist_id, ar.name, al.year, al.art_filename,
+               COUNT(t.id), COALESCE(SUM(t.duration), 0)
+        FROM {DB_ALBUMS_TABLE} al
+        LEFT JOIN {DB_ARTISTS_TABLE} ar ON al.artist_id = ar.id
+        LEFT JOIN {DB_TRACKS_TABLE} t ON t.album_id = al.id
+        GROUP BY al.id
+    """)
+
+
+def _migration_6_maintenance_log(cursor):
+    """History of idle maintenance steps; also tells the scheduler which steps are due."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_MAINTENANCE_LOG_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL NOT NULL,
+            step TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            duration_ms REAL,
+            size_before INTEGER,
+            size_after INTEGER,
+            query_ms_before REAL,
+            query_ms_after REAL,
+            details TEXT
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_maintenance_log_step ON {DB_MAINTENANCE_LOG_TABLE}(step, outcome, started_at)")
+
+
+
+def _migration_7_play_history(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_PLAY_HISTORY_TABLE} (
+            id INTEGER PRIMARY KEY,
+            track_id INTEGER NOT NULL,
+            event TEXT NOT NULL, -- 'start', 'finish' or 'skip'
+            played_at REAL NOT NULL,
+            position_ms INTEGER,
+            FOREIGN KEY (track_id) REFERENCES {DB_TRACKS_TABLE}(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_play_history_track ON {DB_PLAY_HISTORY_TABLE}(track_id, played_at)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_play_history_played_at ON {DB_PLAY_HISTORY_TABLE}(played_at)")
+    # History of a removed track goes with it, wherever the track is deleted from
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_play_history_track_delete AFTER DELETE ON {DB_TRACKS_TABLE}
+        BEGIN
+            DELETE FROM {DB_PLAY_HISTORY_TABLE} WHERE track_id = OLD.id;
+        END
+    """)
+    # Top-N lists read track_stats, never the history itself
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_track_stats_play_count ON {DB_TRACK_STATS_TABLE}(play_count DESC, last_played DESC)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_track_stats_skip_count ON {DB_TRACK_STATS_TABLE}(skip_count DESC, last_played DESC)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_track_stats_last_played ON {DB_TRACK_STATS_TABLE}(last_played DESC)")
+
+
+
+def _migration_8_smart_playlists(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_SMART_PLAYLISTS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL COLLATE NOCASE,
+            rules TEXT NOT NULL,
+            created_at REAL,
+            refreshed_at REAL
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_SMART_PLAYLIST_TRACKS_TABLE} (
+            playlist_id INTEGER NOT NULL,
+            track_id INTEGER NOT NULL,
+            PRIMARY KEY (playlist_id, track_id),
+            FOREIGN KEY (playlist_id) REFERENCES {DB_SMART_PLAYLISTS_TABLE}(id) ON DELETE CASCADE,
+            FOREIGN KEY (track_id) REFERENCES {DB_TRACKS_TABLE}(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_smart_playlist_tracks_track ON {DB_SMART_PLAYLIST_TRACKS_TABLE}(track_id)")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_smart_playlist_tracks_track_delete AFTER DELETE ON {DB_TRACKS_TABLE}
+        BEGIN
+            DELETE FROM {DB_SMART_PLAYLIST_TRACKS_TABLE} WHERE track_id = OLD.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_smart_playlist_tracks_playlist_delete AFTER DELETE ON {DB_SMART_PLAYLISTS_TABLE}
+        BEGIN
+            DELETE FROM {DB_SMART_PLAYLIST_TRACKS_TABLE} WHERE playlist_id = OLD.id;
+        END
+    """)
+
+
+
+def _migration_9_album_art_columns(cursor):
+    """
+    Art availability lives in the database (kept right by the scanner, the purge and the idle
+    art cache check), so browsing never has to stat thumbnail files.
+    """
+    if "has_art" not in _column_names(cursor, DB_ALBUMS_TABLE):
+        cursor.execute(f"ALTER TABLE {DB_ALBUMS_TABLE} ADD COLUMN has_art INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(f"ALTER TABLE {DB_ALBUMS_TABLE} ADD COLUMN art_key TEXT") # Content hash of the thumbnail
+        cursor.execute(f"ALTER TABLE {DB_ALBUMS_TABLE} ADD COLUMN art_sizes TEXT") # Comma-separated thumbnail sizes cached
+    if "has_art" not in _column_names(cursor, DB_ALBUM_SUMMARY_TABLE):
+        cursor.execute(f"ALTER TABLE {DB_ALBUM_SUMMARY_TABLE} ADD COLUMN has_art INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(f"ALTER TABLE {DB_ALBUM_SUMMARY_TABLE} ADD COLUMN art_key TEXT")
+
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_summary_album_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_summary_album_update")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_summary_album_insert AFTER INSERT ON {DB_ALBUMS_TABLE} BEGIN
+            INSERT OR REPLACE INTO {DB_ALBUM_SUMMARY_TABLE}(album_id, name, artist_id, artist_name, year, art_filename, has_art, art_key)
+            VALUES (new.id, new.name, new.artist_id,
+                    (SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id), new.year,
+                    new.art_filename, new.has_art, new.art_key);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_summary_album_update
+        AFTER UPDATE OF name, artist_id, year, art_filename, has_art, art_key ON {DB_ALBUMS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE}
+            SET name = new.name, artist_id = new.artist_id,
+                artist_name = (SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id),
+                year = new.year, art_filename = new.art_filename, has_art = new.has_art, art_key = new.art_key
+            WHERE album_id = new.id;
+        END
+    """)
+    # Until the first art cache check, trust that a recorded thumbnail exists
+    cursor.execute(f"""UPDATE {DB_ALBUMS_TABLE} SET has_art = 1, art_sizes = ?
+                       WHERE art_filename IS NOT NULL""", (str(ALBUM_ART_GRID_SIZE),))
+
+
+
+def _migration_10_genre_year_browse(cursor):
+    """
+    Genre, year and decade browsing. Years come from album_summary through a (year, name) index;
+    genres, which live on tracks, are rolled up per album into album_genres by triggers, so the
+    genre list and a genre's albums never scan tracks.
+    """
+    cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_album_summary_year
+                       ON {DB_ALBUM_SUMMARY_TABLE}(year, name COLLATE NOCASE)""")
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_ALBUM_GENRES_TABLE} (
+            genre TEXT NOT NULL COLLATE NOCASE,
+            album_id INTEGER NOT NULL,
+            track_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (genre, album_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_album_genres_album ON {DB_ALBUM_GENRES_TABLE}(album_id)")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_genres_track_insert AFTER INSERT ON {DB_TRACKS_TABLE}
+        WHEN new.album_id IS NOT NULL AND COALESCE(new.genre, '') != '' BEGIN
+            INSERT INTO {DB_ALBUM_GENRES_TABLE}(genre, album_id, track_count) VALUES (new.genre, new.album_id, 1)
+            ON CONFLICT(genre, album_id) DO UPDATE SET track_count = track_count + 1;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_genres_track_update AFTER UPDATE OF genre, album_id ON {DB_TRACKS_TABLE}
+        WHEN old.genre IS NOT new.genre OR old.album_id IS NOT new.album_id BEGIN
+            UPDATE {DB_ALBUM_GENRES_TABLE} SET track_count = track_count - 1
+            WHERE genre = old.genre AND album_id = old.album_id;
+            DELETE FROM {DB_ALBUM_GENRES_TABLE}
+            WHERE genre = old.genre AND album_id = old.album_id AND track_count <= 0;
+            INSERT INTO {DB_ALBUM_GENRES_TABLE}(genre, album_id, track_count)
+            SELECT new.genre, new.album_id, 1 WHERE new.album_id IS NOT NULL AND COALESCE(new.genre, '') != ''
+            ON CONFLICT(genre, album_id) DO UPDATE SET track_count = track_count + 1;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_genres_track_delete AFTER DELETE ON {DB_TRACKS_TABLE}
+        WHEN old.album_id IS NOT NULL AND COALESCE(old.genre, '') != '' BEGIN
+            UPDATE {DB_ALBUM_GENRES_TABLE} SET track_count = track_count - 1
+            WHERE genre = old.genre AND album_id = old.album_id;
+            DELETE FROM {DB_ALBUM_GENRES_TABLE}
+            WHERE genre = old.genre AND album_id = old.album_id AND track_count <= 0;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_genres_album_delete AFTER DELETE ON {DB_ALBUMS_TABLE} BEGIN
+            DELETE FROM {DB_ALBUM_GENRES_TABLE} WHERE album_id = old.id;
+        END
+    """)
+
+    cursor.execute(f"DELETE FROM {DB_ALBUM_GENRES_TABLE}")
+    cursor.execute(f"""
+        INSERT INTO {DB_ALBUM_GENRES_TABLE}(genre, album_id, track_count)
+        SELECT genre, album_id, COUNT(*) FROM {DB_TRACKS_TABLE}
+        WHERE album_id IS NOT NULL AND COALESCE(genre, '') != ''
+        GROUP BY genre, album_id
+    """)
+
+
+def _migration_11_library_stats(cursor):
+    """
+    Library totals in a single row, adjusted by triggers as tracks, albums and artists come and go,
+    so "is the library empty?" and the stats display are one primary-key read instead of COUNT(*)
+    scans. last_scan_at is set by the scanner when a scan completes.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_LIBRARY_STATS_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            track_count INTEGER NOT NULL DEFAULT 0,
+            album_count INTEGER NOT NULL DEFAULT 0,
+            artist_count INTEGER NOT NULL DEFAULT 0,
+            total_duration REAL NOT NULL DEFAULT 0,
+            last_scan_at REAL
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_library_stats_track_insert AFTER INSERT ON {DB_TRACKS_TABLE} BEGIN
+            UPDATE {DB_LIBRARY_STATS_TABLE} SET track_count = track_count + 1,
+                total_duration = total_duration + COALESCE(new.duration, 0) WHERE id = 1;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_library_stats_track_update AFTER UPDATE OF duration ON {DB_TRACKS_TABLE}
+        WHEN old.duration IS NOT new.duration BEGIN
+            UPDATE {DB_LIBRARY_STATS_TABLE}
+            SET total_duration = total_duration - COALESCE(old.duration, 0) + COALESCE(new.duration, 0) WHERE id = 1;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_library_stats_track_delete AFTER DELETE ON {DB_TRACKS_TABLE} BEGIN
+            UPDATE {DB_LIBRARY_STATS_TABLE} SET track_count = track_count - 1,
+                total_duration = total_duration - COALESCE(old.duration, 0) WHERE id = 1;
+        END
+    """)
+    for table, column in ((DB_ALBUMS_TABLE, "album_count"), (DB_ARTISTS_TABLE, "artist_count")):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_library_stats_{table}_insert AFTER INSERT ON {table} BEGIN
+                UPDATE {DB_LIBRARY_STATS_TABLE} SET {column} = {column} + 1 WHERE id = 1;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_library_stats_{table}_delete AFTER DELETE ON {table} BEGIN
+                UPDATE {DB_LIBRARY_STATS_TABLE} SET {column} = {column} - 1 WHERE id = 1;
+            END
+        """)
+
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO {DB_LIBRARY_STATS_TABLE} (id, track_count, album_count, artist_count, total_duration)
+        SELECT 1, (SELECT COUNT(*) FROM {DB_TRACKS_TABLE}), (SELECT COUNT(*) FROM {DB_ALBUMS_TABLE}),
+               (SELECT COUNT(*) FROM {DB_ARTISTS_TABLE}), (SELECT COALESCE(SUM(duration), 0) FROM {DB_TRACKS_TABLE})
+    """)
+
+
+def _migration_12_sort_keys(cursor):
+    """
+    Precomputed sort keys (see sort_keys.sort_key) for artists and albums, copied into
+    album_summary along with the album artist's, so every browse order is an index walk with no
+    collation at query time. The scanner fills them in as it creates artists and albums.
+    """
+    for table in (DB_ARTISTS_TABLE, DB_ALBUMS_TABLE):
+        if "sort_name" not in _column_names(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN sort_name TEXT NOT NULL DEFAULT ''")
+    if "sort_name" not in _column_names(cursor, DB_ALBUM_SUMMARY_TABLE):
+        cursor.execute(f"ALTER TABLE {DB_ALBUM_SUMMARY_TABLE} ADD COLUMN sort_name TEXT NOT NULL DEFAULT ''")
+        cursor.execute(f"ALTER TABLE {DB_ALBUM_SUMMARY_TABLE} ADD COLUMN artist_sort_name TEXT NOT NULL DEFAULT ''")
+
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_summary_album_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_summary_album_update")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_summary_artist_update")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_summary_artist_delete")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_summary_album_insert AFTER INSERT ON {DB_ALBUMS_TABLE} BEGIN
+            INSERT OR REPLACE INTO {DB_ALBUM_SUMMARY_TABLE}(album_id, name, artist_id, artist_name, year, art_filename,
+                                                          has_art, art_key, sort_name, artist_sort_name)
+            VALUES (new.id, new.name, new.artist_id,
+                    (SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id), new.year,
+                    new.art_filename, new.has_art, new.art_key, new.sort_name,
+                    COALESCE((SELECT sort_name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id), ''));
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_summary_album_update
+        AFTER UPDATE OF name, artist_id, year, art_filename, has_art, art_key, sort_name ON {DB_ALBUMS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE}
+            SET name = new.name, artist_id = new.artist_id,
+                artist_name = (SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id),
+                artist_sort_name = COALESCE((SELECT sort_name FROM {DB_ARTISTS_TABLE} WHERE id = new.artist_id), ''),
+                year = new.year, art_filename = new.art_filename, has_art = new.has_art, art_key = new.art_key,
+                sort_name = new.sort_name
+            WHERE album_id = new.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_summary_artist_update AFTER UPDATE OF name, sort_name ON {DB_ARTISTS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE} SET artist_name = new.name, artist_sort_name = new.sort_name
+            WHERE artist_id = new.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_summary_artist_delete AFTER DELETE ON {DB_ARTISTS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_SUMMARY_TABLE} SET artist_name = NULL, artist_sort_name = '' WHERE artist_id = old.id;
+        END
+    """)
+
+    # The album_summary triggers carry the keys over as the rows are updated
+    for table in (DB_ARTISTS_TABLE, DB_ALBUMS_TABLE):
+        cursor.execute(f"SELECT id, name FROM {table}")
+        cursor.executemany(f"UPDATE {table} SET sort_name = ? WHERE id = ?",
+                           [(sort_key(row['name']), row['id']) for row in cursor.fetchall()])
+
+    # Superseded by the sort key indexes below
+    cursor.execute("DROP INDEX IF EXISTS idx_album_summary_name")
+    cursor.execute("DROP INDEX IF EXISTS idx_album_summary_artist_name")
+    cursor.execute("DROP INDEX IF EXISTS idx_album_summary_year")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_artists_sort_name ON {DB_ARTISTS_TABLE}(sort_name)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_album_summary_sort_name ON {DB_ALBUM_SUMMARY_TABLE}(sort_name)")
+    cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_album_summary_artist_id_sort
+                       ON {DB_ALBUM_SUMMARY_TABLE}(artist_id, sort_name)""")
+    cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_album_summary_artist_sort
+                       ON {DB_ALBUM_SUMMARY_TABLE}(artist_sort_name, sort_name)""")
+    # Albums without a year sort after all dated ones; queries must use this exact expression
+    cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_album_summary_year_sort
+                       ON {DB_ALBUM_SUMMARY_TABLE}(COALESCE(year, 9999), sort_name)""")
+
+
+def _migration_13_genre_album_order(cursor):
+    """
+    Carries each album's sort key into album_genres, so a genre's albums are paged along
+    (genre, sort_name, album_id) without sorting. Year and decade filters work on the plain year
+    column through a (year, sort_name) index; the 9999 stand-in for a missing year is only part of
+    the year sort order, never of a filter.
+    """
+    if "sort_name" not in _column_names(cursor, DB_ALBUM_GENRES_TABLE):
+        cursor.execute(f"ALTER TABLE {DB_ALBUM_GENRES_TABLE} ADD COLUMN sort_name TEXT NOT NULL DEFAULT ''")
+    cursor.execute(f"""UPDATE {DB_ALBUM_GENRES_TABLE}
+                       SET sort_name = COALESCE((SELECT sort_name FROM {DB_ALBUMS_TABLE} WHERE id = album_id), '')""")
+    cursor.execute(f"""CREATE INDEX IF NOT EXISTS idx_album_genres_sort
+                       ON {DB_ALBUM_GENRES_TABLE}(genre, sort_name, album_id)""")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_album_summary_year ON {DB_ALBUM_SUMMARY_TABLE}(year, sort_name)")
+
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_genres_track_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_album_genres_track_update")
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_genres_track_insert AFTER INSERT ON {DB_TRACKS_TABLE}
+        WHEN new.album_id IS NOT NULL AND COALESCE(new.genre, '') != '' BEGIN
+            INSERT INTO {DB_ALBUM_GENRES_TABLE}(genre, album_id, track_count, sort_name)
+            VALUES (new.genre, new.album_id, 1,
+                    COALESCE((SELECT sort_name FROM {DB_ALBUMS_TABLE} WHERE id = new.album_id), ''))
+            ON CONFLICT(genre, album_id) DO UPDATE SET track_count = track_count + 1;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_album_genres_track_update AFTER UPDATE OF genre, album_id ON {DB_TRACKS_TABLE}
+        WHEN old.genre IS NOT new.genre OR old.album_id IS NOT new.album_id BEGIN
+            UPDATE {DB_ALBUM_GENRES_TABLE} SET track_count = track_count - 1
+            WHERE genre = old.genre AND album_id = old.album_id;
+            DELETE FROM {DB_ALBUM_GENRES_TABLE}
+            WHERE genre = old.genre AND album_id = old.album_id AND track_count <= 0;
+            INSERT INTO {DB_ALBUM_GENRES_TABLE}(genre, album_id, track_count, sort_name)
+            SELECT new.genre, new.album_id, 1,
+                   COALESCE((SELECT sort_name FROM {DB_ALBUMS_TABLE} WHERE id = new.album_id), '')
+            WHERE new.album_id IS NOT NULL AND COALESCE(new.genre, '') != ''
+            ON CONFLICT(genre, album_id) DO UPDATE SET track_count = track_count + 1;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_album_genres_album_sort AFTER UPDATE OF sort_name ON {DB_ALBUMS_TABLE} BEGIN
+            UPDATE {DB_ALBUM_GENRES_TABLE} SET sort_name = new.sort_name WHERE album_id = new.id;
+        END
+    """)
+
+
+def _migration_14_root_databases(cursor):
+    """
+    Registry of the music roots that have a database file of their own (see library_shards), and a
+    view joining album_genres to album_summary for genre pages. With root databases attached, a join
+    of two union views can't use their indexes, while a union of this view from every database can.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DB_LIBRARY_SHARDS_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            root TEXT UNIQUE NOT NULL,
+            created_at REAL
+        )
+    """)
+    # genre_album_id rather than s.album_id as tie-breaker, so the order comes from idx_album_genres_sort
+    cursor.execute(f"""
+        CREATE VIEW IF NOT EXISTS {DB_ALBUM_GENRE_SUMMARY_VIEW} AS
+        SELECT g.genre AS genre, g.sort_name AS genre_sort_name, g.album_id AS genre_album_id, s.*
+        FROM {DB_ALBUM_GENRES_TABLE} g JOIN {DB_ALBUM_SUMMARY_TABLE} s ON s.album_id = g.album_id
+    """)
+
+
+MIGRATIONS = [
+    (1, "baseline schema", _migration_1_baseline),
+    (2, "browse indexes", _migration_2_browse_indexes),
+    (3, "full-text search index", _migration_3_search_index),
+    (4, "album name index", _migration_4_album_name_index),
+    (5, "album summary table", _migration_5_album_summary),
+    (6, "maintenance log", _migration_6_maintenance_log),
+    (7, "play history", _migration_7_play_history),
+    (8, "smart playlists", _migration_8_smart_playlists),
+    (9, "album art columns", _migration_9_album_art_columns),
+    (10, "genre and year browse", _migration_10_genre_year_browse),
+    (11, "library statistics", _migration_11_library_stats),
+    (12, "sort keys", _migration_12_sort_keys),
+    (13, "genre album order", _migration_13_genre_album_order),
+    (14, "music root databases", _migration_14_root_databases),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Brings the database up to SCHEMA_VERSION. Returns True on success. A failed migration is rolled
+    back completely and later ones are not attempted, so the database stays at the last good version.
+    """
+    current_version = get_schema_version(conn)
+    if current_version > SCHEMA_VERSION:
+        Logger.warning(f"DatabaseMigrations: Database schema v{current_version} is newer than this app (v{SCHEMA_VERSION}).")
+        return True
+    for version, description, apply_migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        start_time = time.perf_counter()
+        cursor = conn.cursor()
+        try:
+            # IMMEDIATE takes the write lock up front, so a scanner process can't interleave
+            cursor.execute("BEGIN IMMEDIATE")
+            if get_schema_version(conn) >= version:
+                conn.rollback() # Another process migrated while we waited for the lock
+                continue
+            apply_migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            Logger.info(f"DatabaseMigrations: Applied migration {version} ({description}) in "
+                        f"{(time.perf_counter() - start_time) * 1000:.0f} ms.")
+        except sqlite3.Error as e:
+            conn.rollback()
+            Logger.error(f"DatabaseMigrations: Migration {version} ({description}) failed and was rolled back: {e}")
+            return False
+        finally:
+            cursor.close()
+    return True
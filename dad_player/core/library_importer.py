@@ -0,0 +1,319 @@
+# dad_player/core/library_importer.py
+import os
+import sqlite3
+import time
+import calendar
+import xml.etree.ElementTree as ET
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from kivy.logger import Logger
+
+from dad_player.constants import (
+    DB_TRACKS_TABLE, DB_PLAYLISTS_TABLE, DB_PLAYLIST_TRACKS_TABLE, DB_TRACK_STATS_TABLE,
+    IMPORT_BATCH_SIZE, SQL_MAX_VARIABLES
+)
+from .db_connection import connect, close_connection
+from .library_shards import attach_shards
+
+# Events produced by the parsers below and consumed by LibraryImporter:
+#   (IMPORT_TRACK, key, filepath, play_count, skip_count, last_played)
+#   (IMPORT_PLAYLIST_START, name)
+#   (IMPORT_PLAYLIST_ITEM, ref)  -- ref is a track key (iTunes) or a filepath
+#   (IMPORT_PLAYLIST_END,)
+IMPORT_TRACK = "track"
+IMPORT_PLAYLIST_START = "playlist_start"
+IMPORT_PLAYLIST_ITEM = "playlist_item"
+IMPORT_PLAYLIST_END = "playlist_end"
+
+
+def location_to_path(location):
+    """Converts a file:// URL (iTunes, Rhythmbox) to a local path, or None for remote entries."""
+    if not location:
+        return None
+    if not location.startswith("file:"):
+        return os.path.normpath(location)
+    parsed = urlparse(location)
+    if parsed.netloc not in ("", "localhost"):
+        return None
+    return os.path.normpath(url2pathname(parsed.path))
+
+
+def _plist_value(elem):
+    tag = elem.tag
+    if tag == "integer":
+        return int(elem.text or 0)
+    if tag == "true":
+        return True
+    if tag == "false":
+        return False
+    return elem.text
+
+
+def _plist_date(value):
+    try:
+        return calendar.timegm(time.strptime(value, "%Y-%m-%dT%H:%M:%SZ")) if value else None
+    except ValueError:
+        return None
+
+
+def parse_itunes_plist(fileobj):
+    """
+    Streams an iTunes "Library.xml" plist. Entries are detached from the tree as soon as they have
+    been read, so memory stays flat however large the export is.
+    """
+    # Nesting levels: 1 plist, 2 top dict, 3 "Tracks" dict / "Playlists" array, 4 one track or playlist,
+    # 5 its keys and values, 6 one "Playlist Items" dict, 7 its Track ID.
+    parents = []
+    section = None
+    field_key = None
+    entry = {}
+    playlist_started = False
+    for event, elem in ET.iterparse(fileobj, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        level = len(parents)
+        parents.pop()
+        if level == 3 and elem.tag == "key":
+            section = elem.text
+        elif section not in ("Tracks", "Playlists"):
+            pass
+        elif level == 5 and elem.tag == "key":
+            field_key = elem.text
+        elif level == 5 and elem.tag != "array":
+            entry[field_key] = _plist_value(elem)
+        elif level == 7 and elem.tag == "integer" and section == "Playlists":
+            if not playlist_started:
+                # Skip the built-in ones (Library, Music, Podcasts...) and smart playlists
+                if entry.get("Master") or entry.get("Distinguished Kind") or entry.get("Smart Info") or entry.get("_skip"):
+                    entry["_skip"] = True
+                    continue
+                playlist_started = True
+                yield (IMPORT_PLAYLIST_START, entry.get("Name") or "Imported Playlist")
+            yield (IMPORT_PLAYLIST_ITEM, int(elem.text or 0))
+        elif level == 4 and elem.tag == "dict":
+            if section == "Tracks":
+                yield (IMPORT_TRACK, entry.get("Track ID"), location_to_path(entry.get("Location")),
+                       entry.get("Play Count", 0), entry.get("Skip Count", 0), _plist_date(entry.get("Play Date UTC")))
+            elif playlist_started:
+                yield (IMPORT_PLAYLIST_END,)
+            entry = {}
+            playlist_started = False
+
+        if level in (4, 6):
+            parents[-1].remove(elem) # Parent holds at most this element and its key, so this is O(1)
+
+
+def parse_rhythmbox_xml(fileobj):
+    """Streams a Rhythmbox rhythmdb.xml (songs and play counts) or playlists.xml (static playlists)."""
+    root = None
+    for event, elem in ET.iterparse(fileobj, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == "entry":
+            if elem.get("type") == "song":
+                yield (IMPORT_TRACK, None, location_to_path(elem.findtext("location")),
+                       int(elem.findtext("play-count") or 0), int(elem.findtext("skip-count") or 0),
+                       float(elem.findtext("last-played") or 0) or None)
+            root.clear() # Entries are direct children of the root; drop the ones already read
+        elif elem.tag == "playlist":
+            if elem.get("type") == "static":
+                yield (IMPORT_PLAYLIST_START, elem.get("name") or "Imported Playlist")
+                for location in elem.iterfind("location"):
+                    yield (IMPORT_PLAYLIST_ITEM, location_to_path(location.text))
+                yield (IMPORT_PLAYLIST_END,)
+            root.clear()
+
+
+def parse_m3u(path):
+    """One playlist per M3U file. Relative entries are resolved against the playlist's folder."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    encoding = "utf-8" if path.lower().endswith(".m3u8") else "utf-8-sig"
+    yield (IMPORT_PLAYLIST_START, os.path.splitext(os.path.basename(path))[0])
+    with open(path, "r", encoding=encoding, errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            filepath = location_to_path(line) if line.startswith("file:") else os.path.normpath(os.path.join(base_dir, line))
+            yield (IMPORT_PLAYLIST_ITEM, filepath)
+    yield (IMPORT_PLAYLIST_END,)
+
+
+def _sniff_xml_root(path):
+    with open(path, "rb") as f:
+        for event, elem in ET.iterparse(f, events=("start",)):
+            return elem.tag
+    return None
+
+
+class LibraryImporter:
+    """
+    Imports playlists and play counts from iTunes/Rhythmbox XML exports and M3U playlists.
+    Entries are matched to library tracks by path in batches, and written with one transaction per
+    IMPORT_BATCH_SIZE entries. Files that are not in the library yet are counted, not added:
+    they need to be inside a music folder and scanned first.
+    progress(fraction, message) is called from the worker thread; should_continue() allows cancelling.
+    """
+
+    def __init__(self, db_path, progress=None, should_continue=None, shards_dir=None):
+        self.db_path = db_path
+        self.shards_dir = shards_dir # Tracks of roots with a database of their own are matched too (see library_shards)
+        self._progress = progress or (lambda fraction, message: None)
+        self._should_continue = should_continue or (lambda: True)
+        self._key_to_track_id = {} # iTunes Track ID -> library track id, for matched tracks only
+        self._pending_tracks = []
+        self._pending_items = []
+        self._playlist_id = None
+        self._playlist_position = 0
+        self.entries_read = 0
+        self.tracks_matched = 0
+        self.tracks_unmatched = 0
+        self.playlists_imported = 0
+        self.playlist_items_imported = 0
+
+    def _resolve_paths(self, cursor, filepaths):
+        """Returns {filepath: track_id} for the given paths that are in the library."""
+        resolved = {}
+        unique_paths = list({fp for fp in filepaths if fp})
+        for start in range(0, len(unique_paths), SQL_MAX_VARIABLES):
+            chunk = unique_paths[start:start + SQL_MAX_VARIABLES]
+            placeholders = ','.join('?' for _ in chunk)
+            cursor.execute(f"SELECT id, filepath FROM {DB_TRACKS_TABLE} WHERE filepath IN ({placeholders})", chunk)
+            resolved.update((row[1], row[0]) for row in cursor.fetchall())
+        return resolved
+
+    def _flush_tracks(self, cursor):
+        if not self._pending_tracks:
+            return
+        resolved = self._resolve_paths(cursor, [entry[2] for entry in self._pending_tracks])
+        stats_rows = []
+        for _, key, filepath, play_count, skip_count, last_played in self._pending_tracks:
+            track_id = resolved.get(filepath)
+            if track_id is None:
+                self.tracks_unmatched += 1
+                continue
+            self.tracks_matched += 1
+            if key is not None:
+                self._key_to_track_id[key] = track_id
+            if play_count or skip_count or last_played:
+                stats_rows.append((track_id, play_count or 0, skip_count or 0, last_played))
+        # Re-importing the same export must not double the counts, so keep the larger value
+        cursor.executemany(f"""
+            INSERT INTO {DB_TRACK_STATS_TABLE} (track_id, play_count, skip_count, last_played) VALUES (?, ?, ?, ?)
+            ON CONFLICT(track_id) DO UPDATE SET
+                play_count = MAX(play_count, excluded.play_count),
+                skip_count = MAX(skip_count, excluded.skip_count),
+                last_played = NULLIF(MAX(COALESCE(last_played, 0), COALESCE(excluded.last_played, 0)), 0)
+        """, stats_rows)
+        self._pending_tracks = []
+
+    def _flush_playlist_items(self, cursor):
+        if not self._pending_items or self._playlist_id is None:
+            self._pending_items = []
+            return
+        self._flush_tracks(cursor) # iTunes item keys refer to tracks that may still be pending
+        path_refs = [ref for ref in self._pending_items if isinstance(ref, str)]
+        resolved = self._resolve_paths(cursor, path_refs) if path_refs else {}
+        rows = []
+        for ref in self._pending_items:
+            track_id = resolved.get(ref) if isinstance(ref, str) else self._key_to_track_id.get(ref)
+            if track_id is not None:
+                rows.append((self._playlist_id, self._playlist_position, track_id))
+                self._playlist_position += 1
+        cursor.executemany(f"INSERT INTO {DB_PLAYLIST_TRACKS_TABLE} (playlist_id, position, track_id) VALUES (?, ?, ?)", rows)
+        self.playlist_items_imported += len(rows)
+        self._pending_items = []
+
+    def _start_playlist(self, cursor, name, source):
+        # Importing the same playlist again replaces its contents
+        cursor.execute(f"SELECT id FROM {DB_PLAYLISTS_TABLE} WHERE name = ? AND source = ?", (name, source))
+        row = cursor.fetchone()
+        if row:
+            self._playlist_id = row[0]
+            cursor.execute(f"DELETE FROM {DB_PLAYLIST_TRACKS_TABLE} WHERE playlist_id = ?", (self._playlist_id,))
+        else:
+            cursor.execute(f"INSERT INTO {DB_PLAYLISTS_TABLE} (name, source, created_at) VALUES (?, ?, ?)", (name, source, time.time()))
+            self._playlist_id = cursor.lastrowid
+        self._playlist_position = 0
+        self.playlists_imported += 1
+
+    def _iter_sources(self, path):
+        """Yields (source_name, event_iterator, file_for_progress_or_None) for an export file or a folder of M3U files."""
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith((".m3u", ".m3u8")):
+                        m3u_path = os.path.join(dirpath, filename)
+                        yield "m3u", parse_m3u(m3u_path), None
+            return
+        if path.lower().endswith((".m3u", ".m3u8")):
+            yield "m3u", parse_m3u(path), None
+            return
+        root_tag = _sniff_xml_root(path)
+        with open(path, "rb") as f:
+            if root_tag == "plist":
+                yield "itunes", parse_itunes_plist(f), f
+            elif root_tag in ("rhythmdb", "rhythmdb-playlists"):
+                yield "rhythmbox", parse_rhythmbox_xml(f), f
+            else:
+                raise ValueError(f"Unrecognized library export (root element <{root_tag}>).")
+
+    def run(self, path):
+        """Imports path and returns a summary message. Raises on unreadable input or database errors."""
+        start_time = time.perf_counter()
+        total_bytes = os.path.getsize(path) if os.path.isfile(path) else 0
+        conn = connect(self.db_path)
+        if self.shards_dir:
+            attach_shards(conn, self.shards_dir)
+        cursor = conn.cursor()
+        cancelled = False
+        try:
+            for source, events, progress_file in self._iter_sources(path):
+                for event in events:
+                    kind = event[0]
+                    if kind == IMPORT_TRACK:
+                        self._pending_tracks.append(event)
+                        self.entries_read += 1
+                    elif kind == IMPORT_PLAYLIST_ITEM:
+                        self._pending_items.append(event[1])
+                        self.entries_read += 1
+                    elif kind == IMPORT_PLAYLIST_START:
+                        self._flush_playlist_items(cursor)
+                        self._start_playlist(cursor, event[1], source)
+                    elif kind == IMPORT_PLAYLIST_END:
+                        self._flush_playlist_items(cursor)
+                        self._playlist_id = None
+
+                    if len(self._pending_tracks) >= IMPORT_BATCH_SIZE or len(self._pending_items) >= IMPORT_BATCH_SIZE:
+                        self._flush_tracks(cursor)
+                        self._flush_playlist_items(cursor)
+                        conn.commit()
+                        elapsed = time.perf_counter() - start_time
+                        fraction = progress_file.tell() / total_bytes if progress_file and total_bytes else 0.0
+                        self._progress(min(fraction, 0.99), f"Importing... {self.entries_read} entries "
+                                                            f"({self.entries_read / elapsed if elapsed else 0:.0f}/s)")
+                        if not self._should_continue():
+                            cancelled = True
+                            break
+                if cancelled:
+                    break
+            self._flush_tracks(cursor)
+            self._flush_playlist_items(cursor)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            close_connection(conn)
+
+        elapsed = time.perf_counter() - start_time
+        message = (f"{'Import cancelled' if cancelled else 'Import complete'}: {self.entries_read} entries in {elapsed:.1f} s "
+                   f"({self.entries_read / elapsed if elapsed else 0:.0f}/s). Matched {self.tracks_matched}, "
+                   f"not in library {self.tracks_unmatched}. {self.playlists_imported} playlists, "
+                   f"{self.playlist_items_imported} playlist entries.")
+        Logger.info(f"LibraryImporter: {message}")
+        return message
@@ -1,31 +1,74 @@
 import sqlite3
 import os
+import json
+import re
 import threading
-import time 
+import time
+import zipfile
+import multiprocessing
 from kivy.logger import Logger
 from kivy.clock import Clock
-from kivy.app import App 
 from kivy.properties import BooleanProperty, StringProperty 
 from kivy.event import EventDispatcher
 from pathlib import Path 
 
-import mutagen
-import hashlib
-
 from dad_player.constants import (
-    DATABASE_NAME, SUPPORTED_AUDIO_EXTENSIONS, ART_THUMBNAIL_DIR,
-    ALBUM_ART_GRID_SIZE, DB_TRACKS_TABLE, DB_ALBUMS_TABLE, DB_ARTISTS_TABLE
+    DATABASE_NAME, ART_THUMBNAIL_DIR, DB_TRACKS_TABLE, DB_ALBUMS_TABLE, DB_ARTISTS_TABLE,
+    DB_SCAN_QUARANTINE_TABLE, DB_PLAYLIST_TRACKS_TABLE, DB_TRACK_STATS_TABLE, DB_TRACKS_FTS_TABLE,
+    DB_ALBUM_SUMMARY_TABLE, DB_ALBUM_GENRES_TABLE, DB_LIBRARY_STATS_TABLE, DB_PLAY_HISTORY_TABLE,
+    DB_SMART_PLAYLISTS_TABLE, DB_SMART_PLAYLIST_TRACKS_TABLE,
+    PURGE_BATCH_SIZE, SEARCH_RESULT_LIMIT, SEARCH_RANK_CANDIDATES, BROWSE_PAGE_SIZE, SQL_MAX_VARIABLES,
+    MAINTENANCE_IDLE_SECONDS, MAINTENANCE_CHECK_INTERVAL, PLAY_HISTORY_TOP_LIMIT,
+    SMART_PLAYLIST_CLOCK_REFRESH_SECONDS,
+    ALBUM_SORT_NAME, ALBUM_SORT_YEAR, ALBUM_SORT_ADDED, ALBUM_SORT_ARTIST,
+    DB_ALBUM_GENRE_SUMMARY_VIEW, LIBRARY_SHARD_DIR
+)
+from .track_path_index import path_prefix_bounds
+from .track_cache import TrackMetadataCache
+from .query_worker import QueryWorker
+from .play_history import PlayHistoryRecorder, PLAY_EVENT_FINISH, PLAY_EVENT_SKIP
+from .smart_playlists import compile_rules, refresh_members, SmartPlaylistError, smart_playlist_joins
+from .library_importer import LibraryImporter
+from .library_snapshot import export_snapshot, import_snapshot, SnapshotError
+from .db_connection import DatabaseConnectionManager, connect, close_connection
+from .library_shards import (
+    get_shards, create_shard, drop_shard, attach_shards, migrate_shards, remove_unregistered_shards, library_schemas,
+    forget_shard_tracks, owning_root, shard_path, shard_schema
+)
+from .db_migrations import migrate, get_schema_version
+from .db_maintenance import DatabaseMaintenance, release_free_pages
+from .library_scanner import (
+    LibraryScanner, run_scanner_process,
+    SCAN_MSG_STATUS, SCAN_MSG_PROGRESS, SCAN_MSG_CHANGES, SCAN_MSG_DONE, SCAN_MSG_TRACKS_READY
 )
-from dad_player.utils import generate_file_hash, sanitize_filename_for_cache
-from .image_utils import resize_image_data 
 
-try:
-    from PIL import Image as PILImage
-except ImportError:
-    PILImage = None
+# Names of a track t's artist and album. Correlated subqueries rather than LEFT JOINs: with root
+# databases attached (see library_shards) artists and albums are union views, which SQLite reads
+# whole on the inner side of a join but probes by id here
+_ARTIST_NAME = f"(SELECT name FROM {DB_ARTISTS_TABLE} WHERE id = t.artist_id)"
+_ALBUM_NAME = f"(SELECT name FROM {DB_ALBUMS_TABLE} WHERE id = t.album_id)"
+
+# An album's tracks in playing order; served by idx_tracks_album_order
+_ALBUM_TRACKS_QUERY = f"""
+    SELECT t.id, t.filepath, t.title, t.track_number, t.disc_number, t.duration, {_ARTIST_NAME} as artist_name
+    FROM {DB_TRACKS_TABLE} t
+    WHERE t.album_id = ?
+    ORDER BY t.disc_number, t.track_number, t.title COLLATE NOCASE
+"""
+
+# Album browse orders: sort key expressions over album_summary s and whether they run descending.
+# Each is an album_summary index (or the rowid) followed by album_id, the rowid, as tie-breaker.
+_ALBUM_SORTS = {
+    ALBUM_SORT_NAME: (("s.sort_name", "s.album_id"), False),
+    ALBUM_SORT_YEAR: (("COALESCE(s.year, 9999)", "s.sort_name", "s.album_id"), False), # idx_album_summary_year_sort
+    ALBUM_SORT_ARTIST: (("s.artist_sort_name", "s.sort_name", "s.album_id"), False),
+    ALBUM_SORT_ADDED: (("s.album_id",), True), # Ids are AUTOINCREMENT, so newest albums have the highest
+}
 
 
 class LibraryManager(EventDispatcher):
+    __events__ = ('on_library_changed',)
+
     is_scanning = BooleanProperty(False)
     scan_progress_message = StringProperty("")
 
@@ -36,6 +79,11 @@ class LibraryManager(EventDispatcher):
         self.app_data_base_path = Path.home() / '.dad_player'
         os.makedirs(self.app_data_base_path, exist_ok=True)
         self.db_path = self.app_data_base_path / DATABASE_NAME
+        self.shards_dir = self.app_data_base_path / LIBRARY_SHARD_DIR # Music roots' own databases (see library_shards)
+        self._db = DatabaseConnectionManager(self.db_path, prepare=lambda conn: attach_shards(conn, self.shards_dir))
+        self._track_cache = TrackMetadataCache()
+        self._query_worker = QueryWorker("LibraryQueryWorker", on_thread_exit=self._db.close_thread_connection)
+        self.play_history = PlayHistoryRecorder(self) # Attached to the PlayerEngine by the app
         
         self.art_cache_dir = self.app_data_base_path / "cache" / ART_THUMBNAIL_DIR
         os.makedirs(self.art_cache_dir, exist_ok=True)
@@ -43,430 +91,229 @@ class LibraryManager(EventDispatcher):
         self._initialize_db() 
         
         self._scan_thread = None
+        self._scan_process = None
+        self._scan_cancel_event = None
+        self._import_stop_flags = set()
+        self._queued_scan_roots = []
+        self._queued_scan_callback = None
+        self._import_export_thread = None
+        self._search_lock = threading.Lock()
+        self._search_wakeup = threading.Event()
+        self._search_request = None # (generation, query, limit, callback) of the latest search_async call
+        self._search_generation = 0
+        self._search_thread = None
+        self._search_conn = None # The search worker's connection, so a stale query can be interrupted
+        self._last_user_activity = time.monotonic()
+        self._maintenance_abort = threading.Event()
+        self._maintenance_thread = None
+        self._maintenance_check_event = None
         self._progress_callback = None 
         self._total_files_to_scan = 0
         self._files_scanned_so_far = 0
         Logger.info(f"LibraryManager: Initialized. DB at: {self.db_path}")
 
+    def on_library_changed(self, changes):
+        Logger.debug(f"Event: on_library_changed, added {len(changes.get('added', []))}, updated {len(changes.get('updated', []))}, removed {len(changes.get('removed', []))}"
+                     f"{', full reload' if changes.get('reload') else ''}")
+
+    def _dispatch_library_changed(self, changes):
+        # Invalidate first: bound handlers run before the default handler and may re-read tracks
+        if changes.get('reload'): # The whole library was replaced; no cached id or path is valid
+            self._track_cache.clear()
+        else:
+            self._track_cache.invalidate_changes(changes)
+        changed_track_ids = list(changes.get('added', ())) + list(changes.get('updated', ()))
+        if changed_track_ids: # Removed tracks leave smart playlists through a delete trigger
+            self.query_async(self._refresh_smart_playlists, changed_track_ids)
+        self.dispatch('on_library_changed', changes)
+
+    def get_track_cache_stats(self):
+        """Hit/miss counters of the track metadata cache (see TrackMetadataCache.stats)."""
+        return self._track_cache.stats()
+
     def _get_db_connection(self):
+        """Returns this thread's persistent connection (see DatabaseConnectionManager)."""
         thread_id = threading.get_ident()
         try:
-            conn = sqlite3.connect(self.db_path, timeout=10) 
-            conn.row_factory = sqlite3.Row 
-            return conn
+            return self._db.get_connection()
         except sqlite3.Error as e:
             Logger.error(f"LibraryManager: Database connection error for thread {thread_id}: {e}")
             return None
 
     def _close_db_connection(self, conn, caller_info="Unknown"):
-        if conn:
-            thread_id = threading.get_ident()
+        # Connections are kept open per thread; only make sure the caller didn't leave a transaction behind
+        if conn and conn.in_transaction:
+            Logger.warning(f"LibraryManager: {caller_info} left a transaction open in thread {threading.get_ident()}; rolling back.")
             try:
-                conn.close()
+                conn.rollback()
             except sqlite3.Error as e:
-                Logger.error(f"LibraryManager: Error closing DB connection from {caller_info} in thread {thread_id}: {e}")
+                Logger.error(f"LibraryManager: Error rolling back for {caller_info}: {e}")
+
+    def close(self):
+        """Closes the calling thread's database connection. Called by the app on shutdown."""
+        self.stop_idle_maintenance()
+        # The query thread must be done before the final flush, which also writes the play history
+        # batches that thread had queued but not committed
+        self._query_worker.stop(wait=True)
+        self.play_history.flush(sync=True)
+        self._db.close_thread_connection()
+
+    def query_async(self, fn, *args, on_result=None, on_error=None, **kwargs):
+        """
+        Runs fn(*args, **kwargs), normally one of this class's getters, on the library query thread
+        so the UI never waits on SQLite. on_result(result) is called on the main thread. Returns a
+        QueryRequest; cancel it when the result is no longer wanted (e.g. the user navigated away).
+        """
+        return self._query_worker.submit(fn, *args, on_result=on_result, on_error=on_error, **kwargs)
 
     def _initialize_db(self):
-        # Ensure it creates 'filepath' and 'filehash' in DB_TRACKS_TABLE.
+        """Creates or upgrades the library schema (see db_migrations)."""
         Logger.info(f"LibraryManager: Initializing database at {self.db_path}...")
         conn = self._get_db_connection()
         if not conn: 
             Logger.error("LibraryManager: _initialize_db failed to get DB connection.")
             return
-        cursor = None
         try:
-            cursor = conn.cursor()
-            # Create artists table
-            cursor.execute(f"""
-                CREATE TABLE IF NOT EXISTS {DB_ARTISTS_TABLE} (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL COLLATE NOCASE
-                )
-            """)
-            # Create albums table
-            cursor.execute(f"""
-                CREATE TABLE IF NOT EXISTS {DB_ALBUMS_TABLE} (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL COLLATE NOCASE,
-                    artist_id INTEGER,
-                    art_filename TEXT,
-                    year INTEGER,
-                    UNIQUE(name, artist_id),
-                    FOREIGN KEY (artist_id) REFERENCES {DB_ARTISTS_TABLE}(id) ON DELETE CASCADE 
-                )
-            """)
-            # Create tracks table
-            cursor.execute(f"""
-                CREATE TABLE IF NOT EXISTS {DB_TRACKS_TABLE} (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    filepath TEXT UNIQUE NOT NULL,
-                    filehash TEXT,
-                    title TEXT COLLATE NOCASE,
-                    album_id INTEGER,
-                    artist_id INTEGER,
-                    track_number INTEGER,
-                    disc_number INTEGER,
-                    duration REAL,
-                    genre TEXT COLLATE NOCASE,
-                    year INTEGER,
-                    last_modified REAL,
-                    FOREIGN KEY (album_id) REFERENCES {DB_ALBUMS_TABLE}(id) ON DELETE SET NULL,
-                    FOREIGN KEY (artist_id) REFERENCES {DB_ARTISTS_TABLE}(id) ON DELETE SET NULL
-                )
-            """)
-            
-            cursor.execute(f"PRAGMA table_info({DB_TRACKS_TABLE})")
-            columns_info = cursor.fetchall()
-            column_names = [col_info['name'] for col_info in columns_info]
-            Logger.info(f"LibraryManager: Columns in {DB_TRACKS_TABLE}: {column_names}")
-
-            if 'filepath' not in column_names:
-                Logger.critical(f"LibraryManager: CRITICAL - 'filepath' column MISSING from {DB_TRACKS_TABLE} after CREATE TABLE!")
-            
-            if 'filehash' not in column_names:
-                Logger.info(f"LibraryManager: Adding 'filehash' column to {DB_TRACKS_TABLE} as it's missing.")
-                cursor.execute(f"ALTER TABLE {DB_TRACKS_TABLE} ADD COLUMN filehash TEXT")
-            
-            conn.commit()
-            Logger.info("LibraryManager: Database initialized/schema verified successfully.")
+            if migrate(conn):
+                Logger.info(f"LibraryManager: Database initialized/schema verified successfully (schema v{get_schema_version(conn)}).")
+                migrate_shards(conn, self.shards_dir)
+                remove_unregistered_shards(conn, self.shards_dir)
+                self._db.invalidate() # Attach the root databases the registry lists now that it exists
         except sqlite3.Error as e:
             Logger.error(f"LibraryManager: Database schema initialization error: {e}")
-            if conn: conn.rollback()
         finally:
-            if cursor:
-                cursor.close()
             self._close_db_connection(conn, "_initialize_db")
 
 
-    def _get_or_create_artist_id(self, cursor, artist_name):
-        if not artist_name or not artist_name.strip(): return None
-        artist_name = artist_name.strip()
-        cursor.execute(f"SELECT id FROM {DB_ARTISTS_TABLE} WHERE name = ?", (artist_name,))
-        row = cursor.fetchone()
-        if row: return row['id']
-        try:
-            cursor.execute(f"INSERT INTO {DB_ARTISTS_TABLE} (name) VALUES (?)", (artist_name,))
-            return cursor.lastrowid
-        except sqlite3.IntegrityError:
-            cursor.execute(f"SELECT id FROM {DB_ARTISTS_TABLE} WHERE name = ?", (artist_name,))
-            row = cursor.fetchone()
-            return row['id'] if row else None
-
-    def _get_or_create_album_id(self, cursor, album_name, album_artist_id, year=None):
-        if not album_name or not album_name.strip(): return None
-        album_name = album_name.strip()
-        # Standardize query for album lookup
-        query = f"SELECT id FROM {DB_ALBUMS_TABLE} WHERE name = ? AND "
-        params = [album_name]
-        if album_artist_id is not None:
-            query += "artist_id = ?"
-            params.append(album_artist_id)
-        else:
-            query += "artist_id IS NULL"
-        
-        cursor.execute(query, tuple(params))
-        row = cursor.fetchone()
-        if row: return row['id']
-        try:
-            cursor.execute(f"INSERT INTO {DB_ALBUMS_TABLE} (name, artist_id, year) VALUES (?, ?, ?)", (album_name, album_artist_id, year))
-            return cursor.lastrowid
-        except sqlite3.IntegrityError:
-            cursor.execute(query, tuple(params))
-            row = cursor.fetchone()
-            return row['id'] if row else None
-
-    def _cache_album_art(self, raw_art_data, album_id, album_name):
-
-        if not raw_art_data or not PILImage: return None
-        
+    # --- Library Scanning ---
+    def _handle_scanner_message(self, kind, payload):
+        """Applies a message from the scanning engine. Always runs on the Kivy main thread."""
+        if kind == SCAN_MSG_STATUS:
+            self.scan_progress_message = payload[0]
+        elif kind == SCAN_MSG_PROGRESS:
+            self._files_scanned_so_far, self._total_files_to_scan, message = payload
+            self.scan_progress_message = message
+            if self._progress_callback:
+                progress = self._files_scanned_so_far / self._total_files_to_scan if self._total_files_to_scan > 0 else 0
+                self._progress_callback(progress, message, False)
+        elif kind == SCAN_MSG_CHANGES:
+            self._dispatch_library_changed(payload[0])
+        elif kind == SCAN_MSG_DONE:
+            final_message = payload[0]
+            self.is_scanning = False
+            self.scan_progress_message = final_message
+            self._scan_cancel_event = None
+            if self._progress_callback:
+                self._progress_callback(1.0, final_message, True)
+            if self._queued_scan_roots:
+                Clock.schedule_once(self._start_queued_scan)
 
-        resized_stream = resize_image_data(raw_art_data, target_max_dim=ALBUM_ART_GRID_SIZE, output_format="WEBP", quality=80) 
-        file_ext = ".webp"
-        if not resized_stream:
-             resized_stream = resize_image_data(raw_art_data, target_max_dim=ALBUM_ART_GRID_SIZE, output_format="PNG") 
-             file_ext = ".png"
-
-        if resized_stream:
-            sanitized_album_name = sanitize_filename_for_cache(album_name if album_name else "unknown_album")
-            name_hash = hashlib.md5(f"{album_id}_{sanitized_album_name}".encode()).hexdigest()[:10]
-            art_filename = f"art_{name_hash}{file_ext}"
-            art_filepath = self.art_cache_dir / art_filename 
-            try:
-                with open(art_filepath, 'wb') as f:
-                    f.write(resized_stream.getvalue())
-                Logger.info(f"LibraryManager: Cached album art to {art_filepath}")
-                return art_filename 
-            except IOError as e:
-                Logger.error(f"LibraryManager: Error writing cached album art {art_filepath}: {e}")
-        return None
-
-    def _process_file_metadata(self, filepath, conn): 
-        cursor = None
-        try:
-            cursor = conn.cursor() # Use the provided connection's cursor
-            file_stat = os.stat(filepath)
-            last_modified = file_stat.st_mtime
-            current_file_hash = generate_file_hash(filepath)
+    def _schedule_scanner_message(self, kind, *payload):
+        Clock.schedule_once(lambda dt: self._handle_scanner_message(kind, payload))
 
-            # Check if track exists and if it needs update
-            cursor.execute(f"SELECT id, last_modified, filehash FROM {DB_TRACKS_TABLE} WHERE filepath = ?", (filepath,))
-            existing_track = cursor.fetchone()
+    def _scan_thread_target(self, music_folders, full_rescan, targeted, shards):
+        scanner = LibraryScanner(
+            self.db_path, self.art_cache_dir,
+            emit=self._schedule_scanner_message,
+            should_continue=lambda: self.is_scanning,
+            shards=shards
+        )
+        scanner.run(music_folders, full_rescan, targeted)
 
-            if existing_track and existing_track['last_modified'] == last_modified and existing_track['filehash'] == current_file_hash:
-                # Logger.debug(f"LibraryManager: Track {filepath} is up-to-date.")
-                return False
+    def _start_scan_process(self, music_folders, full_rescan, targeted, shards):
+        # Spawn (not fork) so the child never inherits Kivy's window/GL state or the main loop's threads.
+        ctx = multiprocessing.get_context("spawn")
+        os.environ.setdefault("KIVY_NO_ARGS", "1") # Child imports Kivy; don't let it parse our argv
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        self._scan_cancel_event = ctx.Event()
+        self._scan_process = ctx.Process(
+            target=run_scanner_process,
+            args=(child_conn, str(self.db_path), str(self.art_cache_dir), music_folders, full_rescan, targeted,
+                  self._scan_cancel_event, shards),
+            daemon=True
+        )
+        self._scan_process.start()
+        child_conn.close() # Only the child writes; lets recv() see EOF when the child exits
 
-            audio = mutagen.File(filepath, easy=True) 
-            if not audio:
-                Logger.warning(f"LibraryManager: Could not read metadata for: {filepath}")
-                return False
+        self._scan_thread = threading.Thread(
+            target=self._scan_pipe_listener,
+            args=(parent_conn, self._scan_process),
+            daemon=True
+        )
+        self._scan_thread.start()
+        Logger.info(f"LibraryManager: Scanner process started (pid {self._scan_process.pid}).")
 
-            # Extract common tags, providing defaults
-            title = str(audio.get('title', [os.path.splitext(os.path.basename(filepath))[0]])[0]) if audio.get('title') else os.path.splitext(os.path.basename(filepath))[0]
-            artist = str(audio.get('artist', ['Unknown Artist'])[0]) if audio.get('artist') else "Unknown Artist"
-            album = str(audio.get('album', ['Unknown Album'])[0]) if audio.get('album') else "Unknown Album"
-            albumartist = str(audio.get('albumartist', [artist])[0]) if audio.get('albumartist') else artist
-            
-            track_num_str = str(audio.get('tracknumber', ['0'])[0]).split('/')[0] if audio.get('tracknumber') else '0'
-            disc_num_str = str(audio.get('discnumber', ['0'])[0]).split('/')[0] if audio.get('discnumber') else '0'
-            track_num = int(track_num_str) if track_num_str.isdigit() else None
-            disc_num = int(disc_num_str) if disc_num_str.isdigit() else None
-
-            genre = str(audio.get('genre', [''])[0]) if audio.get('genre') else None
-            date_str = str(audio.get('date', [audio.get('originaldate', [''])[0]])[0]) if audio.get('date') or audio.get('originaldate') else None
-            year = None
-            if date_str:
-                if len(date_str) >= 4 and date_str[:4].isdigit(): year = int(date_str[:4])
-                elif date_str.isdigit() and len(date_str) == 4 : year = int(date_str)
-
-            duration = audio.info.length if hasattr(audio, 'info') and hasattr(audio.info, 'length') else 0.0
-
-            # Get/Create IDs for artist and album
-            track_artist_id = self._get_or_create_artist_id(cursor, artist)
-            album_artist_id_for_album_table = self._get_or_create_artist_id(cursor, albumartist)
-            album_id = self._get_or_create_album_id(cursor, album, album_artist_id_for_album_table, year)
-
-            # Process album art
-            art_filename = None
-            if album_id:
-                cursor.execute(f"SELECT art_filename FROM {DB_ALBUMS_TABLE} WHERE id = ?", (album_id,))
-                album_row = cursor.fetchone()
-                if album_row and not album_row['art_filename']:
-                    raw_art_data = None
-                    try:
-                        # Attempt to get embedded art (more comprehensive checks)
-                        detailed_audio = mutagen.File(filepath)
-                        if detailed_audio:
-                            if 'APIC:' in detailed_audio:
-                                raw_art_data = detailed_audio['APIC:'].data
-                            elif hasattr(detailed_audio, 'pictures') and detailed_audio.pictures:
-                                raw_art_data = detailed_audio.pictures[0].data
-                            elif 'metadata_block_picture' in detailed_audio:
-                                pic_data_b64_list = detailed_audio.get('metadata_block_picture')
-                                if pic_data_b64_list:
-                                    import base64
-                                    pic_data_b64 = pic_data_b64_list[0]
-                                    raw_art_data = base64.b64decode(pic_data_b64.split('|')[-1] if isinstance(pic_data_b64, str) and '|' in pic_data_b64 else pic_data_b64)
-                        
-                        if raw_art_data:
-                            art_filename = self._cache_album_art(raw_art_data, album_id, album)
-                            if art_filename:
-                                cursor.execute(f"UPDATE {DB_ALBUMS_TABLE} SET art_filename = ? WHERE id = ?", (art_filename, album_id))
-                    except Exception as e_art:
-                        Logger.warning(f"LibraryManager: Error extracting/caching art for {filepath}: {e_art}")
-                elif album_row:
-                    art_filename = album_row['art_filename']
-            
-            if existing_track:
-                track_data_tuple_update = (
-                    current_file_hash, title, album_id, track_artist_id, track_num, 
-                    disc_num, duration, genre, year, last_modified, existing_track['id'] 
-                )
-                cursor.execute(f"""UPDATE {DB_TRACKS_TABLE} SET 
-                                filehash=?, title=?, album_id=?, artist_id=?, track_number=?, 
-                                disc_number=?, duration=?, genre=?, year=?, last_modified=? 
-                                WHERE id=?""", track_data_tuple_update)
-            else:
-                track_data_tuple_insert = (
-                    filepath, current_file_hash, title, album_id, track_artist_id, 
-                    track_num, disc_num, duration, genre, year, last_modified
-                )
-                cursor.execute(f"""INSERT INTO {DB_TRACKS_TABLE} 
-                                (filepath, filehash, title, album_id, artist_id, track_number, 
-                                disc_number, duration, genre, year, last_modified) 
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", track_data_tuple_insert)
-            # conn.commit() # Commit is handled by the calling thread function after a batch
-            return True
-        except mutagen.MutagenError as e:
-            Logger.warning(f"LibraryManager: Mutagen error for {filepath}: {e}")
-        except sqlite3.Error as e:
-            Logger.error(f"LibraryManager: DB error processing file {filepath}: {e}")
-        except AttributeError as e:
-            Logger.warning(f"LibraryManager: Attribute error processing metadata for {filepath}: {e}")
-        except Exception as e:
-            Logger.error(f"LibraryManager: Unexpected error processing file {filepath}: {e}")
-            import traceback; traceback.print_exc()
+    def _scan_pipe_listener(self, parent_conn, process):
+        """Forwards messages from the scanner process to the main thread until the pipe closes."""
+        got_done = False
+        try:
+            while True:
+                try:
+                    kind, payload = parent_conn.recv()
+                except EOFError:
+                    break
+                got_done = got_done or kind == SCAN_MSG_DONE
+                self._schedule_scanner_message(kind, *payload)
         finally:
-            if cursor:
-                cursor.close() 
-        return False
-
-    def _scan_music_folders_thread_target(self, music_folders, full_rescan=False):
-        scan_thread_id = threading.get_ident()
-        Logger.critical(f"LibraryManager: SCAN THREAD {scan_thread_id} STARTED. Folders to scan: {music_folders}")
-
-        self._files_scanned_so_far = 0
-        self._total_files_to_scan = 0
-        files_processed_this_scan = 0
+            parent_conn.close()
+            process.join(timeout=5)
+            if not got_done:
+                Logger.error(f"LibraryManager: Scanner process exited unexpectedly (exit code {process.exitcode}).")
+                self._schedule_scanner_message(SCAN_MSG_DONE, "Scan failed: scanner process exited unexpectedly.", False)
 
-        # --- Phase 1: Count total files to scan ---
-        if self._progress_callback:
-            # Use setattr for Kivy properties when called from Clock schedule
-            Clock.schedule_once(lambda dt: setattr(self, 'scan_progress_message', "Calculating total files..."))
-
-        if not self.is_scanning: # Check if scan was cancelled very early
-            Logger.info("LibraryManager: Scan was externally cancelled right after thread start (before counting).")
-            if self._progress_callback:
-                Clock.schedule_once(lambda dt: setattr(self, 'scan_progress_message', "Scan cancelled."))
-                Clock.schedule_once(lambda dt: self._progress_callback(0, self.scan_progress_message, True))
-            Clock.schedule_once(lambda dt: setattr(self, 'is_scanning', False)) # Ensure flag is reset
-            return
-
-        for folder_path_idx, folder_path in enumerate(music_folders):
-            if not self.is_scanning:
-                Logger.info(f"LibraryManager: Scan cancelled during file counting (folder {folder_path_idx+1}).")
-                break 
-            Logger.info(f"LibraryManager: >>> Counting in folder: '{folder_path}' (Exists: {os.path.exists(folder_path)}, IsDir: {os.path.isdir(folder_path)})")
-            if not os.path.isdir(folder_path):
-                Logger.warning(f"LibraryManager: Skipping invalid folder path during count: {folder_path}")
-                continue
-            for root, _, files in os.walk(folder_path):
-                if not self.is_scanning:
-                    Logger.info(f"LibraryManager: Scan cancelled during os.walk (count) in '{root}'.")
-                    break
-                for filename in files:
-                    if not self.is_scanning:
-                        Logger.info(f"LibraryManager: Scan cancelled while counting files in '{root}'.")
-                        break
-                    if filename.lower().endswith(SUPPORTED_AUDIO_EXTENSIONS):
-                        # Logger.info(f"LibraryManager: FOUND SUPPORTED AUDIO FILE (for count): {os.path.join(root, filename)}") # Already logged by main scan
-                        self._total_files_to_scan += 1
-                if not self.is_scanning: break 
-            if not self.is_scanning: break 
-        
-        if not self.is_scanning : # If cancelled during counting phase
-            Logger.info("LibraryManager: Scan cancelled after (or during) file counting phase.")
-            return 
-
-        if self._total_files_to_scan == 0: # No files found to scan
-            final_message = "No music files found in selected folders."
-            Logger.info(f"LibraryManager: {final_message}")
-            Clock.schedule_once(lambda dt: setattr(self, 'is_scanning', False))
-            Clock.schedule_once(lambda dt, msg=final_message: setattr(self, 'scan_progress_message', msg))
-            if self._progress_callback:
-                Clock.schedule_once(lambda dt, msg=final_message: self._progress_callback(1.0, msg, True))
-            return
-        else: # Files found, update progress message
-            initial_scan_msg = f"Found {self._total_files_to_scan} files to scan. Processing..."
-            Logger.info(f"LibraryManager: {initial_scan_msg}")
-            Clock.schedule_once(lambda dt, msg=initial_scan_msg: setattr(self, 'scan_progress_message', msg))
-            if self._progress_callback:
-                Clock.schedule_once(lambda dt: self._progress_callback(0, self.scan_progress_message, False))
-        
-        # --- Phase 2: Process files and update database ---
-        conn = self._get_db_connection() 
-        if not conn:
-            Clock.schedule_once(lambda dt: setattr(self, 'scan_progress_message', "Scan failed: DB Connection Error"))
-            if self._progress_callback:
-                Clock.schedule_once(lambda dt: self._progress_callback(1.0, self.scan_progress_message, True))
-            Clock.schedule_once(lambda dt: setattr(self, 'is_scanning', False))
-            return
+    @staticmethod
+    def _collapse_nested_roots(roots):
+        """Normalizes roots and drops any that lie inside another root in the list."""
+        collapsed = []
+        for root in sorted({os.path.normpath(r) for r in roots}, key=len):
+            if not any(root == kept or root.startswith(kept.rstrip("\\/") + os.sep) for kept in collapsed):
+                collapsed.append(root)
+        return collapsed
 
+    def _prepare_shards(self, music_folders):
+        """
+        With one database per music root enabled, creates one for each root among music_folders
+        that the library holds no tracks of yet (see library_shards); roots already in the library
+        database stay there. Returns {root: database path} of every root with a database of its own.
+        """
+        conn = self._get_db_connection()
+        if not conn: return {}
         try:
-            all_filepaths_in_scan = [] # For full rescan, to find obsolete tracks
-            self._files_scanned_so_far = 0 # Reset for actual processing count
-
-            for folder_idx, folder_path in enumerate(music_folders):
-                if not self.is_scanning: break 
-                Logger.info(f"LibraryManager: Processing folder content ({folder_idx+1}/{len(music_folders)}): {folder_path}")
-                if not os.path.isdir(folder_path):
-                    Logger.warning(f"LibraryManager: Skipping invalid folder path during processing: {folder_path}")
-                    continue
-
-                for root, _, files in os.walk(folder_path):
-                    if not self.is_scanning: break
-                    for filename in files:
-                        if not self.is_scanning: break
-                        if filename.lower().endswith(SUPPORTED_AUDIO_EXTENSIONS):
-                            Logger.info(f"LibraryManager: FOUND SUPPORTED AUDIO FILE (for processing): {os.path.join(root, filename)}")
-                            filepath = os.path.join(root, filename)
-                            all_filepaths_in_scan.append(filepath) # Add to list for obsolete check
-                            
-                            if self._process_file_metadata(filepath, conn): 
-                                files_processed_this_scan +=1 
-                            
-                            self._files_scanned_so_far += 1 # Increment for each supported file encountered for processing attempt
-
-                            # Update progress every N files
-                            if self._progress_callback and self._files_scanned_so_far % 10 == 0 : # Update more frequently
-                                progress = self._files_scanned_so_far / self._total_files_to_scan if self._total_files_to_scan > 0 else 0
-                                current_msg = f"Scanned: {self._files_scanned_so_far}/{self._total_files_to_scan} files..."
-                                Clock.schedule_once(lambda dt, m=current_msg: setattr(self, 'scan_progress_message', m))
-                                Clock.schedule_once(lambda dt, p=progress, m=current_msg: self._progress_callback(p, m, False))
-                    if not self.is_scanning: break
-                if self.is_scanning: conn.commit() # Commit after each folder
-                else: break # If scan cancelled, break outer loop
-            
-            if self.is_scanning: conn.commit() # Final commit for any remaining operations
-
-            # --- Phase 3: Full Rescan - Remove obsolete tracks ---
-            if full_rescan and self.is_scanning: 
-                Logger.info("LibraryManager: Full rescan - checking for obsolete tracks...")
-                cursor = conn.cursor() 
-                try:
-                    cursor.execute(f"SELECT id, filepath FROM {DB_TRACKS_TABLE}")
-                    db_tracks = cursor.fetchall()
-                    # Efficiently find obsolete tracks: tracks in DB but not in current scan
-                    db_filepaths = {track['filepath']: track['id'] for track in db_tracks}
-                    scanned_filepaths_set = set(all_filepaths_in_scan)
-                    
-                    obsolete_track_ids = [
-                        db_filepaths[fp] for fp in db_filepaths if fp not in scanned_filepaths_set
-                    ]
-                    
-                    if obsolete_track_ids:
-                        placeholders = ','.join('?' for _ in obsolete_track_ids)
-                        cursor.execute(f"DELETE FROM {DB_TRACKS_TABLE} WHERE id IN ({placeholders})", obsolete_track_ids)
-                        conn.commit()
-                        Logger.info(f"LibraryManager: Removed {len(obsolete_track_ids)} obsolete tracks from DB.")
-                except sqlite3.Error as e_obs:
-                    Logger.error(f"LibraryManager: Error during obsolete track removal: {e_obs}")
-                    if conn: conn.rollback()
-                finally:
-                    if cursor: cursor.close()
-
-        except Exception as e: # Catch-all for unexpected errors during processing
-            Logger.error(f"LibraryManager: Error during scan thread's main processing loop ({scan_thread_id}): {e}")
-            import traceback; traceback.print_exc()
-            if conn: conn.rollback() # Rollback on major error
+            shards = get_shards(conn)
+            if music_folders and self.settings_manager.get_database_per_root():
+                roots = self._collapse_nested_roots(self.settings_manager.get_music_folders())
+                created = False
+                for folder in music_folders:
+                    root = owning_root(roots, os.path.normpath(folder))
+                    # Nesting would split a root's files between two databases
+                    if (root is None or owning_root(shards, root) or any(owning_root([root], shard_root) for shard_root in shards)
+                            or self.has_tracks_under(root)):
+                        continue
+                    shard_id = create_shard(conn, self.shards_dir, root)
+                    if shard_id is not None:
+                        shards[root] = shard_id
+                        created = True
+                if created:
+                    self._db.invalidate()
+            return {root: shard_path(self.shards_dir, shard_id) for root, shard_id in shards.items()}
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error reading the music root databases: {e}")
+            return {}
         finally:
-            self._close_db_connection(conn, f"_scan_music_folders_thread_target (Thread {scan_thread_id})")
-            
-            # Determine final message based on whether scan was cancelled or completed
-            if not self.is_scanning: # If scan was cancelled at any point
-                final_message = f"Scan cancelled. Found: {self._files_scanned_so_far} of {self._total_files_to_scan}. Processed in DB: {files_processed_this_scan}."
-            else: # Scan completed naturally
-                final_message = f"Scan complete. Processed: {files_processed_this_scan} of {self._total_files_to_scan} files."
-
-            Clock.schedule_once(lambda dt: setattr(self, 'is_scanning', False)) # Ensure is_scanning is False
-            Clock.schedule_once(lambda dt, msg=final_message: setattr(self, 'scan_progress_message', msg))
-            Logger.info(f"LibraryManager: {final_message}")
-            if self._progress_callback:
-                 Clock.schedule_once(lambda dt, msg=final_message: self._progress_callback(1.0, msg, True))
-
+            self._close_db_connection(conn, "_prepare_shards")
 
-    def start_scan_music_library(self, progress_callback=None, full_rescan=False):
+    def start_scan_music_library(self, progress_callback=None, full_rescan=False, roots=None):
+        """
+        Starts a background library scan. roots limits it to specific music folders or subdirectories;
+        by default every configured music folder is scanned. Targeted scans requested while another scan
+        is running are queued and start as soon as it finishes.
+        """
         if self.is_scanning:
+            if roots:
+                self._queued_scan_roots.extend(roots)
+                self._queued_scan_callback = progress_callback or self._queued_scan_callback
+                Logger.info(f"LibraryManager: Scan in progress; queued targeted scan of {roots}.")
+                return True
             Logger.info("LibraryManager: Scan already in progress.")
             if progress_callback: 
                 # Provide current status if already scanning
@@ -475,7 +322,15 @@ class LibraryManager(EventDispatcher):
                 progress_callback(progress_val, current_msg, False) # False because it's ongoing
             return False
 
-        music_folders = self.settings_manager.get_music_folders()
+        targeted = bool(roots)
+        if targeted:
+            music_folders = [root for root in self._collapse_nested_roots(roots) if os.path.isdir(root)]
+            if not music_folders:
+                Logger.warning(f"LibraryManager: None of the requested scan roots exist: {roots}")
+                if progress_callback: progress_callback(1.0, "Nothing to scan: folder not found.", True)
+                return False
+        else:
+            music_folders = self.settings_manager.get_music_folders()
         if not music_folders:
             Logger.info("LibraryManager: No music folders configured to scan.")
             if progress_callback: progress_callback(1.0, "No music folders configured.", True) # True because it's done (nothing to do)
@@ -486,33 +341,579 @@ class LibraryManager(EventDispatcher):
         self._total_files_to_scan = 0 
         self.scan_progress_message = "Initializing scan..." # Initial message
         
-        self.is_scanning = True # Set is_scanning to True before starting the thread
+        shards = self._prepare_shards(music_folders)
+        self.is_scanning = True # Set is_scanning to True before starting the scan
+        Logger.info(f"LibraryManager: Starting {'targeted ' if targeted else ''}scan of {music_folders} (Full: {full_rescan}).")
+
+        if self.settings_manager.get_scan_in_subprocess():
+            try:
+                self._start_scan_process(music_folders, full_rescan, targeted, shards)
+                return True
+            except Exception as e:
+                Logger.error(f"LibraryManager: Could not start scanner process, falling back to a thread: {e}")
+                self._scan_cancel_event = None
 
         self._scan_thread = threading.Thread(
-            target=self._scan_music_folders_thread_target,
-            args=(music_folders, full_rescan),
+            target=self._scan_thread_target,
+            args=(music_folders, full_rescan, targeted, shards),
             daemon=True # So thread exits when main app exits
         )
         self._scan_thread.start()
         Logger.info(f"LibraryManager: Scan thread initiated. is_scanning = {self.is_scanning}")
         return True
 
+    def _start_queued_scan(self, dt=None):
+        if self.is_scanning or not self._queued_scan_roots:
+            return
+        roots, progress_callback = self._queued_scan_roots, self._queued_scan_callback
+        self._queued_scan_roots, self._queued_scan_callback = [], None
+        self.start_scan_music_library(progress_callback=progress_callback, roots=roots)
+
     def stop_scan_music_library(self):
         if self.is_scanning and self._scan_thread and self._scan_thread.is_alive():
             Logger.info("LibraryManager: Attempting to stop library scan...")
             self.is_scanning = False # Signal thread to stop
+            self._queued_scan_roots = []
+            if self._scan_cancel_event is not None:
+                self._scan_cancel_event.set() # Signal scanner process to stop
         else:
             Logger.info("LibraryManager: No active scan in progress to stop or thread already finished.")
             self.is_scanning = False # Ensure it's false if called when not scanning
 
+    def import_dropped_paths(self, paths, on_tracks_ready, on_done=None):
+        """
+        Indexes dropped files and folders in the background through the scanning pipeline.
+        on_tracks_ready(filepaths) is called on the main thread, first with the first playable file
+        and then with each indexed batch; on_done(message) when the import finishes.
+        Runs independently of library scans, so it works while a scan is in progress.
+        """
+        stop_flag = threading.Event()
+        self._import_stop_flags.add(stop_flag)
+
+        def handle(kind, payload):
+            if kind == SCAN_MSG_TRACKS_READY:
+                on_tracks_ready(payload[0])
+            elif kind == SCAN_MSG_CHANGES:
+                self._dispatch_library_changed(payload[0])
+            elif kind == SCAN_MSG_DONE:
+                self._import_stop_flags.discard(stop_flag)
+                if on_done:
+                    on_done(payload[0])
+
+        def emit(kind, *payload):
+            Clock.schedule_once(lambda dt: handle(kind, payload))
+
+        scanner = LibraryScanner(self.db_path, self.art_cache_dir, emit, should_continue=lambda: not stop_flag.is_set(),
+                                 shards=self._prepare_shards([]))
+        threading.Thread(target=scanner.import_paths, args=(list(paths),), daemon=True).start()
+        Logger.info(f"LibraryManager: Import of {len(paths)} dropped path(s) started.")
+
+    def stop_imports(self):
+        for stop_flag in list(self._import_stop_flags):
+            stop_flag.set()
+
+    # --- Idle Maintenance ---
+    def start_idle_maintenance(self):
+        """
+        Periodically checks whether the app has been idle for MAINTENANCE_IDLE_SECONDS and, if so,
+        runs the maintenance steps that are due (see DatabaseMaintenance) on a background thread.
+        """
+        if self._maintenance_check_event is None:
+            self._maintenance_check_event = Clock.schedule_interval(self._check_idle_maintenance, MAINTENANCE_CHECK_INTERVAL)
+
+    def stop_idle_maintenance(self):
+        if self._maintenance_check_event is not None:
+            self._maintenance_check_event.cancel()
+            self._maintenance_check_event = None
+        self._maintenance_abort.set()
+
+    def notify_user_activity(self, *args):
+        """Called on any user input. Restarts the idle clock and aborts running maintenance."""
+        self._last_user_activity = time.monotonic()
+        self._maintenance_abort.set()
+
+    def _maintenance_should_abort(self):
+        return self._maintenance_abort.is_set() or self.is_scanning
+
+    def _check_idle_maintenance(self, dt=None):
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+        if self.is_scanning or time.monotonic() - self._last_user_activity < MAINTENANCE_IDLE_SECONDS:
+            return
+        conn = self._get_db_connection()
+        if not conn: return
+        try:
+            runs = [(self.db_path, DatabaseMaintenance.due_steps(conn))]
+            # Each root database (see library_shards) is maintained on its own; the library database's run covers the art cache
+            schemas = library_schemas(conn)
+            for shard_id in get_shards(conn).values():
+                if shard_schema(shard_id) in schemas:
+                    steps = DatabaseMaintenance.due_steps(conn, schema=shard_schema(shard_id))
+                    runs.append((shard_path(self.shards_dir, shard_id), [step for step in steps if step != "art_cache"]))
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Could not check for due maintenance: {e}")
+            return
+        finally:
+            self._close_db_connection(conn, "_check_idle_maintenance")
+        runs = [(db_file, steps) for db_file, steps in runs if steps]
+        if not runs:
+            return
+        for db_file, steps in runs:
+            Logger.info(f"LibraryManager: App idle; running maintenance of {os.path.basename(db_file)}: {', '.join(steps)}.")
+        self._maintenance_abort.clear()
+
+        def target():
+            for db_file, steps in runs:
+                if self._maintenance_should_abort():
+                    break
+                in_library_db = str(db_file) == str(self.db_path)
+                DatabaseMaintenance(db_file, should_abort=self._maintenance_should_abort,
+                                    art_cache_dir=self.art_cache_dir if in_library_db else None,
+                                    shards_dir=self.shards_dir if in_library_db else None).run(steps)
+        self._maintenance_thread = threading.Thread(target=target, daemon=True)
+        self._maintenance_thread.start()
+
+    # --- Search ---
+    @staticmethod
+    def _build_fts_query(text):
+        """
+        Turns free text into an FTS5 query: every word must match, as a prefix, in any column.
+        Single characters match whole words only; there is no 1-character prefix index and such a
+        prefix would match most of the library anyway.
+        """
+        words = re.findall(r"\w+", text or "")
+        return " ".join(f'"{word}"*' if len(word) > 1 else f'"{word}"' for word in words)
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        """
+        Full-text search over track titles, artists, albums and genres, best matches first.
+        Returns track dicts shaped like get_tracks_by_album's plus album_name and album_id.
+        Ranking is exact for queries with up to SEARCH_RANK_CANDIDATES matches. Broader ones only
+        rank their first SEARCH_RANK_CANDIDATES matches in rowid (insertion) order, so a better
+        match beyond those can be missing: ranking all of them takes about a second at 500k tracks.
+        """
+        fts_query = self._build_fts_query(query)
+        if not fts_query:
+            return []
+        conn = self._get_db_connection()
+        if not conn: return []
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            # Rank and limit inside the FTS table first, so only the returned rows are joined. Ranking is
+            # the costly part, so a very broad query ("rock" at 1M tracks) ranks only its first
+            # SEARCH_RANK_CANDIDATES matches instead of every one; its ranking is approximate.
+            # Each root database (see library_shards) has its own index, searched the same way.
+            schemas = library_schemas(conn)
+            cursor.execute(" UNION ALL ".join(f"""
+                SELECT t.id, t.filepath, t.title, t.track_number, t.disc_number, t.duration,
+                       ar.name as artist_name, al.name as album_name, al.id as album_id, hits.rank as rank
+                FROM (SELECT rowid, rank FROM (SELECT rowid, rank FROM {schema}.{DB_TRACKS_FTS_TABLE}(?) LIMIT ?)
+                      ORDER BY rank LIMIT ?) hits
+                JOIN {schema}.{DB_TRACKS_TABLE} t ON t.id = hits.rowid
+                LEFT JOIN {schema}.{DB_ARTISTS_TABLE} ar ON t.artist_id = ar.id
+                LEFT JOIN {schema}.{DB_ALBUMS_TABLE} al ON t.album_id = al.id""" for schema in schemas) + " ORDER BY rank LIMIT ?",
+                           (fts_query, max(limit, SEARCH_RANK_CANDIDATES), limit) * len(schemas) + (limit,))
+            return [{key: row[key] for key in row.keys() if key != "rank"} for row in cursor.fetchall()]
+        except sqlite3.OperationalError as e:
+            if "interrupted" in str(e):
+                raise # Superseded by a newer search_async request
+            if "no such table" not in str(e) or DB_TRACKS_FTS_TABLE not in str(e):
+                Logger.error(f"LibraryManager: Error searching for '{query}': {e}")
+                return []
+            # No FTS5 in this SQLite build: plain substring match on titles
+            cursor.execute(f"""
+                SELECT t.id, t.filepath, t.title, t.track_number, t.disc_number, t.duration,
+                       {_ARTIST_NAME} as artist_name, {_ALBUM_NAME} as album_name, t.album_id
+                FROM {DB_TRACKS_TABLE} t
+                WHERE t.title LIKE ? LIMIT ?
+            """, (f"%{query.strip()}%", limit))
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error searching for '{query}': {e}")
+            return []
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "search")
+
+    def search_async(self, query, callback, limit=SEARCH_RESULT_LIMIT):
+        """
+        Runs search() on a background worker; callback(query, results) is called on the main thread.
+        Each call supersedes the previous one: a stale query still running is interrupted and its
+        results are never delivered.
+        """
+        with self._search_lock:
+            self._search_generation += 1
+            self._search_request = (self._search_generation, query, limit, callback)
+            if self._search_conn is not None:
+                self._search_conn.interrupt() # No-op if the worker is idle
+            if self._search_thread is None:
+                self._search_thread = threading.Thread(target=self._search_worker, daemon=True)
+                self._search_thread.start()
+        self._search_wakeup.set()
+
+    def _search_worker(self):
+        while True:
+            self._search_wakeup.wait()
+            self._search_wakeup.clear()
+            with self._search_lock:
+                request = self._search_request
+                self._search_conn = self._get_db_connection()
+            if request is None:
+                continue
+            generation, query, limit, callback = request
+            try:
+                results = self.search(query, limit)
+            except sqlite3.OperationalError:
+                self._search_wakeup.set() # Interrupted; pick up whichever request is now the latest
+                continue
+            with self._search_lock:
+                if generation != self._search_generation:
+                    continue # A newer request is queued; the wakeup event is already set
+                self._search_request = None
+            Clock.schedule_once(lambda dt: callback(query, results))
+
+    # --- Library Export Import ---
+    def import_library_export(self, path, progress_callback=None):
+        """
+        Imports playlists and play counts from an iTunes/Rhythmbox XML export, an M3U playlist or a folder
+        of them, in the background. progress_callback(progress, message, is_done) is called on the main thread.
+        Only files already in the library are matched, so scan the music folders first.
+        """
+        if self._import_export_thread and self._import_export_thread.is_alive():
+            Logger.info("LibraryManager: A library import is already in progress.")
+            if progress_callback: progress_callback(0, "An import is already in progress.", False)
+            return False
+
+        def report(progress, message, is_done):
+            if progress_callback:
+                Clock.schedule_once(lambda dt: progress_callback(progress, message, is_done))
+
+        def target():
+            importer = LibraryImporter(self.db_path, progress=lambda fraction, message: report(fraction, message, False),
+                                       shards_dir=self.shards_dir)
+            try:
+                message = importer.run(path)
+                # Imported play counts and last-played dates can change what play-count rules match
+                self._refresh_smart_playlists(None, stats_only=True)
+                report(1.0, message, True)
+            except (OSError, ValueError, sqlite3.Error) as e: # ET.ParseError is a SyntaxError subclass
+                Logger.error(f"LibraryManager: Import of '{path}' failed: {e}")
+                report(1.0, f"Import failed: {e}", True)
+            except SyntaxError as e:
+                Logger.error(f"LibraryManager: '{path}' is not valid XML: {e}")
+                report(1.0, f"Import failed: not a valid XML file ({e}).", True)
+            finally:
+                self._db.close_thread_connection()
+
+        self._import_export_thread = threading.Thread(target=target, daemon=True)
+        self._import_export_thread.start()
+        Logger.info(f"LibraryManager: Import of library export '{path}' started.")
+        return True
+
+    # --- Library Snapshots ---
+    def _has_root_databases(self):
+        """True if any music root has a database of its own (see library_shards); snapshots only cover the library database."""
+        conn = self._get_db_connection()
+        if not conn: return False
+        try:
+            return bool(get_shards(conn))
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error reading the music root databases: {e}")
+            return False
+        finally:
+            self._close_db_connection(conn, "_has_root_databases")
+
+    def export_snapshot(self, dest_path, progress_callback=None):
+        """
+        Writes a portable snapshot of the library (see library_snapshot) in the background, with
+        track paths relative to the music folders. progress_callback(progress, message, is_done)
+        is called on the main thread.
+        """
+        if self._import_export_thread and self._import_export_thread.is_alive():
+            if progress_callback: progress_callback(0, "An import or export is already in progress.", False)
+            return False
+        if self._has_root_databases():
+            if progress_callback: progress_callback(1.0, "Snapshots are not available with a database per music folder.", True)
+            return False
+
+        def report(progress, message, is_done):
+            if progress_callback:
+                Clock.schedule_once(lambda dt: progress_callback(progress, message, is_done))
+
+        music_roots = self._collapse_nested_roots(self.settings_manager.get_music_folders())
+
+        def target():
+            try:
+                report(1.0, export_snapshot(self.db_path, self.art_cache_dir, music_roots, dest_path,
+                                            progress=lambda fraction, message: report(fraction, message, False)), True)
+            except (OSError, sqlite3.Error) as e:
+                Logger.error(f"LibraryManager: Snapshot export to '{dest_path}' failed: {e}")
+                report(1.0, f"Export failed: {e}", True)
+
+        self._import_export_thread = threading.Thread(target=target, daemon=True)
+        self._import_export_thread.start()
+        Logger.info(f"LibraryManager: Snapshot export to '{dest_path}' started.")
+        return True
+
+    def import_snapshot(self, path, progress_callback=None):
+        """
+        Replaces the library with a snapshot made on another machine, in the background. Tracks are
+        rebased onto the matching local music folders and checked by stat only, so no file is parsed.
+        Music folders the snapshot used that exist here but aren't configured yet are added.
+        """
+        if self.is_scanning or (self._import_export_thread and self._import_export_thread.is_alive()):
+            if progress_callback: progress_callback(0, "Wait for the running scan or import to finish.", False)
+            return False
+        if self._has_root_databases():
+            if progress_callback: progress_callback(1.0, "Snapshots are not available with a database per music folder.", True)
+            return False
+
+        def report(progress, message, is_done):
+            if progress_callback:
+                Clock.schedule_once(lambda dt: progress_callback(progress, message, is_done))
+
+        music_folders = self.settings_manager.get_music_folders()
+
+        def finish(message, local_roots):
+            for root in local_roots:
+                if root not in self.settings_manager.get_music_folders():
+                    self.settings_manager.add_music_folder(root) # Already has tracks, so the app won't rescan it
+            # Track, album and artist ids now all refer to the snapshot's library
+            self._dispatch_library_changed({'added': [], 'updated': [], 'removed': [], 'reload': True})
+            if progress_callback:
+                progress_callback(1.0, message, True)
+
+        def target():
+            try:
+                message, local_roots = import_snapshot(path, self.db_path, self.art_cache_dir, music_folders,
+                                                       progress=lambda fraction, message: report(fraction, message, False))
+                Clock.schedule_once(lambda dt: finish(message, local_roots))
+            except (OSError, sqlite3.Error, zipfile.BadZipFile, SnapshotError) as e:
+                Logger.error(f"LibraryManager: Snapshot import of '{path}' failed: {e}")
+                report(1.0, f"Import failed: {e}", True)
+            finally:
+                self._db.close_thread_connection()
+
+        self._import_export_thread = threading.Thread(target=target, daemon=True)
+        self._import_export_thread.start()
+        Logger.info(f"LibraryManager: Snapshot import of '{path}' started.")
+        return True
+
+    def has_tracks_under(self, root):
+        """True if the library holds any track below root."""
+        conn = self._get_db_connection()
+        if not conn: return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            lower, upper = path_prefix_bounds(os.path.normpath(root))
+            cursor.execute(f"SELECT 1 FROM {DB_TRACKS_TABLE} WHERE filepath >= ? AND filepath < ? LIMIT 1", (lower, upper))
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error checking for tracks under '{root}': {e}")
+            return False
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "has_tracks_under")
+
+    # --- Music Root Removal ---
+    def purge_music_root(self, root, on_done=None):
+        """
+        Deletes everything the library holds for a removed music root in the background: its tracks,
+        albums and artists left without tracks, their cached art and quarantine entries.
+        on_done(message) is called on the main thread when finished.
+        """
+        root = os.path.normpath(root)
+        remaining_roots = [os.path.normpath(folder) for folder in self.settings_manager.get_music_folders()]
+        root_prefix = path_prefix_bounds(root)[0]
+        if any(root == kept or root.startswith(path_prefix_bounds(kept)[0]) for kept in remaining_roots):
+            Logger.info(f"LibraryManager: '{root}' is still covered by another music folder; nothing to purge.")
+            if on_done: on_done("Folder is still part of the library.")
+            return
+        # Configured roots nested inside the removed one keep their tracks
+        kept_prefixes = tuple(path_prefix_bounds(kept)[0] for kept in remaining_roots if kept.startswith(root_prefix))
+        threading.Thread(target=self._purge_root_thread_target, args=(root, kept_prefixes, on_done), daemon=True).start()
+        Logger.info(f"LibraryManager: Purge of removed music root '{root}' started.")
+
+    def _purge_root_thread_target(self, root, kept_prefixes, on_done):
+        conn = self._get_db_connection()
+        if not conn:
+            if on_done: Clock.schedule_once(lambda dt: on_done("Error: Could not open the library database."))
+            return
+        cursor = None
+        removed_track_ids, orphan_art_files = [], []
+        removed_albums = removed_artists = removed_art = reclaimed_kb = 0
+        try:
+            cursor = conn.cursor()
+            # A root with a database of its own (see library_shards) goes with its file, unless a kept root lies inside it
+            for shard_root, shard_id in get_shards(conn).items():
+                if not owning_root([root], shard_root) or any(prefix.startswith(path_prefix_bounds(shard_root)[0]) for prefix in kept_prefixes):
+                    continue
+                db_file = shard_path(self.shards_dir, shard_id)
+                schema = shard_schema(shard_id)
+                if schema in library_schemas(conn):
+                    shard_track_ids = [row[0] for row in cursor.execute(f"SELECT id FROM {schema}.{DB_TRACKS_TABLE}")]
+                    removed_albums += cursor.execute(f"SELECT COUNT(*) FROM {schema}.{DB_ALBUMS_TABLE}").fetchone()[0]
+                    removed_artists += cursor.execute(f"SELECT COUNT(*) FROM {schema}.{DB_ARTISTS_TABLE}").fetchone()[0]
+                    orphan_art_files.extend(row[0] for row in cursor.execute(
+                        f"SELECT art_filename FROM {schema}.{DB_ALBUMS_TABLE} WHERE art_filename IS NOT NULL"))
+                    forget_shard_tracks(cursor, shard_track_ids)
+                    removed_track_ids.extend(shard_track_ids)
+                size = sum(os.path.getsize(db_file + suffix) for suffix in ("", "-wal") if os.path.exists(db_file + suffix))
+                if drop_shard(conn, self.shards_dir, shard_id): # Commits the forgotten tracks with the unregistration
+                    reclaimed_kb += size // 1024
+                self._db.invalidate() # Other threads still have the database attached
+                Logger.info(f"LibraryManager: Deleted the database of music root '{shard_root}'.")
+
+            # Everything else below root: in the library database and in root databases that keep a nested root
+            for db_file in [self.db_path] + [shard_path(self.shards_dir, shard_id) for shard_root, shard_id in get_shards(conn).items()
+                                             if owning_root([root], shard_root)]:
+                track_ids, albums, artists, art_files, freed_kb = self._purge_rows(conn, db_file, root, kept_prefixes)
+                removed_track_ids.extend(track_ids)
+                removed_albums += albums
+                removed_artists += artists
+                orphan_art_files.extend(art_files)
+                reclaimed_kb += freed_kb
+
+            for art_filename in orphan_art_files:
+                cursor.execute(f"SELECT 1 FROM {DB_ALBUMS_TABLE} WHERE art_filename = ? LIMIT 1", (art_filename,))
+                if cursor.fetchone():
+                    continue # Still used by another album
+                try:
+                    os.remove(self.art_cache_dir / art_filename)
+                    removed_art += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    Logger.warning(f"LibraryManager: Could not delete cached art {art_filename}: {e}")
+
+            message = (f"Removed {len(removed_track_ids)} tracks, {removed_albums} albums, "
+                       f"{removed_artists} artists and {removed_art} cached art files; freed {reclaimed_kb} KiB.")
+            Logger.info(f"LibraryManager: Purged '{root}'. {message}")
+        except (sqlite3.Error, OSError) as e:
+            Logger.error(f"LibraryManager: Error purging music root '{root}': {e}")
+            conn.rollback()
+            message = "Error: Could not remove the folder's tracks from the library."
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "_purge_root_thread_target")
+            self._db.close_thread_connection()
+
+        def finish(dt):
+            if removed_track_ids:
+                self._dispatch_library_changed({'added': [], 'updated': [], 'removed': removed_track_ids})
+            if on_done:
+                on_done(message)
+        Clock.schedule_once(finish)
+
+    def _purge_rows(self, conn, db_file, root, kept_prefixes):
+        """
+        Deletes the tracks below root from one database file, and the albums and artists they leave
+        without tracks, then releases its free pages. conn is the library connection; it drops the
+        tracks' statistics and playlist entries when db_file is a root database. Returns (track ids,
+        album count, artist count, art filenames of the deleted albums, KiB freed).
+        """
+        in_library_db = str(db_file) == str(self.db_path)
+        db_conn = connect(db_file) # Plain connection: the union views of conn can't be written to
+        cursor = None
+        removed_track_ids, album_ids, artist_ids, orphan_art_files = [], set(), set(), []
+        removed_albums = removed_artists = 0
+        try:
+            cursor = db_conn.cursor()
+            lower, upper = path_prefix_bounds(root)
+            # Indexed range scan on the UNIQUE filepath index: proportional to the removed subtree
+            cursor.execute(f"""SELECT id, filepath, album_id, artist_id FROM {DB_TRACKS_TABLE}
+                               WHERE filepath >= ? AND filepath < ?""", (lower, upper))
+            for row in cursor.fetchall():
+                if kept_prefixes and row['filepath'].startswith(kept_prefixes):
+                    continue
+                removed_track_ids.append(row['id'])
+                if row['album_id'] is not None: album_ids.add(row['album_id'])
+                if row['artist_id'] is not None: artist_ids.add(row['artist_id'])
+
+            # Delete in chunks so a concurrent scan or import is never locked out for long
+            for start in range(0, len(removed_track_ids), PURGE_BATCH_SIZE):
+                chunk = removed_track_ids[start:start + PURGE_BATCH_SIZE]
+                chunk_params = [(track_id,) for track_id in chunk]
+                cursor.executemany(f"DELETE FROM {DB_TRACKS_TABLE} WHERE id = ?", chunk_params)
+                if in_library_db:
+                    cursor.executemany(f"DELETE FROM {DB_TRACK_STATS_TABLE} WHERE track_id = ?", chunk_params)
+                    cursor.executemany(f"DELETE FROM {DB_PLAYLIST_TRACKS_TABLE} WHERE track_id = ?", chunk_params)
+                db_conn.commit()
+                if not in_library_db:
+                    forget_shard_tracks(conn.cursor(), chunk)
+                    conn.commit()
+
+            for album_id in album_ids:
+                cursor.execute(f"""SELECT artist_id, art_filename FROM {DB_ALBUMS_TABLE} WHERE id = ?
+                                   AND NOT EXISTS (SELECT 1 FROM {DB_TRACKS_TABLE} WHERE album_id = ?)""", (album_id, album_id))
+                album_row = cursor.fetchone()
+                if not album_row:
+                    continue
+                cursor.execute(f"DELETE FROM {DB_ALBUMS_TABLE} WHERE id = ?", (album_id,))
+                removed_albums += 1
+                if album_row['artist_id'] is not None: artist_ids.add(album_row['artist_id'])
+                if album_row['art_filename']: orphan_art_files.append(album_row['art_filename'])
+
+            for artist_id in artist_ids:
+                cursor.execute(f"""DELETE FROM {DB_ARTISTS_TABLE} WHERE id = ?
+                                   AND NOT EXISTS (SELECT 1 FROM {DB_TRACKS_TABLE} WHERE artist_id = ?)
+                                   AND NOT EXISTS (SELECT 1 FROM {DB_ALBUMS_TABLE} WHERE artist_id = ?)""",
+                               (artist_id, artist_id, artist_id))
+                removed_artists += cursor.rowcount
+
+            if kept_prefixes:
+                cursor.execute(f"SELECT filepath FROM {DB_SCAN_QUARANTINE_TABLE} WHERE filepath >= ? AND filepath < ?", (lower, upper))
+                cursor.executemany(f"DELETE FROM {DB_SCAN_QUARANTINE_TABLE} WHERE filepath = ?",
+                                   [(row['filepath'],) for row in cursor.fetchall() if not row['filepath'].startswith(kept_prefixes)])
+            else:
+                cursor.execute(f"DELETE FROM {DB_SCAN_QUARANTINE_TABLE} WHERE filepath >= ? AND filepath < ?", (lower, upper))
+            db_conn.commit()
+
+            # Shrink the file now instead of leaving the root's pages free until the next idle maintenance
+            size_before = os.path.getsize(db_file)
+            release_free_pages(db_conn, lambda: self.is_scanning) # A scan started meanwhile takes priority
+            reclaimed_kb = max(size_before - os.path.getsize(db_file), 0) // 1024
+        except sqlite3.Error:
+            db_conn.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            close_connection(db_conn)
+        return removed_track_ids, removed_albums, removed_artists, orphan_art_files, reclaimed_kb
+
     # --- Data Retrieval Methods (Ensure they use their own connections) ---
+    def get_library_stats(self):
+        """
+        Library totals: track_count, album_count, artist_count, total_duration (seconds) and
+        last_scan_at (epoch seconds, None before the first completed scan). Triggers keep them
+        current, so this is a single-row read whatever the library size.
+        """
+        empty = {"track_count": 0, "album_count": 0, "artist_count": 0, "total_duration": 0.0, "last_scan_at": None}
+        conn = self._get_db_connection()
+        if not conn: return empty
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""SELECT track_count, album_count, artist_count, total_duration, last_scan_at
+                               FROM {DB_LIBRARY_STATS_TABLE} WHERE id = 1""")
+            row = cursor.fetchone()
+            return dict(row) if row else empty
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error fetching library stats: {e}")
+            return empty
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_library_stats")
+
     def get_all_artists(self):
         conn = self._get_db_connection()
         if not conn: return []
         cursor = None
         try:
             cursor = conn.cursor()
-            cursor.execute(f"SELECT id, name FROM {DB_ARTISTS_TABLE} ORDER BY name COLLATE NOCASE")
+            cursor.execute(f"SELECT id, name FROM {DB_ARTISTS_TABLE} ORDER BY sort_name, id")
             return [{"id": row["id"], "name": row["name"]} for row in cursor.fetchall()]
         except sqlite3.Error as e:
             Logger.error(f"LibraryManager: Error fetching artists: {e}")
@@ -521,34 +922,34 @@ class LibraryManager(EventDispatcher):
             if cursor: cursor.close()
             self._close_db_connection(conn, "get_all_artists")
 
+    def _album_summary_dict(self, row):
+        # has_art is kept in step with the art cache, so no per-row file check is needed here
+        art_full_path = self.art_cache_dir / row["art_filename"] if row["has_art"] else None
+        return {
+            "id": row["album_id"], "name": row["name"],
+            "artist_name": row["artist_name"] or "Various Artists", # Handle null artist names
+            "year": row["year"],
+            "track_count": row["track_count"],
+            "total_duration": row["total_duration"],
+            "art_path": str(art_full_path) if art_full_path else None,
+            "art_key": row["art_key"]
+        }
+
     def get_albums_by_artist(self, artist_id=None): 
         conn = self._get_db_connection()
         if not conn: return []
         cursor = None
         try:
             cursor = conn.cursor()
-            query = f"""
-                SELECT al.id, al.name, al.year, al.art_filename, ar.name as artist_name
-                FROM {DB_ALBUMS_TABLE} al
-                LEFT JOIN {DB_ARTISTS_TABLE} ar ON al.artist_id = ar.id
-            """
+            query = f"SELECT * FROM {DB_ALBUM_SUMMARY_TABLE}"
             params = []
             if artist_id is not None:
-                query += " WHERE al.artist_id = ?"
+                query += " WHERE artist_id = ?"
                 params.append(artist_id)
-            query += " ORDER BY al.name COLLATE NOCASE" # Ensure consistent ordering
+            query += " ORDER BY sort_name, album_id" # Ensure consistent ordering
             
             cursor.execute(query, tuple(params))
-            albums = []
-            for row in cursor.fetchall():
-                art_full_path = self.art_cache_dir / row["art_filename"] if row["art_filename"] else None
-                albums.append({
-                    "id": row["id"], "name": row["name"], 
-                    "artist_name": row["artist_name"] or "Various Artists", # Handle null artist names
-                    "year": row["year"],
-                    "art_path": str(art_full_path) if art_full_path and art_full_path.exists() else None
-                })
-            return albums
+            return [self._album_summary_dict(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             Logger.error(f"LibraryManager: Error fetching albums: {e}")
             return []
@@ -556,19 +957,169 @@ class LibraryManager(EventDispatcher):
             if cursor: cursor.close()
             self._close_db_connection(conn, "get_albums_by_artist")
 
+    # Keyset pagination: a page is "the next `limit` rows after (sort key, id)", which stays an index range
+    # scan however deep the user has scrolled, unlike OFFSET. Pass the returned cursor back as `after`;
+    # it is None once the last page has been returned.
+    def get_artists_page(self, after=None, limit=BROWSE_PAGE_SIZE):
+        """Returns (artists, next_cursor) ordered by name."""
+        conn = self._get_db_connection()
+        if not conn: return [], None
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            query = f"SELECT id, name, sort_name FROM {DB_ARTISTS_TABLE}"
+            params = []
+            if after is not None:
+                query += " WHERE (sort_name, id) > (?, ?)"
+                params.extend(after)
+            query += " ORDER BY sort_name, id LIMIT ?"
+            params.append(limit)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            artists = [{"id": row["id"], "name": row["name"]} for row in rows]
+            next_cursor = (rows[-1]["sort_name"], rows[-1]["id"]) if len(rows) == limit else None
+            return artists, next_cursor
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error fetching artists page: {e}")
+            return [], None
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_artists_page")
+
+    def get_albums_page(self, artist_id=None, after=None, limit=BROWSE_PAGE_SIZE, genre=None, year=None, decade=None,
+                        sort=None):
+        """
+        Returns (albums, next_cursor), optionally for one artist, genre, year or decade (e.g. 1990).
+        sort is one of the ALBUM_SORT_* orders; by default a decade's albums are ordered by year,
+        all others by name. Those defaults are index reads under every filter; other orders under a
+        genre, year or decade filter sort the matching albums. Albums are shaped like get_albums_by_artist's.
+        """
+        if sort not in _ALBUM_SORTS:
+            sort = ALBUM_SORT_YEAR if decade is not None else ALBUM_SORT_NAME
+        sort_columns, descending = _ALBUM_SORTS[sort]
+        if genre is not None and sort == ALBUM_SORT_NAME:
+            sort_columns = ("s.genre_sort_name", "s.genre_album_id") # idx_album_genres_sort
+        elif (year is not None or decade is not None) and sort == ALBUM_SORT_YEAR:
+            sort_columns = ("s.year", "s.sort_name", "s.album_id") # Every row has a year; idx_album_summary_year
+        conn = self._get_db_connection()
+        if not conn: return [], None
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            sort_keys = ", ".join(f"{column} AS sort_key_{index}" for index, column in enumerate(sort_columns))
+            # A genre's albums come from a view over album_genres joined to album_summary rather than a
+            # join here: with root databases attached both are unions, and a join of two unions is unindexed
+            query = f"SELECT s.*, {sort_keys} FROM {DB_ALBUM_GENRE_SUMMARY_VIEW if genre is not None else DB_ALBUM_SUMMARY_TABLE} s"
+            conditions, params = [], []
+            if genre is not None:
+                conditions.append("s.genre = ?")
+                params.append(genre)
+            if artist_id is not None:
+                conditions.append("s.artist_id = ?")
+                params.append(artist_id)
+            if year is not None:
+                conditions.append("s.year = ?")
+                params.append(year)
+            if decade is not None:
+                conditions.append("s.year BETWEEN ? AND ?")
+                params.extend((decade, decade + 9))
+            if after is not None:
+                comparison = "<" if descending else ">"
+                # The bound on the leading key lets SQLite seek into the expression index, which it
+                # doesn't do for the row value comparison alone
+                conditions.append(f"{sort_columns[0]} {comparison}= ?")
+                conditions.append(f"({', '.join(sort_columns)}) {comparison} ({', '.join('?' * len(sort_columns))})")
+                params.append(after[0])
+                params.extend(after)
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY " + ", ".join(f"{column}{' DESC' if descending else ''}" for column in sort_columns)
+            query += " LIMIT ?"
+            params.append(limit)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            albums = [self._album_summary_dict(row) for row in rows]
+            next_cursor = (tuple(rows[-1][f"sort_key_{index}"] for index in range(len(sort_columns)))
+                           if len(rows) == limit else None)
+            return albums, next_cursor
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error fetching albums page: {e}")
+            return [], None
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_albums_page")
+
+    # Genre, year and decade lists with album and track counts, each read from an index on the
+    # album-level tables (album_genres, album_summary) rather than by grouping tracks.
+    def _get_facets(self, query, caller_info):
+        conn = self._get_db_connection()
+        if not conn: return []
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query)
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error in {caller_info}: {e}")
+            return []
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, caller_info)
+
+    def get_genres(self):
+        """[{'name', 'album_count', 'track_count'}] ordered by name."""
+        return self._get_facets(f"""
+            SELECT genre as name, COUNT(*) as album_count, SUM(track_count) as track_count
+            FROM {DB_ALBUM_GENRES_TABLE} GROUP BY genre ORDER BY genre
+        """, "get_genres")
+
+    def get_years(self):
+        """[{'year', 'album_count', 'track_count'}], most recent first."""
+        return self._get_facets(f"""
+            SELECT year, COUNT(*) as album_count, SUM(track_count) as track_count
+            FROM {DB_ALBUM_SUMMARY_TABLE} WHERE year IS NOT NULL GROUP BY year ORDER BY year DESC
+        """, "get_years")
+
+    def get_decades(self):
+        """[{'decade', 'album_count', 'track_count'}] (decade as 1990 etc.), most recent first."""
+        return self._get_facets(f"""
+            SELECT year / 10 * 10 as decade, COUNT(*) as album_count, SUM(track_count) as track_count
+            FROM {DB_ALBUM_SUMMARY_TABLE} WHERE year IS NOT NULL GROUP BY decade ORDER BY decade DESC
+        """, "get_decades")
+
+    def get_album_detail(self, album_id):
+        """
+        Everything the album screen needs in one call: the album's summary (name, album artist,
+        year, art path, ...) plus its tracks under "tracks". Both are primary-key lookups, so the cost
+        doesn't depend on library size. Returns None if the album doesn't exist.
+        """
+        conn = self._get_db_connection()
+        if not conn: return None
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM {DB_ALBUM_SUMMARY_TABLE} WHERE album_id = ?", (album_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            album = self._album_summary_dict(row)
+            cursor.execute(_ALBUM_TRACKS_QUERY, (album_id,))
+            album["tracks"] = [dict(track_row) for track_row in cursor.fetchall()]
+            return album
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error fetching album {album_id}: {e}")
+            return None
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_album_detail")
+
     def get_tracks_by_album(self, album_id):
         conn = self._get_db_connection()
         if not conn: return []
         cursor = None
         try:
             cursor = conn.cursor()
-            cursor.execute(f"""
-                SELECT t.id, t.filepath, t.title, t.track_number, t.disc_number, t.duration, ar.name as artist_name
-                FROM {DB_TRACKS_TABLE} t
-                LEFT JOIN {DB_ARTISTS_TABLE} ar ON t.artist_id = ar.id
-                WHERE t.album_id = ?
-                ORDER BY t.disc_number, t.track_number, t.title COLLATE NOCASE
-            """, (album_id,))
+            cursor.execute(_ALBUM_TRACKS_QUERY, (album_id,))
             return [dict(row) for row in cursor.fetchall()] # Convert rows to dicts
         except sqlite3.Error as e:
             Logger.error(f"LibraryManager: Error fetching tracks for album {album_id}: {e}")
@@ -578,6 +1129,72 @@ class LibraryManager(EventDispatcher):
             self._close_db_connection(conn, "get_tracks_by_album")
             
     def get_track_details_by_filepath(self, filepath):
+        found, details = self._track_cache.get_by_path(filepath)
+        if found:
+            return details
+        return self._fetch_track_details("filepath", filepath)
+
+    def get_track_details_by_id(self, track_id):
+        found, details = self._track_cache.get_by_id(track_id)
+        if found:
+            return details
+        return self._fetch_track_details("id", track_id)
+
+    def get_track_details_bulk(self, paths_or_ids):
+        """
+        Resolves many tracks at once: {key: details} for every key found in the library, where a
+        key is a filepath (str) or a track id (int). Cached records are used as they are; the rest
+        are read with chunked IN lists, so a 5,000-track queue costs a handful of queries.
+        """
+        generation = self._track_cache.generation
+        results = {}
+        missing_paths, missing_ids = [], []
+        for key in dict.fromkeys(paths_or_ids): # Unique, in order
+            if isinstance(key, str):
+                found, details = self._track_cache.get_by_path(key)
+                pending = missing_paths
+            else:
+                found, details = self._track_cache.get_by_id(key)
+                pending = missing_ids
+            if details:
+                results[key] = details
+            elif not found:
+                pending.append(key)
+        if not missing_paths and not missing_ids:
+            return results
+
+        conn = self._get_db_connection()
+        if not conn: return results
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            for column, keys in (("filepath", missing_paths), ("id", missing_ids)):
+                for start in range(0, len(keys), SQL_MAX_VARIABLES):
+                    chunk = keys[start:start + SQL_MAX_VARIABLES]
+                    cursor.execute(f"""
+                        SELECT t.id, t.filepath, t.title, t.duration, t.track_number, t.disc_number,
+                               {_ALBUM_NAME} as album, {_ARTIST_NAME} as artist, t.album_id
+                        FROM {DB_TRACKS_TABLE} t
+                        WHERE t.{column} IN ({','.join('?' * len(chunk))})
+                    """, chunk)
+                    for row in cursor.fetchall():
+                        details = dict(row)
+                        self._track_cache.put(details, generation)
+                        results[details[column]] = details
+            for path in missing_paths:
+                if path not in results:
+                    self._track_cache.put_missing(path, generation)
+            return results
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error fetching details for {len(missing_paths) + len(missing_ids)} tracks: {e}")
+            return results
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_track_details_bulk")
+
+    def _fetch_track_details(self, column, value):
+        """Reads one track's details into the cache. column is 'filepath' or 'id'."""
+        generation = self._track_cache.generation
         conn = self._get_db_connection()
         if not conn: return None
         cursor = None
@@ -585,21 +1202,25 @@ class LibraryManager(EventDispatcher):
             cursor = conn.cursor()
             cursor.execute(f"""
                 SELECT t.id, t.filepath, t.title, t.duration, t.track_number, t.disc_number,
-                       al.name as album, ar.name as artist, al.id as album_id
+                       {_ALBUM_NAME} as album, {_ARTIST_NAME} as artist, t.album_id
                 FROM {DB_TRACKS_TABLE} t
-                LEFT JOIN {DB_ALBUMS_TABLE} al ON t.album_id = al.id
-                LEFT JOIN {DB_ARTISTS_TABLE} ar ON t.artist_id = ar.id
-                WHERE t.filepath = ?
-            """, (filepath,))
+                WHERE t.{column} = ?
+            """, (value,))
             row = cursor.fetchone()
-            return dict(row) if row else None # Convert row to dict
+            if not row:
+                if column == "filepath":
+                    self._track_cache.put_missing(value, generation)
+                return None
+            details = dict(row) # Convert row to dict
+            self._track_cache.put(details, generation)
+            return dict(details)
         except sqlite3.Error as e:
-            Logger.error(f"LibraryManager: Error fetching track details for {filepath}: {e}")
+            Logger.error(f"LibraryManager: Error fetching track details for {column} {value}: {e}")
             return None
         finally:
             if cursor: cursor.close()
-            self._close_db_connection(conn, "get_track_details_by_filepath")
-            
+            self._close_db_connection(conn, "_fetch_track_details")
+
     def get_album_art_path_for_file(self, filepath):
         conn = self._get_db_connection()
         if not conn: return None
@@ -607,16 +1228,12 @@ class LibraryManager(EventDispatcher):
         try:
             cursor = conn.cursor()
             cursor.execute(f"""
-                SELECT al.art_filename
+                SELECT (SELECT art_filename FROM {DB_ALBUMS_TABLE} WHERE id = t.album_id AND has_art = 1) as art_filename
                 FROM {DB_TRACKS_TABLE} t
-                JOIN {DB_ALBUMS_TABLE} al ON t.album_id = al.id
-                WHERE t.filepath = ? AND al.art_filename IS NOT NULL
+                WHERE t.filepath = ?
             """, (filepath,))
             row = cursor.fetchone()
-            if row and row['art_filename']:
-                full_path = self.art_cache_dir / row['art_filename']
-                return str(full_path) if full_path.exists() else None
-            return None
+            return str(self.art_cache_dir / row['art_filename']) if row and row['art_filename'] else None
         except sqlite3.Error as e:
             Logger.error(f"LibraryManager: Error fetching album art path for file {filepath}: {e}")
             return None
@@ -624,19 +1241,305 @@ class LibraryManager(EventDispatcher):
             if cursor: cursor.close()
             self._close_db_connection(conn, "get_album_art_path_for_file")
 
-    def get_track_filepath(self, track_id): 
+    def get_quarantined_files(self):
+        """Returns files the scanner could not parse, most recent failures first."""
+        conn = self._get_db_connection()
+        if not conn: return []
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT filepath, error, failed_at FROM {DB_SCAN_QUARANTINE_TABLE} ORDER BY failed_at DESC")
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error fetching quarantined files: {e}")
+            return []
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_quarantined_files")
+
+    def clear_quarantined_files(self):
+        """Forgets all parse failures so the next scan retries those files."""
+        conn = self._get_db_connection()
+        if not conn: return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cleared = 0
+            for schema in library_schemas(conn): # Root databases keep their own quarantine
+                cursor.execute(f"DELETE FROM {schema}.{DB_SCAN_QUARANTINE_TABLE}")
+                cleared += cursor.rowcount
+            conn.commit()
+            Logger.info(f"LibraryManager: Cleared {cleared} quarantined files.")
+            return True
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error clearing quarantined files: {e}")
+            conn.rollback()
+            return False
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "clear_quarantined_files")
+
+    def record_play_events(self, events, refresh_smart_playlists=True):
+        """
+        Appends (track_id, event, played_at, position_ms) tuples to the play history and folds them
+        into track_stats in the same transaction, so the counters can never drift from the log.
+        Returns True once written. refresh_smart_playlists=False (the shutdown flush, which runs on
+        the main thread) skips re-evaluating the played tracks' smart playlist membership and only
+        marks the play-count/last-played playlists stale, so they are refilled when next opened.
+        """
+        rollup = {} # track_id -> [plays, skips, last_played]
+        for track_id, event, played_at, _ in events:
+            counters = rollup.setdefault(track_id, [0, 0, played_at])
+            if event == PLAY_EVENT_FINISH: counters[0] += 1
+            elif event == PLAY_EVENT_SKIP: counters[1] += 1
+            counters[2] = max(counters[2], played_at)
+        conn = self._get_db_connection()
+        if not conn: return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            # Tracks removed since the event was buffered are dropped by the EXISTS checks
+            cursor.executemany(f"""
+                INSERT INTO {DB_PLAY_HISTORY_TABLE} (track_id, event, played_at, position_ms)
+                SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM {DB_TRACKS_TABLE} WHERE id = ?)
+            """, [(track_id, event, played_at, position_ms, track_id) for track_id, event, played_at, position_ms in events])
+            cursor.executemany(f"""
+                INSERT INTO {DB_TRACK_STATS_TABLE} (track_id, play_count, skip_count, last_played)
+                SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM {DB_TRACKS_TABLE} WHERE id = ?)
+                ON CONFLICT(track_id) DO UPDATE SET
+                    play_count = play_count + excluded.play_count,
+                    skip_count = skip_count + excluded.skip_count,
+                    last_played = MAX(COALESCE(last_played, 0), excluded.last_played)
+            """, [(track_id, plays, skips, last_played, track_id) for track_id, (plays, skips, last_played) in rollup.items()])
+            if not refresh_smart_playlists:
+                self._mark_stats_smart_playlists_stale(cursor)
+            conn.commit()
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error recording {len(events)} playback events: {e}")
+            conn.rollback()
+            return False
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "record_play_events")
+        if refresh_smart_playlists:
+            self._refresh_smart_playlists(list(rollup), stats_only=True)
+        return True
+
+    def _get_ranked_tracks(self, where, order_by, limit, caller_info):
+        # Walks one of the track_stats indexes and stops after `limit` rows, however long the history.
+        # The tracks are then read by id, which stays a lookup when tracks is a union view (see library_shards).
+        conn = self._get_db_connection()
+        if not conn: return []
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""SELECT track_id, play_count, skip_count, last_played FROM {DB_TRACK_STATS_TABLE} s
+                               WHERE {where} ORDER BY {order_by} LIMIT ?""", (limit,))
+            ranked = cursor.fetchall()
+            if not ranked:
+                return []
+            cursor.execute(f"""
+                SELECT t.id, t.filepath, t.title, t.duration, {_ARTIST_NAME} as artist_name, {_ALBUM_NAME} as album_name
+                FROM {DB_TRACKS_TABLE} t
+                WHERE t.id IN ({','.join('?' * len(ranked))})
+            """, [row["track_id"] for row in ranked])
+            tracks = {row["id"]: dict(row) for row in cursor.fetchall()}
+            return [dict(tracks[row["track_id"]], play_count=row["play_count"], skip_count=row["skip_count"],
+                         last_played=row["last_played"])
+                    for row in ranked if row["track_id"] in tracks]
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error in {caller_info}: {e}")
+            return []
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, caller_info)
+
+    def get_most_played(self, limit=PLAY_HISTORY_TOP_LIMIT):
+        return self._get_ranked_tracks("s.play_count > 0", "s.play_count DESC, s.last_played DESC", limit, "get_most_played")
+
+    def get_recently_played(self, limit=PLAY_HISTORY_TOP_LIMIT):
+        return self._get_ranked_tracks("s.last_played IS NOT NULL", "s.last_played DESC", limit, "get_recently_played")
+
+    def get_most_skipped(self, limit=PLAY_HISTORY_TOP_LIMIT):
+        return self._get_ranked_tracks("s.skip_count > 0", "s.skip_count DESC, s.last_played DESC", limit, "get_most_skipped")
+
+    # --- Smart playlists ---
+    # Members are materialized in smart_playlist_tracks when a playlist is saved, then kept current by
+    # re-evaluating only the tracks named in library change events and play history batches.
+    def create_smart_playlist(self, name, rules):
+        """Saves a rule-based playlist and fills it. Returns its id, or None if it couldn't be saved. Raises SmartPlaylistError for bad rules."""
+        compiled = compile_rules(rules)
         conn = self._get_db_connection()
         if not conn: return None
         cursor = None
         try:
             cursor = conn.cursor()
-            cursor.execute(f"SELECT filepath FROM {DB_TRACKS_TABLE} WHERE id = ?", (track_id,))
-            row = cursor.fetchone()
-            return row['filepath'] if row else None
+            now = time.time()
+            cursor.execute(f"INSERT INTO {DB_SMART_PLAYLISTS_TABLE} (name, rules, created_at, refreshed_at) VALUES (?, ?, ?, ?)",
+                           (name, json.dumps(rules), now, now))
+            playlist_id = cursor.lastrowid
+            refresh_members(cursor, playlist_id, compiled, schemas=library_schemas(conn))
+            conn.commit()
+            Logger.info(f"LibraryManager: Created smart playlist '{name}' (id {playlist_id}).")
+            return playlist_id
         except sqlite3.Error as e:
-            Logger.error(f"LibraryManager: Error fetching filepath for track {track_id}: {e}")
+            Logger.error(f"LibraryManager: Error creating smart playlist '{name}': {e}")
+            conn.rollback()
             return None
         finally:
             if cursor: cursor.close()
-            self._close_db_connection(conn, "get_track_filepath")
+            self._close_db_connection(conn, "create_smart_playlist")
+
+    def update_smart_playlist(self, playlist_id, name=None, rules=None):
+        """Renames a smart playlist and/or replaces its rules (which refills it). Returns True on success."""
+        if name is None and rules is None: return True
+        compiled = compile_rules(rules) if rules is not None else None
+        conn = self._get_db_connection()
+        if not conn: return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""UPDATE {DB_SMART_PLAYLISTS_TABLE}
+                               SET name = COALESCE(?, name), rules = COALESCE(?, rules), refreshed_at = COALESCE(?, refreshed_at)
+                               WHERE id = ?""",
+                           (name, json.dumps(rules) if compiled is not None else None,
+                            time.time() if compiled is not None else None, playlist_id))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            if compiled is not None:
+                refresh_members(cursor, playlist_id, compiled, schemas=library_schemas(conn))
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error updating smart playlist {playlist_id}: {e}")
+            conn.rollback()
+            return False
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "update_smart_playlist")
+
+    def delete_smart_playlist(self, playlist_id):
+        conn = self._get_db_connection()
+        if not conn: return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM {DB_SMART_PLAYLISTS_TABLE} WHERE id = ?", (playlist_id,)) # Members go with it (trigger)
+            conn.commit()
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error deleting smart playlist {playlist_id}: {e}")
+            conn.rollback()
+            return False
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "delete_smart_playlist")
+
+    def get_smart_playlists(self):
+        conn = self._get_db_connection()
+        if not conn: return []
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT p.id, p.name, p.rules,
+                       (SELECT COUNT(*) FROM {DB_SMART_PLAYLIST_TRACKS_TABLE} m WHERE m.playlist_id = p.id) as track_count
+                FROM {DB_SMART_PLAYLISTS_TABLE} p
+                ORDER BY p.name COLLATE NOCASE
+            """)
+            return [{"id": row["id"], "name": row["name"], "rules": json.loads(row["rules"]), "track_count": row["track_count"]}
+                    for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryManager: Error fetching smart playlists: {e}")
+            return []
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_smart_playlists")
+
+    def get_smart_playlist_tracks(self, playlist_id):
+        """Tracks of a smart playlist, read from its materialized members in the playlist's order."""
+        conn = self._get_db_connection()
+        if not conn: return []
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT rules, refreshed_at FROM {DB_SMART_PLAYLISTS_TABLE} WHERE id = ?", (playlist_id,))
+            playlist_row = cursor.fetchone()
+            if not playlist_row:
+                return []
+            compiled = compile_rules(playlist_row["rules"])
+            # refreshed_at is cleared when play counts changed without a refresh (see record_play_events)
+            if playlist_row["refreshed_at"] is None or (
+                    compiled.time_relative and time.time() - playlist_row["refreshed_at"] > SMART_PLAYLIST_CLOCK_REFRESH_SECONDS):
+                refresh_members(cursor, playlist_id, compiled, schemas=library_schemas(conn))
+                cursor.execute(f"UPDATE {DB_SMART_PLAYLISTS_TABLE} SET refreshed_at = ? WHERE id = ?", (time.time(), playlist_id))
+                conn.commit()
+            # One select per database (see library_shards), sorted together on the selected sort keys
+            schemas = library_schemas(conn)
+            sort_keys = ", ".join(f"{expr} as sort_key_{index}" for index, (expr, _) in enumerate(compiled.order_terms))
+            cursor.execute(" UNION ALL ".join(f"""
+                SELECT t.id, t.filepath, t.title, t.track_number, t.disc_number, t.duration,
+                       ar.name as artist_name, al.name as album_name, {sort_keys}
+                FROM main.{DB_SMART_PLAYLIST_TRACKS_TABLE} m
+                JOIN {schema}.{DB_TRACKS_TABLE} t ON t.id = m.track_id
+                {smart_playlist_joins(schema)}
+                WHERE m.playlist_id = ?""" for schema in schemas)
+                + " ORDER BY " + ", ".join(f"sort_key_{index}{suffix}" for index, (_, suffix) in enumerate(compiled.order_terms)),
+                (playlist_id,) * len(schemas))
+            return [{key: row[key] for key in row.keys() if not key.startswith("sort_key_")} for row in cursor.fetchall()]
+        except (sqlite3.Error, SmartPlaylistError) as e:
+            Logger.error(f"LibraryManager: Error fetching tracks of smart playlist {playlist_id}: {e}")
+            if conn.in_transaction: conn.rollback()
+            return []
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "get_smart_playlist_tracks")
+
+    @staticmethod
+    def _mark_stats_smart_playlists_stale(cursor):
+        # Compiling rules only parses them, so this stays cheap however large the library is
+        cursor.execute(f"SELECT id, rules FROM {DB_SMART_PLAYLISTS_TABLE}")
+        stale_ids = []
+        for playlist_row in cursor.fetchall():
+            try:
+                if compile_rules(playlist_row["rules"]).uses_stats:
+                    stale_ids.append((playlist_row["id"],))
+            except SmartPlaylistError:
+                continue
+        cursor.executemany(f"UPDATE {DB_SMART_PLAYLISTS_TABLE} SET refreshed_at = NULL WHERE id = ?", stale_ids)
+
+    def _refresh_smart_playlists(self, track_ids, stats_only=False):
+        """
+        Re-evaluates the given tracks against every smart playlist (stats_only: only playlists with
+        play-count/last-played rules). track_ids=None refills those playlists from the whole library.
+        """
+        conn = self._get_db_connection()
+        if not conn: return
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT id, rules FROM {DB_SMART_PLAYLISTS_TABLE}")
+            playlists = cursor.fetchall()
+            for playlist_row in playlists:
+                compiled = compile_rules(playlist_row["rules"])
+                if stats_only and not compiled.uses_stats:
+                    continue
+                refresh_members(cursor, playlist_row["id"], compiled, track_ids, library_schemas(conn))
+                if track_ids is None:
+                    cursor.execute(f"UPDATE {DB_SMART_PLAYLISTS_TABLE} SET refreshed_at = ? WHERE id = ?",
+                                   (time.time(), playlist_row["id"]))
+            if playlists:
+                conn.commit()
+        except (sqlite3.Error, SmartPlaylistError) as e:
+            Logger.error(f"LibraryManager: Error refreshing smart playlists"
+                         f"{f' for {len(track_ids)} tracks' if track_ids is not None else ''}: {e}")
+            if conn.in_transaction: conn.rollback()
+        finally:
+            if cursor: cursor.close()
+            self._close_db_connection(conn, "_refresh_smart_playlists")
+
+    def get_track_filepath(self, track_id): 
+        details = self.get_track_details_by_id(track_id)
+        return details['filepath'] if details else None
 
@@ -0,0 +1,598 @@
+# dad_player/core/library_scanner.py
+import sqlite3
+import os
+import threading
+import hashlib
+import base64
+import time
+from pathlib import Path
+from kivy.logger import Logger
+
+import mutagen
+
+from dad_player.constants import (
+    SUPPORTED_AUDIO_EXTENSIONS, ALBUM_ART_GRID_SIZE,
+    DB_TRACKS_TABLE, DB_ALBUMS_TABLE, DB_ARTISTS_TABLE, DB_SCAN_QUARANTINE_TABLE,
+    DB_TRACK_STATS_TABLE, DB_PLAYLIST_TRACKS_TABLE, DB_LIBRARY_STATS_TABLE
+)
+from dad_player.utils import generate_file_hash, sanitize_filename_for_cache
+from .image_utils import resize_image_data
+from .track_path_index import TrackPathIndex, path_prefix_bounds
+from .art_cache import art_cache_key
+from .sort_keys import sort_key
+from .db_connection import connect, close_connection
+from .library_shards import owning_root, forget_shard_tracks
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+# Message kinds emitted by the scanning engine. In thread mode they are passed to a callback,
+# in process mode they are sent over a multiprocessing Pipe as (kind, payload) tuples.
+SCAN_MSG_STATUS = "status"      # (message,)
+SCAN_MSG_PROGRESS = "progress"  # (files_scanned, total_files, message)
+SCAN_MSG_CHANGES = "changes"    # ({'added': [track_ids], 'updated': [track_ids], 'removed': [track_ids]},)
+SCAN_MSG_DONE = "done"          # (message, cancelled_bool)
+SCAN_MSG_TRACKS_READY = "tracks_ready"  # ([filepaths],) - imported files ready to be queued, in order
+
+
+class LibraryScanner:
+    """
+    The library scanning engine: walks music folders and writes tracks, albums and artists.
+    Owns its own DB connection and has no Kivy UI dependencies, so it can run either in a
+    background thread or in a child process (see run_scanner_process).
+    """
+
+    def __init__(self, db_path, art_cache_dir, emit, should_continue, shards=None):
+        self.db_path = db_path
+        self.shards = dict(shards or {}) # Music root -> path of its own database (see library_shards)
+        self.art_cache_dir = Path(art_cache_dir)
+        self._emit = emit
+        self._should_continue = should_continue
+        self._pending_changes = {'added': [], 'updated': [], 'removed': []}
+        self._quarantine = {} # filepath -> (filesize, last_modified) of files that failed to parse
+        self.verify_hashes = False # When True, unchanged stat signatures are re-verified by content hash
+        self.files_skipped_quarantined = 0
+
+    def _get_db_connection(self):
+        try:
+            return connect(self.db_path)
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryScanner: Database connection error: {e}")
+            return None
+
+    def _flush_changes(self):
+        if any(self._pending_changes.values()):
+            self._emit(SCAN_MSG_CHANGES, self._pending_changes)
+            self._pending_changes = {'added': [], 'updated': [], 'removed': []}
+
+    def _load_quarantine(self, conn):
+        """Adds the quarantine of conn's database; each root database keeps its own."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT filepath, filesize, last_modified FROM {DB_SCAN_QUARANTINE_TABLE}")
+            quarantine = {row['filepath']: (row['filesize'], row['last_modified']) for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryScanner: Error loading scan quarantine: {e}")
+            quarantine = {}
+        finally:
+            cursor.close()
+        if quarantine:
+            Logger.info(f"LibraryScanner: {len(quarantine)} quarantined files will be skipped unless changed.")
+        self._quarantine.update(quarantine)
+
+    def _connection_for(self, path, connections):
+        """
+        Connection to the database path belongs in: its music root's own database if it has one,
+        else the library database. connections maps database paths to the connections opened so far.
+        """
+        root = owning_root(self.shards, path)
+        db_path = str(self.shards[root] if root else self.db_path)
+        conn = connections.get(db_path)
+        if conn is None:
+            conn = connect(db_path)
+            connections[db_path] = conn
+            self._load_quarantine(conn)
+        return conn
+
+    def _remove_obsolete(self, connections, music_folders, targeted, scanned_filepaths_set):
+        """
+        Full rescan: deletes the tracks and quarantine entries of files the scan no longer found, from
+        the library database and every root database. Targeted scans only judge files below music_folders.
+        """
+        main_conn = connections[str(self.db_path)]
+        scanned_prefixes = tuple(path_prefix_bounds(folder_path)[0] for folder_path in music_folders)
+        obsolete_quarantined = [
+            (fp,) for fp in self._quarantine
+            if fp not in scanned_filepaths_set and (not targeted or fp.startswith(scanned_prefixes))
+        ]
+        for conn in connections.values():
+            cursor = conn.cursor()
+            try:
+                if targeted:
+                    # Only tracks below the scanned roots can be judged obsolete
+                    db_tracks = []
+                    for folder_path in music_folders:
+                        lower, upper = path_prefix_bounds(folder_path)
+                        cursor.execute(f"SELECT id, filepath FROM {DB_TRACKS_TABLE} WHERE filepath >= ? AND filepath < ?", (lower, upper))
+                        db_tracks.extend(cursor.fetchall())
+                else:
+                    cursor.execute(f"SELECT id, filepath FROM {DB_TRACKS_TABLE}")
+                    db_tracks = cursor.fetchall()
+                # Efficiently find obsolete tracks: tracks in DB but not in current scan
+                obsolete_track_ids = [track['id'] for track in db_tracks if track['filepath'] not in scanned_filepaths_set]
+
+                if obsolete_quarantined:
+                    cursor.executemany(f"DELETE FROM {DB_SCAN_QUARANTINE_TABLE} WHERE filepath = ?", obsolete_quarantined)
+                    conn.commit()
+
+                if obsolete_track_ids:
+                    obsolete_params = [(track_id,) for track_id in obsolete_track_ids]
+                    cursor.executemany(f"DELETE FROM {DB_TRACKS_TABLE} WHERE id = ?", obsolete_params)
+                    if conn is main_conn:
+                        cursor.executemany(f"DELETE FROM {DB_TRACK_STATS_TABLE} WHERE track_id = ?", obsolete_params)
+                        cursor.executemany(f"DELETE FROM {DB_PLAYLIST_TRACKS_TABLE} WHERE track_id = ?", obsolete_params)
+                    else:
+                        conn.commit()
+                        forget_shard_tracks(main_conn.cursor(), obsolete_track_ids)
+                    main_conn.commit()
+                    self._pending_changes['removed'].extend(obsolete_track_ids)
+                    self._flush_changes()
+                    Logger.info(f"LibraryScanner: Removed {len(obsolete_track_ids)} obsolete tracks from DB.")
+            except sqlite3.Error as e_obs:
+                Logger.error(f"LibraryScanner: Error during obsolete track removal: {e_obs}")
+                conn.rollback()
+                main_conn.rollback()
+            finally:
+                cursor.close()
+
+    def _quarantine_file(self, cursor, filepath, file_stat, error):
+        """Records a parse failure with the file's stat signature so unchanged files are skipped next time."""
+        Logger.warning(f"LibraryScanner: Quarantining unreadable file {filepath}: {error}")
+        try:
+            cursor.execute(f"""INSERT OR REPLACE INTO {DB_SCAN_QUARANTINE_TABLE}
+                            (filepath, filesize, last_modified, error, failed_at) VALUES (?, ?, ?, ?, ?)""",
+                           (filepath, file_stat.st_size, file_stat.st_mtime, str(error)[:500], time.time()))
+            self._quarantine[filepath] = (file_stat.st_size, file_stat.st_mtime)
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryScanner: Could not quarantine {filepath}: {e}")
+
+    def _get_or_create_artist_id(self, cursor, artist_name):
+        if not artist_name or not artist_name.strip(): return None
+        artist_name = artist_name.strip()
+        cursor.execute(f"SELECT id FROM {DB_ARTISTS_TABLE} WHERE name = ?", (artist_name,))
+        row = cursor.fetchone()
+        if row: return row['id']
+        try:
+            cursor.execute(f"INSERT INTO {DB_ARTISTS_TABLE} (name, sort_name) VALUES (?, ?)", (artist_name, sort_key(artist_name)))
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            cursor.execute(f"SELECT id FROM {DB_ARTISTS_TABLE} WHERE name = ?", (artist_name,))
+            row = cursor.fetchone()
+            return row['id'] if row else None
+
+    def _get_or_create_album_id(self, cursor, album_name, album_artist_id, year=None):
+        if not album_name or not album_name.strip(): return None
+        album_name = album_name.strip()
+        # Standardize query for album lookup
+        query = f"SELECT id FROM {DB_ALBUMS_TABLE} WHERE name = ? AND "
+        params = [album_name]
+        if album_artist_id is not None:
+            query += "artist_id = ?"
+            params.append(album_artist_id)
+        else:
+            query += "artist_id IS NULL"
+
+        cursor.execute(query, tuple(params))
+        row = cursor.fetchone()
+        if row: return row['id']
+        try:
+            cursor.execute(f"INSERT INTO {DB_ALBUMS_TABLE} (name, artist_id, year, sort_name) VALUES (?, ?, ?, ?)",
+                           (album_name, album_artist_id, year, sort_key(album_name)))
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            cursor.execute(query, tuple(params))
+            row = cursor.fetchone()
+            return row['id'] if row else None
+
+    def _cache_album_art(self, raw_art_data, album_id, album_name):
+        """Writes the album's grid thumbnail. Returns (art_filename, art_key), or None."""
+
+        if not raw_art_data or not PILImage: return None
+
+
+        resized_stream = resize_image_data(raw_art_data, target_max_dim=ALBUM_ART_GRID_SIZE, output_format="WEBP", quality=80)
+        file_ext = ".webp"
+        if not resized_stream:
+             resized_stream = resize_image_data(raw_art_data, target_max_dim=ALBUM_ART_GRID_SIZE, output_format="PNG")
+             file_ext = ".png"
+
+        if resized_stream:
+            sanitized_album_name = sanitize_filename_for_cache(album_name if album_name else "unknown_album")
+            name_hash = hashlib.md5(f"{album_id}_{sanitized_album_name}".encode()).hexdigest()[:10]
+            art_filename = f"art_{name_hash}{file_ext}"
+            art_filepath = self.art_cache_dir / art_filename
+            image_bytes = resized_stream.getvalue()
+            try:
+                with open(art_filepath, 'wb') as f:
+                    f.write(image_bytes)
+                Logger.info(f"LibraryScanner: Cached album art to {art_filepath}")
+                return art_filename, art_cache_key(image_bytes)
+            except IOError as e:
+                Logger.error(f"LibraryScanner: Error writing cached album art {art_filepath}: {e}")
+        return None
+
+    def _lookup_track(self, cursor, filepath):
+        cursor.execute(f"SELECT id, filesize, last_modified, filehash FROM {DB_TRACKS_TABLE} WHERE filepath = ?", (filepath,))
+        row = cursor.fetchone()
+        return (row['id'], row['filesize'], row['last_modified'], row['filehash']) if row else None
+
+    def _process_file_metadata(self, filepath, conn, path_index=None):
+        cursor = None
+        file_stat = None
+        try:
+            cursor = conn.cursor() # Use the provided connection's cursor
+            file_stat = os.stat(filepath)
+            last_modified = file_stat.st_mtime
+
+            quarantined_signature = self._quarantine.get(filepath)
+            if quarantined_signature is not None:
+                if quarantined_signature == (file_stat.st_size, last_modified):
+                    self.files_skipped_quarantined += 1
+                    return False
+                # File changed since it failed; give it another chance.
+                cursor.execute(f"DELETE FROM {DB_SCAN_QUARANTINE_TABLE} WHERE filepath = ?", (filepath,))
+                del self._quarantine[filepath]
+
+            # Change detection: a dict lookup in the preloaded root index when available
+            existing_track = path_index.lookup(cursor, filepath) if path_index else self._lookup_track(cursor, filepath)
+            if existing_track:
+                existing_id, existing_size, existing_mtime, existing_hash = existing_track
+                if not self.verify_hashes and existing_size == file_stat.st_size and existing_mtime == last_modified:
+                    return False # Stat signature unchanged; skip hashing and parsing
+
+            current_file_hash = generate_file_hash(filepath)
+
+            if existing_track and existing_mtime == last_modified and existing_hash == current_file_hash:
+                if existing_size != file_stat.st_size:
+                    # Row predates the filesize column; backfill it so the next scan can skip the hash.
+                    cursor.execute(f"UPDATE {DB_TRACKS_TABLE} SET filesize = ? WHERE id = ?", (file_stat.st_size, existing_id))
+                    if path_index: path_index.put(filepath, existing_id, file_stat.st_size, last_modified, current_file_hash)
+                return False
+
+            audio = mutagen.File(filepath, easy=True)
+            if not audio:
+                self._quarantine_file(cursor, filepath, file_stat, "Unrecognized audio format or unreadable metadata")
+                return False
+
+            # Extract common tags, providing defaults
+            title = str(audio.get('title', [os.path.splitext(os.path.basename(filepath))[0]])[0]) if audio.get('title') else os.path.splitext(os.path.basename(filepath))[0]
+            artist = str(audio.get('artist', ['Unknown Artist'])[0]) if audio.get('artist') else "Unknown Artist"
+            album = str(audio.get('album', ['Unknown Album'])[0]) if audio.get('album') else "Unknown Album"
+            albumartist = str(audio.get('albumartist', [artist])[0]) if audio.get('albumartist') else artist
+
+            track_num_str = str(audio.get('tracknumber', ['0'])[0]).split('/')[0] if audio.get('tracknumber') else '0'
+            disc_num_str = str(audio.get('discnumber', ['0'])[0]).split('/')[0] if audio.get('discnumber') else '0'
+            track_num = int(track_num_str) if track_num_str.isdigit() else None
+            disc_num = int(disc_num_str) if disc_num_str.isdigit() else None
+
+            genre = str(audio.get('genre', [''])[0]) if audio.get('genre') else None
+            date_str = str(audio.get('date', [audio.get('originaldate', [''])[0]])[0]) if audio.get('date') or audio.get('originaldate') else None
+            year = None
+            if date_str:
+                if len(date_str) >= 4 and date_str[:4].isdigit(): year = int(date_str[:4])
+                elif date_str.isdigit() and len(date_str) == 4 : year = int(date_str)
+
+            duration = audio.info.length if hasattr(audio, 'info') and hasattr(audio.info, 'length') else 0.0
+
+            # Get/Create IDs for artist and album
+            track_artist_id = self._get_or_create_artist_id(cursor, artist)
+            album_artist_id_for_album_table = self._get_or_create_artist_id(cursor, albumartist)
+            album_id = self._get_or_create_album_id(cursor, album, album_artist_id_for_album_table, year)
+
+            # Process album art
+            art_filename = None
+            if album_id:
+                cursor.execute(f"SELECT art_filename, has_art FROM {DB_ALBUMS_TABLE} WHERE id = ?", (album_id,))
+                album_row = cursor.fetchone()
+                if album_row and not album_row['has_art']: # No art yet, or its cached file has gone
+                    raw_art_data = None
+                    try:
+                        # Attempt to get embedded art (more comprehensive checks)
+                        detailed_audio = mutagen.File(filepath)
+                        if detailed_audio:
+                            if 'APIC:' in detailed_audio:
+                                raw_art_data = detailed_audio['APIC:'].data
+                            elif hasattr(detailed_audio, 'pictures') and detailed_audio.pictures:
+                                raw_art_data = detailed_audio.pictures[0].data
+                            elif 'metadata_block_picture' in detailed_audio:
+                                pic_data_b64_list = detailed_audio.get('metadata_block_picture')
+                                if pic_data_b64_list:
+                                    pic_data_b64 = pic_data_b64_list[0]
+                                    raw_art_data = base64.b64decode(pic_data_b64.split('|')[-1] if isinstance(pic_data_b64, str) and '|' in pic_data_b64 else pic_data_b64)
+
+                        if raw_art_data:
+                            cached_art = self._cache_album_art(raw_art_data, album_id, album)
+                            if cached_art:
+                                art_filename, art_key = cached_art
+                                cursor.execute(f"""UPDATE {DB_ALBUMS_TABLE} SET art_filename = ?, has_art = 1, art_key = ?, art_sizes = ?
+                                                   WHERE id = ?""", (art_filename, art_key, str(ALBUM_ART_GRID_SIZE), album_id))
+                    except Exception as e_art:
+                        Logger.warning(f"LibraryScanner: Error extracting/caching art for {filepath}: {e_art}")
+                elif album_row:
+                    art_filename = album_row['art_filename']
+
+            if existing_track:
+                track_data_tuple_update = (
+                    current_file_hash, title, album_id, track_artist_id, track_num,
+                    disc_num, duration, genre, year, last_modified, file_stat.st_size, existing_id
+                )
+                cursor.execute(f"""UPDATE {DB_TRACKS_TABLE} SET
+                                filehash=?, title=?, album_id=?, artist_id=?, track_number=?,
+                                disc_number=?, duration=?, genre=?, year=?, last_modified=?, filesize=?
+                                WHERE id=?""", track_data_tuple_update)
+                track_id = existing_id
+                self._pending_changes['updated'].append(track_id)
+            else:
+                track_data_tuple_insert = (
+                    filepath, current_file_hash, title, album_id, track_artist_id,
+                    track_num, disc_num, duration, genre, year, last_modified, file_stat.st_size
+                )
+                cursor.execute(f"""INSERT INTO {DB_TRACKS_TABLE}
+                                (filepath, filehash, title, album_id, artist_id, track_number,
+                                disc_number, duration, genre, year, last_modified, filesize)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", track_data_tuple_insert)
+                track_id = cursor.lastrowid
+                self._pending_changes['added'].append(track_id)
+            if path_index:
+                path_index.put(filepath, track_id, file_stat.st_size, last_modified, current_file_hash)
+            # conn.commit() # Commit is handled by run() after a batch
+            return True
+        except mutagen.MutagenError as e:
+            Logger.warning(f"LibraryScanner: Mutagen error for {filepath}: {e}")
+            if cursor and file_stat: self._quarantine_file(cursor, filepath, file_stat, f"Mutagen error: {e}")
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryScanner: DB error processing file {filepath}: {e}")
+        except AttributeError as e:
+            Logger.warning(f"LibraryScanner: Attribute error processing metadata for {filepath}: {e}")
+            if cursor and file_stat: self._quarantine_file(cursor, filepath, file_stat, f"Bad metadata: {e}")
+        except Exception as e:
+            Logger.error(f"LibraryScanner: Unexpected error processing file {filepath}: {e}")
+            import traceback; traceback.print_exc()
+        finally:
+            if cursor:
+                cursor.close()
+        return False
+
+    def run(self, music_folders, full_rescan=False, targeted=False):
+        """
+        Scans music_folders. With targeted=True they are specific roots or subdirectories rather than the
+        whole library, so a full rescan only removes obsolete tracks below them.
+        """
+        scan_thread_id = threading.get_ident()
+        self.verify_hashes = full_rescan
+        Logger.info(f"LibraryScanner: Scan started (pid {os.getpid()}, thread {scan_thread_id}). Folders to scan: {music_folders}")
+
+        files_scanned_so_far = 0
+        total_files_to_scan = 0
+        files_processed_this_scan = 0
+
+        # --- Phase 1: Count total files to scan ---
+        self._emit(SCAN_MSG_STATUS, "Calculating total files...")
+
+        if not self._should_continue(): # Check if scan was cancelled very early
+            Logger.info("LibraryScanner: Scan was externally cancelled right after start (before counting).")
+            self._emit(SCAN_MSG_DONE, "Scan cancelled.", True)
+            return
+
+        for folder_path_idx, folder_path in enumerate(music_folders):
+            if not self._should_continue():
+                Logger.info(f"LibraryScanner: Scan cancelled during file counting (folder {folder_path_idx+1}).")
+                break
+            Logger.info(f"LibraryScanner: >>> Counting in folder: '{folder_path}' (Exists: {os.path.exists(folder_path)}, IsDir: {os.path.isdir(folder_path)})")
+            if not os.path.isdir(folder_path):
+                Logger.warning(f"LibraryScanner: Skipping invalid folder path during count: {folder_path}")
+                continue
+            for root, _, files in os.walk(folder_path):
+                if not self._should_continue():
+                    Logger.info(f"LibraryScanner: Scan cancelled during os.walk (count) in '{root}'.")
+                    break
+                for filename in files:
+                    if filename.lower().endswith(SUPPORTED_AUDIO_EXTENSIONS):
+                        total_files_to_scan += 1
+
+        if not self._should_continue(): # If cancelled during counting phase
+            Logger.info("LibraryScanner: Scan cancelled after (or during) file counting phase.")
+            self._emit(SCAN_MSG_DONE, f"Scan cancelled. Found: 0 of {total_files_to_scan}. Processed in DB: 0.", True)
+            return
+
+        if total_files_to_scan == 0: # No files found to scan
+            final_message = "No music files found in selected folders."
+            Logger.info(f"LibraryScanner: {final_message}")
+            self._emit(SCAN_MSG_DONE, final_message, False)
+            return
+
+        initial_scan_msg = f"Found {total_files_to_scan} files to scan. Processing..."
+        Logger.info(f"LibraryScanner: {initial_scan_msg}")
+        self._emit(SCAN_MSG_PROGRESS, 0, total_files_to_scan, initial_scan_msg)
+
+        # --- Phase 2: Process files and update database ---
+        conn = self._get_db_connection()
+        if not conn:
+            self._emit(SCAN_MSG_DONE, "Scan failed: DB Connection Error", False)
+            return
+        self._load_quarantine(conn)
+        connections = {str(self.db_path): conn} # Plus the root databases the scan writes to, opened on first use
+
+        try:
+            all_filepaths_in_scan = [] # For full rescan, to find obsolete tracks
+
+            for folder_idx, folder_path in enumerate(music_folders):
+                if not self._should_continue(): break
+                Logger.info(f"LibraryScanner: Processing folder content ({folder_idx+1}/{len(music_folders)}): {folder_path}")
+                if not os.path.isdir(folder_path):
+                    Logger.warning(f"LibraryScanner: Skipping invalid folder path during processing: {folder_path}")
+                    continue
+
+                folder_conn = self._connection_for(folder_path, connections)
+                index_cursor = folder_conn.cursor()
+                try:
+                    path_index = TrackPathIndex.load(index_cursor, folder_path)
+                except sqlite3.Error as e_index:
+                    Logger.error(f"LibraryScanner: Could not preload path index for '{folder_path}', using per-file lookups: {e_index}")
+                    path_index = None
+
+                for root, _, files in os.walk(folder_path):
+                    if not self._should_continue(): break
+                    for filename in files:
+                        if not self._should_continue(): break
+                        if filename.lower().endswith(SUPPORTED_AUDIO_EXTENSIONS):
+                            filepath = os.path.join(root, filename)
+                            Logger.debug(f"LibraryScanner: Processing audio file: {filepath}")
+                            all_filepaths_in_scan.append(filepath) # Add to list for obsolete check
+
+                            file_conn = self._connection_for(filepath, connections) if self.shards else folder_conn
+                            if self._process_file_metadata(filepath, file_conn, path_index if file_conn is folder_conn else None):
+                                files_processed_this_scan += 1
+
+                            files_scanned_so_far += 1 # Increment for each supported file encountered for processing attempt
+
+                            # Update progress every N files
+                            if files_scanned_so_far % 10 == 0:
+                                current_msg = f"Scanned: {files_scanned_so_far}/{total_files_to_scan} files..."
+                                self._emit(SCAN_MSG_PROGRESS, files_scanned_so_far, total_files_to_scan, current_msg)
+                index_cursor.close()
+                path_index = None # Release the root's index before loading the next one
+                if self._should_continue():
+                    self._commit_all(connections) # Commit after each folder
+                    self._flush_changes()
+                else: break # If scan cancelled, break outer loop
+
+            if self._should_continue():
+                self._commit_all(connections) # Final commit for any remaining operations
+                self._flush_changes()
+
+            # --- Phase 3: Full Rescan - Remove obsolete tracks ---
+            if full_rescan and self._should_continue():
+                Logger.info("LibraryScanner: Full rescan - checking for obsolete tracks...")
+                if not targeted:
+                    for root in self.shards: # Also roots whose folders are gone
+                        self._connection_for(root, connections)
+                self._remove_obsolete(connections, music_folders, targeted, set(all_filepaths_in_scan))
+
+            if self._should_continue():
+                for db_conn in connections.values():
+                    db_conn.execute(f"UPDATE {DB_LIBRARY_STATS_TABLE} SET last_scan_at = ? WHERE id = 1", (time.time(),))
+                self._commit_all(connections)
+
+        except Exception as e: # Catch-all for unexpected errors during processing
+            Logger.error(f"LibraryScanner: Error during scan's main processing loop ({scan_thread_id}): {e}")
+            import traceback; traceback.print_exc()
+            for db_conn in connections.values():
+                db_conn.rollback() # Rollback on major error
+        finally:
+            for db_conn in connections.values():
+                try:
+                    close_connection(db_conn)
+                except sqlite3.Error as e:
+                    Logger.error(f"LibraryScanner: Error closing DB connection: {e}")
+
+            # Determine final message based on whether scan was cancelled or completed
+            cancelled = not self._should_continue()
+            if cancelled:
+                final_message = f"Scan cancelled. Found: {files_scanned_so_far} of {total_files_to_scan}. Processed in DB: {files_processed_this_scan}."
+            else: # Scan completed naturally
+                final_message = f"Scan complete. Processed: {files_processed_this_scan} of {total_files_to_scan} files."
+                if self.files_skipped_quarantined:
+                    final_message += f" Skipped {self.files_skipped_quarantined} unreadable (unchanged) files."
+            Logger.info(f"LibraryScanner: {final_message}")
+            self._emit(SCAN_MSG_DONE, final_message, cancelled)
+
+
+    @staticmethod
+    def _commit_all(connections):
+        for conn in connections.values():
+            conn.commit()
+
+    def iter_audio_files(self, paths):
+        """Yields supported audio files from a mix of file and folder paths, walking folders lazily in name order."""
+        for path in paths:
+            if not self._should_continue(): return
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    if not self._should_continue(): return
+                    dirs.sort(key=str.lower)
+                    for filename in sorted(files, key=str.lower):
+                        if filename.lower().endswith(SUPPORTED_AUDIO_EXTENSIONS):
+                            yield os.path.join(root, filename)
+            elif os.path.isfile(path) and path.lower().endswith(SUPPORTED_AUDIO_EXTENSIONS):
+                yield path
+            else:
+                Logger.warning(f"LibraryScanner: Skipping unsupported dropped path: {path}")
+
+    def import_paths(self, paths, batch_size=50):
+        """
+        Indexes dropped files/folders and emits them in batches as they are committed.
+        The first playable file is emitted before it is indexed so playback can start immediately.
+        """
+        conn = self._get_db_connection()
+        if not conn:
+            self._emit(SCAN_MSG_DONE, "Import failed: DB Connection Error", False)
+            return
+        self._load_quarantine(conn)
+        connections = {str(self.db_path): conn}
+
+        imported_count = 0
+        first_path = None
+        batch = []
+        try:
+            for filepath in self.iter_audio_files(paths):
+                if first_path is None:
+                    first_path = filepath
+                    self._emit(SCAN_MSG_TRACKS_READY, [filepath])
+                else:
+                    batch.append(filepath)
+                self._process_file_metadata(filepath, self._connection_for(filepath, connections))
+                imported_count += 1
+                if imported_count % batch_size == 0:
+                    self._commit_all(connections)
+                    self._flush_changes()
+                    if batch:
+                        self._emit(SCAN_MSG_TRACKS_READY, batch)
+                        batch = []
+                    self._emit(SCAN_MSG_STATUS, f"Imported {imported_count} dropped files...")
+            self._commit_all(connections)
+            self._flush_changes()
+            if batch:
+                self._emit(SCAN_MSG_TRACKS_READY, batch)
+        except Exception as e:
+            Logger.error(f"LibraryScanner: Error importing dropped paths: {e}")
+            for db_conn in connections.values():
+                db_conn.rollback()
+        finally:
+            for db_conn in connections.values():
+                close_connection(db_conn)
+            cancelled = not self._should_continue()
+            final_message = f"{'Import cancelled' if cancelled else 'Import complete'}. Imported {imported_count} dropped files."
+            Logger.info(f"LibraryScanner: {final_message}")
+            self._emit(SCAN_MSG_DONE, final_message, cancelled)
+
+
+def run_scanner_process(pipe_conn, db_path, art_cache_dir, music_folders, full_rescan, targeted, cancel_event, shards=None):
+    """Entry point of the scanner child process. Streams scanner messages back over pipe_conn."""
+    def emit(kind, *payload):
+        try:
+            pipe_conn.send((kind, payload))
+        except (BrokenPipeError, EOFError, OSError):
+            # Parent went away (app closed); stop scanning as soon as possible.
+            cancel_event.set()
+
+    try:
+        scanner = LibraryScanner(db_path, art_cache_dir, emit, lambda: not cancel_event.is_set(), shards)
+        scanner.run(music_folders, full_rescan, targeted)
+    except Exception as e:
+        Logger.error(f"LibraryScanner: Scanner process failed: {e}")
+        emit(SCAN_MSG_DONE, f"Scan failed: {e}", False)
+    finally:
+        pipe_conn.close()
@@ -0,0 +1,233 @@
+# dad_player/core/library_shards.py
+import os
+import re
+import sqlite3
+import time
+from kivy.logger import Logger
+
+from dad_player.constants import (
+    DB_TRACKS_TABLE, DB_ALBUMS_TABLE, DB_ARTISTS_TABLE, DB_SCAN_QUARANTINE_TABLE, DB_ALBUM_SUMMARY_TABLE,
+    DB_ALBUM_GENRES_TABLE, DB_ALBUM_GENRE_SUMMARY_VIEW, DB_LIBRARY_STATS_TABLE, DB_LIBRARY_SHARDS_TABLE,
+    DB_TRACK_STATS_TABLE, DB_PLAYLIST_TRACKS_TABLE, DB_PLAY_HISTORY_TABLE, DB_SMART_PLAYLIST_TRACKS_TABLE,
+    DB_CACHE_SIZE_KB, DB_MMAP_SIZE, LIBRARY_SHARD_ID_SPAN, LIBRARY_SHARD_LIMIT
+)
+from .db_connection import connect, close_connection
+from .db_migrations import migrate
+from .track_path_index import path_prefix_bounds
+
+# Optional layout with a database file per music root (a "shard"). A root's database holds its
+# tracks, albums and artists and everything triggers derive from them (album_summary, album_genres,
+# the search index, library_stats, the scan quarantine), so each root is scanned, vacuumed and
+# deleted on its own. Playlists, statistics, play history, smart playlists and the library's own
+# maintenance log stay in the library database, as do tracks outside every root (dropped files)
+# and those of roots that were in the library before they could get a database of their own.
+#
+# Connections reading the whole library ATTACH every root database and get TEMP views named after
+# the per-root tables, each the UNION ALL of the library database's table and every root's, so
+# queries keep their table names. SQLite pushes constant filters and keyset ORDER BY ... LIMIT into
+# each arm of such a view, but reads a view on the inner side of a join whole; such queries join
+# within each database (see library_schemas) or look names up with correlated subqueries instead.
+# Ids in root database n start at n * LIBRARY_SHARD_ID_SPAN, so they stay unique across the library.
+
+SHARD_SCHEMA_PREFIX = "root_"
+SHARDED_TABLES = (DB_ARTISTS_TABLE, DB_ALBUMS_TABLE, DB_TRACKS_TABLE, DB_ALBUM_SUMMARY_TABLE, DB_ALBUM_GENRES_TABLE,
+                  DB_ALBUM_GENRE_SUMMARY_VIEW, DB_SCAN_QUARANTINE_TABLE)
+_ID_TABLES = (DB_ARTISTS_TABLE, DB_ALBUMS_TABLE, DB_TRACKS_TABLE) # AUTOINCREMENT, so seeded per root database
+# Library database tables whose rows name a track; triggers clean them up for its own tracks only
+_TRACK_REFERENCES = (DB_TRACK_STATS_TABLE, DB_PLAYLIST_TRACKS_TABLE, DB_PLAY_HISTORY_TABLE, DB_SMART_PLAYLIST_TRACKS_TABLE)
+_SHARD_FILE = re.compile(r"^root_(\d+)\.sqlite(?:-wal|-shm)?$")
+
+
+def shard_schema(shard_id):
+    """Name a root database is attached under."""
+    return f"{SHARD_SCHEMA_PREFIX}{shard_id}"
+
+
+def shard_path(shards_dir, shard_id):
+    return os.path.join(shards_dir, f"root_{shard_id}.sqlite")
+
+
+def shard_id_range(shard_id):
+    """(first, end) of the ids a root database hands out."""
+    return shard_id * LIBRARY_SHARD_ID_SPAN, (shard_id + 1) * LIBRARY_SHARD_ID_SPAN
+
+
+def get_shards(conn):
+    """{music root: shard id} of the roots with a database of their own; empty before the registry exists."""
+    try:
+        rows = conn.execute(f"SELECT id, root FROM main.{DB_LIBRARY_SHARDS_TABLE} ORDER BY id").fetchall()
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return {}
+        raise
+    return {row[1]: row[0] for row in rows}
+
+
+def owning_root(roots, path):
+    """The root in roots that path (a file or folder) is or lies below, or None."""
+    for root in roots:
+        if path == root or path.startswith(path_prefix_bounds(root)[0]):
+            return root
+    return None
+
+
+def library_schemas(conn):
+    """Schemas holding library rows on conn: "main", then every attached root database."""
+    return ["main"] + [row[1] for row in conn.execute("PRAGMA database_list") if row[1].startswith(SHARD_SCHEMA_PREFIX)]
+
+
+def create_shard(conn, shards_dir, root):
+    """
+    Registers root and creates its database: the full library schema, with ids starting at the
+    root's own LIBRARY_SHARD_ID_SPAN multiple. Commits conn. Returns the shard id, or None if
+    LIBRARY_SHARD_LIMIT roots already have a database or this one could not be created.
+    """
+    if len(get_shards(conn)) >= LIBRARY_SHARD_LIMIT:
+        Logger.warning(f"LibraryShards: {LIBRARY_SHARD_LIMIT} music roots already have a database; "
+                       f"'{root}' is kept in the library database.")
+        return None
+    os.makedirs(shards_dir, exist_ok=True)
+    shard_id = None
+    shard_conn = None
+    try:
+        shard_id = conn.execute(f"INSERT INTO {DB_LIBRARY_SHARDS_TABLE} (root, created_at) VALUES (?, ?)",
+                                (root, time.time())).lastrowid
+        shard_conn = connect(shard_path(shards_dir, shard_id))
+        if not migrate(shard_conn):
+            raise sqlite3.DatabaseError("schema migration failed")
+        first_id = shard_id_range(shard_id)[0]
+        shard_conn.executemany("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)",
+                               [(table, first_id) for table in _ID_TABLES])
+        shard_conn.commit()
+        conn.commit()
+    except sqlite3.Error as e:
+        Logger.error(f"LibraryShards: Could not create the database of music root '{root}': {e}")
+        conn.rollback()
+        if shard_conn:
+            close_connection(shard_conn)
+            shard_conn = None
+        if shard_id is not None:
+            _remove_files(shards_dir, shard_id)
+        return None
+    finally:
+        if shard_conn:
+            close_connection(shard_conn)
+    Logger.info(f"LibraryShards: Music root '{root}' has its own database ({shard_path(shards_dir, shard_id)}).")
+    return shard_id
+
+
+def migrate_shards(conn, shards_dir):
+    """Brings every registered root database to the current schema version, as migrate does the library database."""
+    for shard_id in get_shards(conn).values():
+        path = shard_path(shards_dir, shard_id)
+        if not os.path.exists(path):
+            continue
+        shard_conn = connect(path)
+        try:
+            migrate(shard_conn)
+        finally:
+            close_connection(shard_conn)
+
+
+def drop_shard(conn, shards_dir, shard_id):
+    """
+    Unregisters a root database, detaches it from conn and deletes its files. Commits conn. Other
+    connections must run attach_shards again. Returns False if a file could not be deleted yet; it
+    is then removed by remove_unregistered_shards later.
+    """
+    conn.execute(f"DELETE FROM {DB_LIBRARY_SHARDS_TABLE} WHERE id = ?", (shard_id,))
+    conn.commit()
+    attach_shards(conn, shards_dir)
+    return _remove_files(shards_dir, shard_id)
+
+
+def remove_unregistered_shards(conn, shards_dir):
+    """Deletes root database files the registry no longer lists, e.g. ones that were open elsewhere when dropped."""
+    registered = set(get_shards(conn).values())
+    try:
+        filenames = os.listdir(shards_dir)
+    except FileNotFoundError:
+        return
+    for shard_id in {int(match.group(1)) for match in map(_SHARD_FILE.match, filenames) if match}:
+        if shard_id not in registered:
+            _remove_files(shards_dir, shard_id)
+
+
+def _remove_files(shards_dir, shard_id):
+    removed = True
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(shard_path(shards_dir, shard_id) + suffix)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            Logger.warning(f"LibraryShards: Could not delete {shard_path(shards_dir, shard_id)}{suffix}: {e}")
+            removed = False
+    return removed
+
+
+def forget_shard_tracks(cursor, track_ids):
+    """
+    Deletes the library database's statistics, playlist entries, play history and smart playlist
+    members of tracks removed from a root database, which the library database's triggers never
+    see. The caller commits.
+    """
+    params = [(track_id,) for track_id in track_ids]
+    for table in _TRACK_REFERENCES:
+        cursor.executemany(f"DELETE FROM main.{table} WHERE track_id = ?", params)
+
+
+def detach_shards(conn):
+    """Drops the union views and detaches every root database from conn. Must be called outside a transaction."""
+    for table in SHARDED_TABLES + (DB_LIBRARY_STATS_TABLE,):
+        conn.execute(f"DROP VIEW IF EXISTS temp.{table}")
+    for schema in library_schemas(conn)[1:]:
+        conn.execute(f"DETACH DATABASE {schema}")
+
+
+def attach_shards(conn, shards_dir):
+    """
+    Attaches the registered root databases to conn, detaches unregistered ones and recreates the
+    TEMP union views; with no root database attached no views are left, so conn reads the library
+    database as it is. Must be called outside a transaction. Returns library_schemas(conn).
+    """
+    for table in SHARDED_TABLES + (DB_LIBRARY_STATS_TABLE,):
+        conn.execute(f"DROP VIEW IF EXISTS temp.{table}")
+    wanted = {}
+    for root, shard_id in get_shards(conn).items():
+        path = shard_path(shards_dir, shard_id)
+        if os.path.exists(path): # ATTACH would create an empty database in its place
+            wanted[shard_schema(shard_id)] = path
+        else:
+            Logger.warning(f"LibraryShards: The database of music root '{root}' is missing ({path}); its tracks are not shown.")
+    attached = library_schemas(conn)[1:]
+    for schema in attached:
+        if schema not in wanted:
+            conn.execute(f"DETACH DATABASE {schema}")
+    for schema, path in wanted.items():
+        if schema in attached:
+            continue
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        except sqlite3.Error as e:
+            Logger.error(f"LibraryShards: Could not attach {path}: {e}")
+            continue
+        # Pragmas set by connect() only apply to the main database
+        conn.execute(f"PRAGMA {schema}.synchronous=NORMAL")
+        conn.execute(f"PRAGMA {schema}.mmap_size={DB_MMAP_SIZE}")
+        conn.execute(f"PRAGMA {schema}.cache_size=-{DB_CACHE_SIZE_KB}")
+    schemas = library_schemas(conn)
+    if len(schemas) == 1:
+        return schemas
+    for table in SHARDED_TABLES:
+        # Named columns: the library database may have gained them in a different order than a new database
+        columns = ", ".join(f'"{row[1]}"' for row in conn.execute(f"PRAGMA main.table_info({table})"))
+        arms = " UNION ALL ".join(f"SELECT {columns} FROM {schema}.{table}" for schema in schemas)
+        conn.execute(f"CREATE TEMP VIEW {table} AS {arms}")
+    arms = " UNION ALL ".join(f"SELECT * FROM {schema}.{DB_LIBRARY_STATS_TABLE}" for schema in schemas)
+    conn.execute(f"""CREATE TEMP VIEW {DB_LIBRARY_STATS_TABLE} AS
+                     SELECT 1 AS id, SUM(track_count) AS track_count, SUM(album_count) AS album_count,
+                            SUM(artist_count) AS artist_count, SUM(total_duration) AS total_duration,
+                            MAX(last_scan_at) AS last_scan_at
+                     FROM ({arms})""")
+    return schemas
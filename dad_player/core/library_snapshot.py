@@ -0,0 +1,287 @@
+# dad_player/core/library_snapshot.py
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from kivy.logger import Logger
+
+from dad_player.constants import (
+    APP_VERSION, DB_TRACKS_TABLE, DB_ALBUMS_TABLE, DB_ARTISTS_TABLE, DB_PLAYLISTS_TABLE,
+    DB_PLAYLIST_TRACKS_TABLE, DB_TRACK_STATS_TABLE, DB_TRACKS_FTS_TABLE, DB_SCAN_QUARANTINE_TABLE,
+    DB_MAINTENANCE_LOG_TABLE, DB_PLAY_HISTORY_TABLE, DB_SMART_PLAYLISTS_TABLE, DB_SMART_PLAYLIST_TRACKS_TABLE,
+    SNAPSHOT_FORMAT_VERSION, PURGE_BATCH_SIZE
+)
+from .db_connection import connect, close_connection
+from .db_migrations import migrate, get_schema_version, SCHEMA_VERSION
+from .art_cache import reconcile_art_cache
+
+# A snapshot is a zip holding:
+#   manifest.json   -- format, versions and the music roots the paths are relative to
+#   library.sqlite  -- the library database; track paths are "<root index>/<path below the root>"
+#   art/<file>      -- cached album art referenced by the albums table
+SNAPSHOT_FORMAT = "dad_player-library-snapshot"
+MANIFEST_NAME = "manifest.json"
+DATABASE_ENTRY = "library.sqlite"
+ART_PREFIX = "art/"
+
+# Copied into the live database on import, parents first
+SNAPSHOT_TABLES = (DB_ARTISTS_TABLE, DB_ALBUMS_TABLE, DB_TRACKS_TABLE, DB_PLAYLISTS_TABLE,
+                   DB_PLAYLIST_TRACKS_TABLE, DB_TRACK_STATS_TABLE, DB_PLAY_HISTORY_TABLE,
+                   DB_SMART_PLAYLISTS_TABLE, DB_SMART_PLAYLIST_TRACKS_TABLE)
+
+_PROGRESS_EVERY = 5000
+
+
+class SnapshotError(Exception):
+    """The file is not a snapshot this version can read, or it doesn't fit this installation."""
+
+
+def _to_relative(filepath, roots):
+    """'<root index>/<posix path below the root>' for the first root containing filepath, else None."""
+    for index, root in enumerate(roots):
+        prefix = root.rstrip("\\/") + os.sep
+        if filepath.startswith(prefix):
+            return f"{index}/{filepath[len(prefix):].replace(os.sep, '/')}"
+    return None
+
+
+def _common_columns(conn, table, other_schema):
+    columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+    other = {row[1] for row in conn.execute(f"PRAGMA {other_schema}.table_info({table})")}
+    return [column for column in columns if column in other]
+
+
+def _delete_tracks(cursor, track_ids):
+    for start in range(0, len(track_ids), PURGE_BATCH_SIZE):
+        chunk_params = [(track_id,) for track_id in track_ids[start:start + PURGE_BATCH_SIZE]]
+        cursor.executemany(f"DELETE FROM {DB_TRACKS_TABLE} WHERE id = ?", chunk_params)
+        cursor.executemany(f"DELETE FROM {DB_TRACK_STATS_TABLE} WHERE track_id = ?", chunk_params)
+        cursor.executemany(f"DELETE FROM {DB_PLAYLIST_TRACKS_TABLE} WHERE track_id = ?", chunk_params)
+
+
+def export_snapshot(db_path, art_cache_dir, music_roots, dest_path, progress=None):
+    """
+    Writes the library to dest_path as a snapshot. Tracks outside music_roots (e.g. dropped files)
+    are left out, as is everything that only makes sense on this machine (quarantine, maintenance
+    log) or can be rebuilt cheaply on import (the full-text index). Returns a summary message.
+    """
+    progress = progress or (lambda fraction, message: None)
+    start_time = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="dad_snapshot_") as work_dir:
+        copy_path = os.path.join(work_dir, DATABASE_ENTRY)
+        progress(0.05, "Copying library database...")
+        source = connect(db_path)
+        copy = sqlite3.connect(copy_path)
+        try:
+            source.backup(copy) # Consistent copy even while the app keeps reading and writing
+        finally:
+            close_connection(source)
+        try:
+            copy.row_factory = sqlite3.Row
+            copy.execute("PRAGMA journal_mode=DELETE") # Self-contained file, no -wal beside it
+            cursor = copy.cursor()
+            progress(0.2, "Making track paths relative to the music folders...")
+            cursor.execute(f"SELECT id, filepath FROM {DB_TRACKS_TABLE}")
+            rebased, outside = [], []
+            for row in cursor.fetchall():
+                relative = _to_relative(row['filepath'], music_roots)
+                if relative is None:
+                    outside.append(row['id'])
+                else:
+                    rebased.append((relative, row['id']))
+            cursor.executemany(f"UPDATE {DB_TRACKS_TABLE} SET filepath = ? WHERE id = ?", rebased)
+            _delete_tracks(cursor, outside)
+            cursor.execute(f"DELETE FROM {DB_SCAN_QUARANTINE_TABLE}")
+            cursor.execute(f"DELETE FROM {DB_MAINTENANCE_LOG_TABLE}")
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (DB_TRACKS_FTS_TABLE,))
+            if cursor.fetchone():
+                cursor.execute(f"DELETE FROM {DB_TRACKS_FTS_TABLE}")
+            cursor.execute(f"SELECT DISTINCT art_filename FROM {DB_ALBUMS_TABLE} WHERE art_filename IS NOT NULL")
+            art_files = [row['art_filename'] for row in cursor.fetchall()]
+            schema_version = get_schema_version(copy)
+            copy.commit()
+            progress(0.35, "Compacting...")
+            copy.execute("VACUUM")
+        finally:
+            copy.close()
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_FORMAT_VERSION,
+            "schema_version": schema_version,
+            "app_version": APP_VERSION,
+            "created_at": time.time(),
+            "roots": list(music_roots),
+            "track_count": len(rebased),
+        }
+        progress(0.5, "Writing snapshot...")
+        partial_path = f"{dest_path}.partial"
+        with zipfile.ZipFile(partial_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+            archive.write(copy_path, DATABASE_ENTRY)
+            for index, art_filename in enumerate(art_files):
+                art_path = os.path.join(art_cache_dir, art_filename)
+                if os.path.isfile(art_path):
+                    archive.write(art_path, ART_PREFIX + art_filename, compress_type=zipfile.ZIP_STORED) # Already compressed
+                if index % 500 == 0:
+                    progress(0.5 + 0.5 * index / len(art_files), f"Writing album art {index}/{len(art_files)}...")
+        os.replace(partial_path, dest_path)
+
+    message = (f"Exported {len(rebased)} tracks and {len(art_files)} album covers to {dest_path} "
+               f"({os.path.getsize(dest_path) / (1024 * 1024):.1f} MB) in {time.perf_counter() - start_time:.1f} s.")
+    if outside:
+        message += f" {len(outside)} tracks outside the music folders were left out."
+    Logger.info(f"LibrarySnapshot: {message}")
+    return message
+
+
+def read_manifest(archive):
+    try:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+    except (KeyError, ValueError) as e:
+        raise SnapshotError(f"Not a library snapshot ({e}).")
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError("Not a library snapshot.")
+    if manifest.get("version") != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {manifest.get('version')}.")
+    if manifest.get("schema_version", 0) > SCHEMA_VERSION:
+        raise SnapshotError("The snapshot was made by a newer version of DaD Player.")
+    return manifest
+
+
+def map_snapshot_roots(snapshot_roots, music_folders):
+    """
+    Picks the local folder for each snapshot root: a configured music folder with the same name,
+    else the original path if it exists here, else None (its tracks are skipped). Snapshot roots
+    sharing a name are only matched by their original path, and roots that would still end up on
+    the same local folder are all skipped rather than merged into one.
+    """
+    def folder_name(path):
+        return os.path.basename(os.path.normpath(path)).lower()
+
+    by_name = {}
+    for folder in music_folders:
+        by_name.setdefault(folder_name(folder), folder)
+    snapshot_names = [folder_name(root) for root in snapshot_roots]
+    mapping = []
+    for root, name in zip(snapshot_roots, snapshot_names):
+        local = by_name.get(name) if snapshot_names.count(name) == 1 else None
+        if local is None and os.path.isdir(root):
+            local = root
+        mapping.append(local)
+    targets = [os.path.normpath(local) if local else None for local in mapping]
+    for index, target in enumerate(targets):
+        if target and targets.count(target) > 1:
+            Logger.warning(f"LibrarySnapshot: Snapshot folder '{snapshot_roots[index]}' skipped; "
+                           f"another snapshot folder also maps to '{mapping[index]}'.")
+            mapping[index] = None
+    return mapping
+
+
+def import_snapshot(snapshot_path, db_path, art_cache_dir, music_folders, progress=None):
+    """
+    Replaces the library with a snapshot's. Paths are rebased onto the local music folders and
+    checked by stat only: missing files are dropped, files whose size differs are kept but marked
+    for re-reading by the next scan, and matching files take the local modification time so the
+    next scan treats them as unchanged. Returns (message, local_roots_used).
+    """
+    progress = progress or (lambda fraction, message: None)
+    start_time = time.perf_counter()
+    with zipfile.ZipFile(snapshot_path) as archive, tempfile.TemporaryDirectory(prefix="dad_snapshot_") as work_dir:
+        manifest = read_manifest(archive)
+        local_roots = map_snapshot_roots(manifest["roots"], music_folders)
+        if not any(local_roots):
+            raise SnapshotError("None of the snapshot's music folders were found here: "
+                                + ", ".join(manifest["roots"]) + ". Add them in Manage Folders first.")
+        progress(0.05, "Unpacking snapshot...")
+        archive.extract(DATABASE_ENTRY, work_dir)
+        snapshot_db = os.path.join(work_dir, DATABASE_ENTRY)
+
+        snap = sqlite3.connect(snapshot_db)
+        snap.row_factory = sqlite3.Row
+        try:
+            if not migrate(snap): # Older snapshots are brought up to this version's schema
+                raise SnapshotError("Could not upgrade the snapshot's database.")
+            cursor = snap.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {DB_TRACKS_TABLE}")
+            total = cursor.fetchone()[0] or 1
+            cursor.execute(f"SELECT id, filepath, filesize FROM {DB_TRACKS_TABLE}")
+            updates, dropped, changed = [], [], 0
+            for index, row in enumerate(cursor.fetchall()):
+                root_index, _, relative = row['filepath'].partition("/")
+                local_root = local_roots[int(root_index)] if root_index.isdigit() and int(root_index) < len(local_roots) else None
+                if local_root is None:
+                    dropped.append(row['id'])
+                    continue
+                local_path = os.path.join(local_root, *relative.split("/"))
+                try:
+                    stat_result = os.stat(local_path)
+                except OSError:
+                    dropped.append(row['id'])
+                    continue
+                if row['filesize'] is not None and stat_result.st_size != row['filesize']:
+                    changed += 1
+                    updates.append((local_path, 0, row['id'])) # Re-read by the next scan
+                else:
+                    updates.append((local_path, stat_result.st_mtime, row['id']))
+                if index % _PROGRESS_EVERY == 0:
+                    progress(0.05 + 0.5 * index / total, f"Checking files {index}/{total}...")
+            cursor.executemany(f"UPDATE {DB_TRACKS_TABLE} SET filepath = ?, last_modified = ? WHERE id = ?", updates)
+            _delete_tracks(cursor, dropped)
+            snap.commit()
+        finally:
+            snap.close()
+
+        progress(0.6, "Replacing the library...")
+        conn = connect(db_path)
+        try:
+            conn.execute("ATTACH DATABASE ? AS snapshot", (snapshot_db,))
+            conn.execute("BEGIN IMMEDIATE")
+            for table in reversed(SNAPSHOT_TABLES):
+                conn.execute(f"DELETE FROM main.{table}")
+            for table in SNAPSHOT_TABLES:
+                columns = ", ".join(_common_columns(conn, table, "snapshot"))
+                conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM snapshot.{table}")
+            conn.execute(f"DELETE FROM main.{DB_SCAN_QUARANTINE_TABLE}")
+            conn.commit()
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            try:
+                conn.execute("DETACH DATABASE snapshot")
+            except sqlite3.Error:
+                pass
+            close_connection(conn)
+
+        progress(0.9, "Restoring album art...")
+        os.makedirs(art_cache_dir, exist_ok=True)
+        restored_art = 0
+        for name in archive.namelist():
+            if not name.startswith(ART_PREFIX) or name.endswith("/"):
+                continue
+            art_filename = os.path.basename(name)
+            target = os.path.join(art_cache_dir, art_filename)
+            if art_filename and not os.path.exists(target):
+                with archive.open(name) as source, open(target, "wb") as dest:
+                    shutil.copyfileobj(source, dest)
+                restored_art += 1
+        conn = connect(db_path)
+        try:
+            reconcile_art_cache(conn, art_cache_dir, remove_orphans=False) # Covers missing from the snapshot
+            conn.commit()
+        finally:
+            close_connection(conn)
+
+    imported = len(updates)
+    message = f"Imported {imported} tracks and {restored_art} album covers in {time.perf_counter() - start_time:.1f} s."
+    if dropped:
+        message += f" {len(dropped)} tracks were not found here and were left out."
+    if changed:
+        message += f" {changed} changed files will be re-read by the next scan."
+    Logger.info(f"LibrarySnapshot: {message}")
+    return message, [root for root in local_roots if root]
@@ -0,0 +1,107 @@
+# dad_player/core/play_history.py
+import threading
+import time
+from kivy.logger import Logger
+from kivy.clock import Clock
+
+from dad_player.constants import PLAY_HISTORY_BATCH_SIZE, PLAY_HISTORY_FLUSH_SECONDS
+
+PLAY_EVENT_START = "start"
+PLAY_EVENT_FINISH = "finish"
+PLAY_EVENT_SKIP = "skip"
+
+
+class PlayHistoryRecorder:
+    """
+    Collects PlayerEngine playback events in memory and hands them to LibraryManager in batches:
+    once PLAY_HISTORY_BATCH_SIZE events are waiting, PLAY_HISTORY_FLUSH_SECONDS after the first
+    one, or on shutdown. Batches are written on the library query thread, so playback never waits
+    on SQLite. Files that are not in the library are not recorded.
+
+    A batch handed to the query thread stays in _in_flight until its write has committed, so a
+    write that fails, raises, or never runs (the worker is stopped on shutdown) is not lost: it
+    goes back into the buffer, or is written by the final flush(sync=True).
+    """
+
+    def __init__(self, library_manager, batch_size=PLAY_HISTORY_BATCH_SIZE, flush_interval=PLAY_HISTORY_FLUSH_SECONDS):
+        self.library_manager = library_manager
+        self.batch_size = batch_size
+        self._buffer = [] # (track_id, event, played_at, position_ms)
+        self._in_flight = [] # Batches queued for or being written on the query thread
+        self._lock = threading.Lock() # Guards _buffer and _in_flight, which the query thread updates
+        self._flush_trigger = Clock.create_trigger(lambda dt: self.flush(), flush_interval)
+        self._player_engine = None
+
+    def attach(self, player_engine):
+        self._player_engine = player_engine
+        player_engine.bind(
+            on_playback_started=self._on_playback_started,
+            on_playback_finished=self._on_playback_finished,
+            on_track_skipped=self._on_track_skipped,
+        )
+
+    def _on_playback_started(self, engine, media_path):
+        self.record(media_path, PLAY_EVENT_START, 0)
+
+    def _on_playback_finished(self, engine, media_path):
+        self.record(media_path, PLAY_EVENT_FINISH, engine.get_current_duration_ms())
+
+    def _on_track_skipped(self, engine, media_path, position_ms):
+        self.record(media_path, PLAY_EVENT_SKIP, position_ms)
+
+    def record(self, media_path, event, position_ms=None):
+        if not media_path:
+            return
+        details = self.library_manager.get_track_details_by_filepath(media_path) # Normally a cache hit
+        if not details:
+            return
+        with self._lock:
+            self._buffer.append((details['id'], event, time.time(), position_ms))
+            buffered = len(self._buffer)
+        if buffered >= self.batch_size:
+            self.flush()
+        else:
+            self._flush_trigger()
+
+    def flush(self, sync=False):
+        """
+        Writes the buffered events. sync=True writes on the calling thread, together with any
+        batch the query thread has not committed; LibraryManager.close() uses it once that thread
+        has stopped.
+        """
+        self._flush_trigger.cancel()
+        with self._lock:
+            if sync:
+                events = [event for batch in self._in_flight for event in batch] + self._buffer
+                self._in_flight, self._buffer = [], []
+            elif self._buffer:
+                events, self._buffer = self._buffer, []
+                self._in_flight.append(events)
+            else:
+                return
+        if sync:
+            # Running smart playlist rules here would hold up shutdown; affected playlists refill when next opened
+            if events and not self.library_manager.record_play_events(events, refresh_smart_playlists=False):
+                Logger.error(f"PlayHistoryRecorder: {len(events)} playback events could not be written on shutdown.")
+            return
+        self.library_manager.query_async(self._write_batch, events, on_result=self._on_flushed,
+                                         on_error=lambda error: self._on_flushed(False))
+
+    def _write_batch(self, events):
+        # Runs on the query thread. The batch leaves _in_flight only once it is settled either way.
+        written = False
+        try:
+            written = self.library_manager.record_play_events(events)
+        finally:
+            with self._lock:
+                if any(batch is events for batch in self._in_flight):
+                    self._in_flight = [batch for batch in self._in_flight if batch is not events]
+                    if not written:
+                        # Keep them for the next flush rather than losing them to a locked database
+                        self._buffer[:0] = events
+        return written
+
+    def _on_flushed(self, written):
+        if not written:
+            Logger.warning("PlayHistoryRecorder: Playback events not written; retrying later.")
+            self._flush_trigger()
@@ -21,7 +21,8 @@ class PlayerEngine(EventDispatcher):
         'on_playback_started', 'on_playback_paused', 'on_playback_resumed',
         'on_playback_stopped', 'on_playback_finished', 'on_position_changed',
         'on_media_loaded', 'on_error', 'on_status_update', 'on_playlist_changed',
-        'on_shuffle_mode_changed', 'on_repeat_mode_changed', 'on_volume_changed'
+        'on_shuffle_mode_changed', 'on_repeat_mode_changed', 'on_volume_changed',
+        'on_track_skipped'
     )
 
     current_song = ObjectProperty(None, allownone=True)
@@ -102,6 +103,7 @@ class PlayerEngine(EventDispatcher):
     def on_shuffle_mode_changed(self, shuffle_state_bool): Logger.debug(f"Event: on_shuffle_mode_changed to {shuffle_state_bool}")
     def on_repeat_mode_changed(self, repeat_mode_int): Logger.debug(f"Event: on_repeat_mode_changed to {repeat_mode_int}")
     def on_volume_changed(self, volume_float_0_1): Logger.debug(f"Event: on_volume_changed to {volume_float_0_1}")
+    def on_track_skipped(self, media_path, position_ms): Logger.debug(f"Event: on_track_skipped {media_path} at {position_ms}ms")
     # --- End Default Kivy Event Handlers ---
 
     def _schedule_dispatch(self, event_name, *args):
@@ -355,22 +357,35 @@ class PlayerEngine(EventDispatcher):
     def _get_active_playlist(self):
         return self._shuffled_playlist if self.shuffle_mode and self._shuffled_playlist else self._playlist
 
-    def load_playlist(self, filepaths, play_index=0, clear_current=True):
-        if clear_current:
-            self.clear_playlist(dispatch_event=False) 
+    def _resolve_queue_paths(self, filepaths, caller_info):
+        """
+        Returns the playable paths out of filepaths and fills in their metadata with one bulk
+        library lookup. Library tracks are trusted to exist; only other files are stat'ed.
+        """
+        app = App.get_running_app()
+        library_details = {}
+        if app and hasattr(app, 'library_manager') and app.library_manager:
+            unknown_paths = [path for path in filepaths if path not in self._playlist_metadata]
+            if unknown_paths:
+                library_details = app.library_manager.get_track_details_bulk(unknown_paths)
 
-        app = App.get_running_app() 
-        temp_playlist = []
+        playable = []
         for path in filepaths:
-            if not os.path.exists(path):
-                Logger.warning(f"PlayerEngine: File not found in load_playlist: {path}")
+            meta = library_details.get(path) or self._playlist_metadata.get(path)
+            in_library = bool(meta) and meta.get('id') is not None
+            if not in_library and not os.path.exists(path):
+                Logger.warning(f"PlayerEngine: File not found in {caller_info}: {path}")
                 continue
-            temp_playlist.append(path)
-            if path not in self._playlist_metadata and app and hasattr(app, 'library_manager') and app.library_manager:
-                meta = app.library_manager.get_track_details_by_filepath(path)
+            playable.append(path)
+            if path not in self._playlist_metadata:
                 self._playlist_metadata[path] = meta or {'filepath': path, 'title': os.path.basename(path), 'artist': 'Unknown', 'duration': 0}
-        
-        self._playlist = temp_playlist 
+        return playable
+
+    def load_playlist(self, filepaths, play_index=0, clear_current=True):
+        if clear_current:
+            self.clear_playlist(dispatch_event=False) 
+
+        self._playlist = self._resolve_queue_paths(filepaths, "load_playlist")
         
         if self.shuffle_mode:
             self._shuffled_playlist = list(self._playlist) 
@@ -387,17 +402,7 @@ class PlayerEngine(EventDispatcher):
     def add_to_playlist(self, filepaths):
         if isinstance(filepaths, str): filepaths = [filepaths] 
 
-        app = App.get_running_app()
-        added_paths = []
-        for path in filepaths:
-            if not os.path.exists(path):
-                Logger.warning(f"PlayerEngine: File not found in add_to_playlist: {path}")
-                continue
-            added_paths.append(path)
-            if path not in self._playlist_metadata and app and hasattr(app, 'library_manager') and app.library_manager:
-                 meta = app.library_manager.get_track_details_by_filepath(path)
-                 self._playlist_metadata[path] = meta or {'filepath': path, 'title': os.path.basename(path), 'artist': 'Unknown', 'duration': 0}
-        
+        added_paths = self._resolve_queue_paths(filepaths, "add_to_playlist")
         if not added_paths: return
 
         self._playlist.extend(added_paths)
@@ -497,6 +502,10 @@ class PlayerEngine(EventDispatcher):
             self._schedule_dispatch('on_status_update', "Playlist empty. Cannot play next.")
             return False
 
+        if not from_song_end and self.current_media_path and (self._is_playing_internal or self._is_paused_internal):
+            # Leaving a track before its end counts as a skip in the play history
+            self._schedule_dispatch('on_track_skipped', self.current_media_path, self.get_current_position_ms())
+
         if self.repeat_mode == REPEAT_SONG and from_song_end: 
             if self.current_media_path:
                 Logger.info("PlayerEngine: Repeating current song (from song end).")
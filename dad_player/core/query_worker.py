@@ -0,0 +1,106 @@
+# dad_player/core/query_worker.py
+import queue
+import threading
+from concurrent.futures import Future
+from kivy.logger import Logger
+from kivy.clock import Clock
+
+
+class QueryRequest:
+    """Handle for a query submitted to QueryWorker. Once cancelled, its callbacks are never called."""
+
+    def __init__(self, future):
+        self.future = future
+        self._cancelled = False
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        # A query that is already running finishes, but its result is dropped
+        self._cancelled = True
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+
+class QueryWorker:
+    """
+    Runs database reads on one dedicated background thread, in submission order, and delivers
+    their results on the Kivy main thread. The thread starts on first use; on_thread_exit runs on
+    it when the worker stops (LibraryManager uses it to close that thread's connection).
+    """
+
+    def __init__(self, name="QueryWorker", on_thread_exit=None):
+        self.name = name
+        self._on_thread_exit = on_thread_exit
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, on_result=None, on_error=None, **kwargs):
+        """
+        Queues fn(*args, **kwargs). on_result(result) or on_error(exception) is then called on the
+        main thread, unless the returned QueryRequest was cancelled first.
+        """
+        future = Future()
+        request = QueryRequest(future)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        self._queue.put((future, fn, args, kwargs))
+
+        def deliver(dt):
+            if request.cancelled:
+                return
+            error = future.exception()
+            if error is not None:
+                Logger.error(f"{self.name}: Query {getattr(fn, '__name__', fn)} failed: {error}")
+                if on_error:
+                    on_error(error)
+            elif on_result:
+                on_result(future.result())
+
+        future.add_done_callback(lambda f: None if f.cancelled() else Clock.schedule_once(deliver))
+        return request
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                future, fn, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue # Cancelled while queued
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            if self._on_thread_exit:
+                self._on_thread_exit()
+
+    def stop(self, wait=False):
+        """
+        Cancels queued queries and lets the thread exit after the one it is running. wait=True
+        blocks until it has, so the caller knows no query is still writing.
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+            self._queue.put(None)
+            self._thread = None
+        if wait:
+            thread.join()
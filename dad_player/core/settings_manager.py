@@ -6,7 +6,9 @@ from kivy.app import App
 
 from dad_player.constants import (
     SETTINGS_FILE, CONFIG_KEY_MUSIC_FOLDERS, CONFIG_KEY_AUTOPLAY,
-    CONFIG_KEY_SHUFFLE, CONFIG_KEY_REPEAT, REPEAT_NONE, CONFIG_KEY_LAST_VOLUME
+    CONFIG_KEY_SHUFFLE, CONFIG_KEY_REPEAT, REPEAT_NONE, CONFIG_KEY_LAST_VOLUME,
+    CONFIG_KEY_SCAN_IN_SUBPROCESS, CONFIG_KEY_ALBUM_SORT, ALBUM_SORT_NAME, ALBUM_SORT_TEXT,
+    CONFIG_KEY_DATABASE_PER_ROOT
 )
 from dad_player.utils import get_user_data_dir_for_app
 
@@ -23,6 +25,9 @@ class SettingsManager:
             CONFIG_KEY_SHUFFLE: False,
             CONFIG_KEY_REPEAT: REPEAT_NONE,
             CONFIG_KEY_LAST_VOLUME: 1, #Volume set to 1 due to missing volume controls
+            CONFIG_KEY_SCAN_IN_SUBPROCESS: False,
+            CONFIG_KEY_ALBUM_SORT: ALBUM_SORT_NAME,
+            CONFIG_KEY_DATABASE_PER_ROOT: False,
         }
         self.last_error = None # Initialize last_error
         self._load_settings()
@@ -120,6 +125,31 @@ class SettingsManager:
         else:
             Logger.warning(f"SettingsManager: Invalid repeat mode value: {value}")
 
+    def get_scan_in_subprocess(self):
+        """Whether library scans run in a separate process instead of a background thread."""
+        return bool(self.get(CONFIG_KEY_SCAN_IN_SUBPROCESS))
+
+    def set_scan_in_subprocess(self, value: bool):
+        self.put(CONFIG_KEY_SCAN_IN_SUBPROCESS, bool(value))
+
+    def get_database_per_root(self):
+        """Whether music roots added to the library get a database file of their own (see library_shards)."""
+        return bool(self.get(CONFIG_KEY_DATABASE_PER_ROOT))
+
+    def set_database_per_root(self, value: bool):
+        self.put(CONFIG_KEY_DATABASE_PER_ROOT, bool(value))
+
+    def get_album_sort(self):
+        """The order albums are browsed in, one of the ALBUM_SORT_* values."""
+        value = self.get(CONFIG_KEY_ALBUM_SORT)
+        return value if value in ALBUM_SORT_TEXT else ALBUM_SORT_NAME
+
+    def set_album_sort(self, value: str):
+        if value in ALBUM_SORT_TEXT:
+            self.put(CONFIG_KEY_ALBUM_SORT, value)
+        else:
+            Logger.warning(f"SettingsManager: Invalid album sort value: {value}")
+
     def get_last_volume(self):
         """Gets the last saved volume (0.0 to 1.0)."""
         return float(self.get(CONFIG_KEY_LAST_VOLUME))
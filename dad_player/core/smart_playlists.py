@@ -0,0 +1,172 @@
+# dad_player/core/smart_playlists.py
+import json
+import time
+from collections import namedtuple
+
+from dad_player.constants import (
+    DB_TRACKS_TABLE, DB_ALBUMS_TABLE, DB_ARTISTS_TABLE, DB_TRACK_STATS_TABLE,
+    DB_SMART_PLAYLIST_TRACKS_TABLE, SQL_MAX_VARIABLES
+)
+
+# A smart playlist's rules are a (JSON-serialisable) group:
+#   {"match": "all" | "any",
+#    "rules": [{"field": "genre", "op": "is", "value": "Jazz"},
+#              {"field": "year", "op": "<", "value": 1970},
+#              {"field": "last_played", "op": "not_in_last_days", "value": 30},
+#              {"match": "any", "rules": [...]}]}          <- groups nest
+# plus optional "order_by" (a field) and "descending" for the order tracks are listed in.
+
+# field -> (SQL expression over SMART_PLAYLIST_FROM, kind, reads track_stats)
+SMART_PLAYLIST_FIELDS = {
+    "title": ("t.title", "text", False),
+    "artist": ("ar.name", "text", False),
+    "album": ("al.name", "text", False),
+    "genre": ("t.genre", "text", False),
+    "filepath": ("t.filepath", "text", False),
+    "year": ("COALESCE(t.year, al.year)", "number", False),
+    "duration": ("t.duration", "number", False),
+    "track_number": ("t.track_number", "number", False),
+    "disc_number": ("t.disc_number", "number", False),
+    "play_count": ("COALESCE(s.play_count, 0)", "number", True),
+    "skip_count": ("COALESCE(s.skip_count, 0)", "number", True),
+    "last_played": ("s.last_played", "date", True),
+}
+
+_TEXT_OPS = {
+    "is": "{expr} = ?",
+    "is_not": "({expr} IS NULL OR {expr} != ?)",
+    "contains": "{expr} LIKE ? ESCAPE '\\'",
+    "not_contains": "({expr} IS NULL OR {expr} NOT LIKE ? ESCAPE '\\')",
+    "starts_with": "{expr} LIKE ? ESCAPE '\\'",
+    "ends_with": "{expr} LIKE ? ESCAPE '\\'",
+}
+_NUMBER_OPS = {"=": "{expr} = ?", "!=": "({expr} IS NULL OR {expr} != ?)", "<": "{expr} < ?",
+               "<=": "{expr} <= ?", ">": "{expr} > ?", ">=": "{expr} >= ?", "between": "{expr} BETWEEN ? AND ?"}
+# Never played counts as "not played in the last N days"
+_DATE_OPS = {"in_last_days": "{expr} >= ?", "not_in_last_days": "({expr} IS NULL OR {expr} < ?)"}
+
+SMART_PLAYLIST_JOINS = f"""LEFT JOIN {DB_ARTISTS_TABLE} ar ON t.artist_id = ar.id
+    LEFT JOIN {DB_ALBUMS_TABLE} al ON t.album_id = al.id
+    LEFT JOIN {DB_TRACK_STATS_TABLE} s ON s.track_id = t.id"""
+SMART_PLAYLIST_FROM = f"{DB_TRACKS_TABLE} t {SMART_PLAYLIST_JOINS}"
+
+# (expression, suffix) terms; a union of per-database selects can only sort on selected columns
+DEFAULT_ORDER_TERMS = (("ar.sort_name", ""), ("al.sort_name", ""), ("t.disc_number", ""), ("t.track_number", ""),
+                       ("t.title", " COLLATE NOCASE"))
+DEFAULT_ORDER = ", ".join(expr + suffix for expr, suffix in DEFAULT_ORDER_TERMS)
+
+CompiledRules = namedtuple("CompiledRules", "where params uses_stats time_relative order_by order_terms")
+
+
+class SmartPlaylistError(Exception):
+    """The rules of a smart playlist are malformed."""
+
+
+def smart_playlist_joins(schema):
+    """
+    SMART_PLAYLIST_JOINS onto the artists and albums of one attached database (see library_shards),
+    for its tracks t; statistics always come from the library database.
+    """
+    return f"""LEFT JOIN {schema}.{DB_ARTISTS_TABLE} ar ON t.artist_id = ar.id
+    LEFT JOIN {schema}.{DB_ALBUMS_TABLE} al ON t.album_id = al.id
+    LEFT JOIN main.{DB_TRACK_STATS_TABLE} s ON s.track_id = t.id"""
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _compile_rule(rule, params, flags, now):
+    if "rules" in rule:
+        match = rule.get("match", "all")
+        if match not in ("all", "any"):
+            raise SmartPlaylistError(f"Unknown match mode '{match}'.")
+        if not rule["rules"]:
+            return "1" # An empty group matches everything
+        clauses = [_compile_rule(sub_rule, params, flags, now) for sub_rule in rule["rules"]]
+        return "(" + (" AND " if match == "all" else " OR ").join(clauses) + ")"
+
+    field, op, value = rule.get("field"), rule.get("op"), rule.get("value")
+    if field not in SMART_PLAYLIST_FIELDS:
+        raise SmartPlaylistError(f"Unknown field '{field}'.")
+    expr, kind, uses_stats = SMART_PLAYLIST_FIELDS[field]
+    flags["uses_stats"] |= uses_stats
+    try:
+        if kind == "text":
+            template = _TEXT_OPS[op]
+            value = str(value)
+            if op in ("contains", "not_contains"): value = f"%{_escape_like(value)}%"
+            elif op == "starts_with": value = f"{_escape_like(value)}%"
+            elif op == "ends_with": value = f"%{_escape_like(value)}"
+            params.append(value)
+        elif kind == "number":
+            template = _NUMBER_OPS[op]
+            if op == "between":
+                low, high = value
+                params.extend((float(low), float(high)))
+            else:
+                params.append(float(value))
+        else:
+            template = _DATE_OPS[op]
+            params.append(now - float(value) * 86400)
+            flags["time_relative"] = True
+    except KeyError:
+        raise SmartPlaylistError(f"Operator '{op}' does not apply to {field}.")
+    except (TypeError, ValueError):
+        raise SmartPlaylistError(f"Invalid value {value!r} for {field} {op}.")
+    return template.format(expr=expr)
+
+
+def compile_rules(rules, now=None):
+    """
+    Turns a rules group into one parameterised WHERE clause over SMART_PLAYLIST_FROM. Relative
+    dates are resolved against `now`, so time-relative rules must be recompiled for each refresh.
+    Raises SmartPlaylistError for rules it can't compile.
+    """
+    if isinstance(rules, str):
+        try:
+            rules = json.loads(rules)
+        except ValueError as e:
+            raise SmartPlaylistError(f"Rules are not valid JSON ({e}).")
+    if not isinstance(rules, dict):
+        raise SmartPlaylistError("Rules must be a group of conditions.")
+    params = []
+    flags = {"uses_stats": False, "time_relative": False}
+    where = _compile_rule({"match": rules.get("match", "all"), "rules": rules.get("rules", [])},
+                          params, flags, now or time.time())
+    order_terms = DEFAULT_ORDER_TERMS
+    if rules.get("order_by"):
+        if rules["order_by"] not in SMART_PLAYLIST_FIELDS:
+            raise SmartPlaylistError(f"Unknown field '{rules['order_by']}' to order by.")
+        order_terms = ((SMART_PLAYLIST_FIELDS[rules["order_by"]][0], " DESC" if rules.get("descending") else " ASC"), ("t.id", ""))
+    order_by = ", ".join(expr + suffix for expr, suffix in order_terms)
+    return CompiledRules(where, params, flags["uses_stats"], flags["time_relative"], order_by, order_terms)
+
+
+def refresh_members(cursor, playlist_id, compiled, track_ids=None, schemas=None):
+    """
+    Brings the materialized members of one smart playlist up to date. With track_ids only those
+    tracks are re-evaluated (the incremental path, driven by library change events); without, the
+    whole library is. schemas lists the databases holding tracks when root databases are attached
+    (see library_shards.library_schemas). The caller commits.
+    """
+    sources = [f"{schema}.{DB_TRACKS_TABLE} t {smart_playlist_joins(schema)}" for schema in schemas] if schemas else [SMART_PLAYLIST_FROM]
+    if track_ids is None:
+        cursor.execute(f"DELETE FROM {DB_SMART_PLAYLIST_TRACKS_TABLE} WHERE playlist_id = ?", (playlist_id,))
+        for source in sources:
+            cursor.execute(f"""INSERT INTO {DB_SMART_PLAYLIST_TRACKS_TABLE} (playlist_id, track_id)
+                               SELECT ?, t.id FROM {source} WHERE {compiled.where}""",
+                           [playlist_id] + compiled.params)
+        return
+    track_ids = list(track_ids)
+    chunk_size = max(SQL_MAX_VARIABLES - len(compiled.params) - 1, 1)
+    for start in range(0, len(track_ids), chunk_size):
+        chunk = track_ids[start:start + chunk_size]
+        placeholders = ",".join("?" * len(chunk))
+        cursor.execute(f"""DELETE FROM {DB_SMART_PLAYLIST_TRACKS_TABLE}
+                           WHERE playlist_id = ? AND track_id IN ({placeholders})""", [playlist_id] + chunk)
+        for source in sources:
+            cursor.execute(f"""INSERT INTO {DB_SMART_PLAYLIST_TRACKS_TABLE} (playlist_id, track_id)
+                               SELECT ?, t.id FROM {source}
+                               WHERE t.id IN ({placeholders}) AND {compiled.where}""",
+                           [playlist_id] + chunk + compiled.params)
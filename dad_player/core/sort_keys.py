@@ -0,0 +1,26 @@
+# dad_player/core/sort_keys.py
+import re
+import unicodedata
+
+from dad_player.constants import SORT_IGNORED_ARTICLES, SORT_KEY_NUMBER_WIDTH
+
+_NUMBER = re.compile(r"\d+")
+_LEADING_PUNCTUATION = re.compile(r"^[\W_]+")
+
+
+def sort_key(name):
+    """
+    Browse ordering key for an artist or album name, stored next to the name at scan time so
+    ORDER BY can walk a plain index. Accents are dropped and case folded ("Édith" with "edith"),
+    a leading article is moved out of the way ("The Beatles" under B), leading quotes and brackets
+    are ignored, and numbers are zero-padded so "Vol. 2" sorts before "Vol. 10".
+    """
+    if not name:
+        return ""
+    folded = "".join(char for char in unicodedata.normalize("NFKD", name) if not unicodedata.combining(char))
+    key = " ".join(folded.casefold().split())
+    key = _LEADING_PUNCTUATION.sub("", key) or key
+    first_word, _, rest = key.partition(" ")
+    if rest and first_word in SORT_IGNORED_ARTICLES:
+        key = rest
+    return _NUMBER.sub(lambda match: match.group().zfill(SORT_KEY_NUMBER_WIDTH), key)
@@ -0,0 +1,122 @@
+# dad_player/core/track_cache.py
+import threading
+from collections import OrderedDict
+
+from dad_player.constants import TRACK_CACHE_MAX_ENTRIES
+
+# Field order of a cached record; records are stored as plain tuples to keep them small.
+TRACK_DETAIL_FIELDS = ('id', 'filepath', 'title', 'duration', 'track_number', 'disc_number',
+                       'album', 'artist', 'album_id')
+
+
+class TrackMetadataCache:
+    """
+    LRU cache of track detail records keyed by track id, with a filepath -> id map alongside.
+    Paths known not to be in the library are remembered too, so files played from outside the
+    library don't hit SQLite on every queue operation.
+
+    Every invalidation bumps `generation`. A reader takes the generation before querying the
+    database and passes it to put(); a result fetched before an invalidation is then dropped
+    instead of caching pre-change data.
+    """
+
+    def __init__(self, max_entries=TRACK_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._records = OrderedDict() # track_id -> record tuple, least recently used first
+        self._path_ids = {}           # filepath -> track_id
+        self._missing_paths = set()   # filepaths with no library track
+
+    @staticmethod
+    def _as_dict(record):
+        return dict(zip(TRACK_DETAIL_FIELDS, record))
+
+    def get_by_id(self, track_id):
+        """Returns (found, details); details is a fresh dict the caller may modify."""
+        with self._lock:
+            record = self._records.get(track_id)
+            if record is None:
+                self.misses += 1
+                return False, None
+            self._records.move_to_end(track_id)
+            self.hits += 1
+        return True, self._as_dict(record)
+
+    def get_by_path(self, filepath):
+        """Returns (found, details); (True, None) means the path is known not to be in the library."""
+        with self._lock:
+            track_id = self._path_ids.get(filepath)
+            record = self._records.get(track_id) if track_id is not None else None
+            if record is None:
+                if filepath in self._missing_paths:
+                    self.hits += 1
+                    return True, None
+                self.misses += 1
+                return False, None
+            self._records.move_to_end(track_id)
+            self.hits += 1
+        return True, self._as_dict(record)
+
+    def put(self, details, generation):
+        if generation != self.generation:
+            return
+        record = tuple(details.get(field) for field in TRACK_DETAIL_FIELDS)
+        with self._lock:
+            if generation != self.generation:
+                return
+            track_id = record[0]
+            old = self._records.pop(track_id, None)
+            if old is not None and old[1] != record[1]:
+                self._path_ids.pop(old[1], None)
+            self._records[track_id] = record
+            self._path_ids[record[1]] = track_id
+            self._missing_paths.discard(record[1])
+            while len(self._records) > self.max_entries:
+                _, evicted = self._records.popitem(last=False)
+                self._path_ids.pop(evicted[1], None)
+                self.evictions += 1
+
+    def put_missing(self, filepath, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            if len(self._missing_paths) >= self.max_entries:
+                self._missing_paths.clear()
+            self._missing_paths.add(filepath)
+
+    def invalidate_changes(self, changes):
+        """Drops what a {'added', 'updated', 'removed'} change set (track ids) can have made stale."""
+        with self._lock:
+            self.generation += 1
+            for key in ('updated', 'removed'):
+                for track_id in changes.get(key, ()):
+                    record = self._records.pop(track_id, None)
+                    if record is not None:
+                        self._path_ids.pop(record[1], None)
+            if changes.get('added'):
+                # A newly added track may live at a path cached as missing
+                self._missing_paths.clear()
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._records.clear()
+            self._path_ids.clear()
+            self._missing_paths.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._records),
+                'missing_paths': len(self._missing_paths),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'generation': self.generation,
+            }
@@ -0,0 +1,104 @@
+# dad_player/core/track_path_index.py
+import os
+import sys
+import struct
+import time
+from kivy.logger import Logger
+
+from dad_player.constants import DB_TRACKS_TABLE, TRACK_PATH_INDEX_MAX_ENTRIES
+
+# (track_id, filesize, last_modified, md5 digest) packed into 40 bytes per track.
+_ENTRY_STRUCT = struct.Struct('<qqd16s')
+_NO_HASH = b'\x00' * 16
+
+
+def path_prefix_bounds(root):
+    """
+    Returns (lower, upper) so that `filepath >= lower AND filepath < upper` matches every path
+    below root. This is an indexed range scan on the UNIQUE filepath index instead of a LIKE.
+    """
+    prefix = root.rstrip("\\/") + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class TrackPathIndex:
+    """
+    Compact in-memory map of the tracks below one music root, keyed by path relative to the root.
+    Loaded once at the start of a root's scan so per-file change detection is a dict lookup
+    instead of a B-tree query. Holds at most max_entries; beyond that it is marked incomplete
+    and misses fall back to the database, which keeps memory bounded for huge roots.
+    """
+
+    def __init__(self, root, max_entries=TRACK_PATH_INDEX_MAX_ENTRIES):
+        self.root_prefix = root.rstrip("\\/") + os.sep
+        self.max_entries = max_entries
+        self.complete = True
+        self._entries = {}
+
+    @classmethod
+    def load(cls, cursor, root, max_entries=TRACK_PATH_INDEX_MAX_ENTRIES):
+        index = cls(root, max_entries)
+        start_time = time.perf_counter()
+        lower, upper = path_prefix_bounds(root)
+        cursor.execute(f"""SELECT id, filepath, filesize, last_modified, filehash FROM {DB_TRACKS_TABLE}
+                           WHERE filepath >= ? AND filepath < ?""", (lower, upper))
+        prefix_len = len(index.root_prefix)
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for row in rows:
+                if len(index._entries) >= max_entries:
+                    index.complete = False
+                    break
+                index._entries[row['filepath'][prefix_len:]] = index._pack(
+                    row['id'], row['filesize'], row['last_modified'], row['filehash'])
+            if not index.complete:
+                break
+        Logger.info(f"TrackPathIndex: Loaded {len(index._entries)} tracks for '{root}' in "
+                    f"{(time.perf_counter() - start_time) * 1000:.0f} ms, ~{index.approx_memory_bytes() / (1024 * 1024):.1f} MB"
+                    f"{'' if index.complete else f' (capped at {max_entries}, misses fall back to the DB)'}.")
+        return index
+
+    @staticmethod
+    def _pack(track_id, filesize, last_modified, filehash):
+        digest = bytes.fromhex(filehash) if filehash and len(filehash) == 32 else _NO_HASH
+        return _ENTRY_STRUCT.pack(track_id, filesize if filesize is not None else -1, last_modified or 0.0, digest)
+
+    @staticmethod
+    def _unpack(packed):
+        track_id, filesize, last_modified, digest = _ENTRY_STRUCT.unpack(packed)
+        return (track_id, filesize if filesize >= 0 else None, last_modified,
+                digest.hex() if digest != _NO_HASH else None)
+
+    def _key(self, filepath):
+        return filepath[len(self.root_prefix):] if filepath.startswith(self.root_prefix) else None
+
+    def lookup(self, cursor, filepath):
+        """Returns (track_id, filesize, last_modified, filehash) or None if the path is not in the library."""
+        key = self._key(filepath)
+        if key is not None:
+            packed = self._entries.get(key)
+            if packed is not None:
+                return self._unpack(packed)
+            if self.complete:
+                return None
+        cursor.execute(f"SELECT id, filesize, last_modified, filehash FROM {DB_TRACKS_TABLE} WHERE filepath = ?", (filepath,))
+        row = cursor.fetchone()
+        return (row['id'], row['filesize'], row['last_modified'], row['filehash']) if row else None
+
+    def put(self, filepath, track_id, filesize, last_modified, filehash):
+        key = self._key(filepath)
+        if key is None:
+            return
+        if key in self._entries or len(self._entries) < self.max_entries:
+            self._entries[key] = self._pack(track_id, filesize, last_modified, filehash)
+        else:
+            self.complete = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def approx_memory_bytes(self):
+        """Measured size of the map: the dict itself plus every key and packed value."""
+        return sys.getsizeof(self._entries) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self._entries.items())
@@ -0,0 +1 @@
+# dad_player/tests/__init__.py
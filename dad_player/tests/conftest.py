@@ -0,0 +1,31 @@
+# dad_player/tests/conftest.py
+import os
+
+# Kivy would otherwise parse pytest's command line as its own and log to the console on import
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+import pytest
+
+from dad_player.core.db_connection import connect, close_connection
+from dad_player.core.db_migrations import migrate
+from dad_player.core.library_manager import LibraryManager
+
+
+@pytest.fixture
+def library_db(tmp_path):
+    """Path of an empty library database at the current schema version."""
+    db_path = tmp_path / "library.db"
+    conn = connect(db_path)
+    assert migrate(conn)
+    close_connection(conn)
+    return db_path
+
+
+@pytest.fixture
+def library_manager(tmp_path, monkeypatch):
+    """A LibraryManager on an empty database under a temporary home directory, closed afterwards."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    manager = LibraryManager(settings_manager=None)
+    yield manager
+    manager.close()
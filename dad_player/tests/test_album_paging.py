@@ -0,0 +1,84 @@
+# dad_player/tests/test_album_paging.py
+import sqlite3
+
+import pytest
+
+from dad_player.constants import ALBUM_SORT_NAME, ALBUM_SORT_YEAR, ALBUM_SORT_ADDED, ALBUM_SORT_ARTIST
+from dad_player.core.sort_keys import sort_key
+
+ARTISTS = ["The Beatles", "Édith Piaf", "ABBA", "Zappa"]
+# (name, artist index, year, genre); names and years repeat so the cursor's tie-breakers matter
+ALBUMS = [
+    ("Abbey Road", 0, 1969, "Rock"), ("Help!", 0, 1965, "Rock"), ("Revolver", 0, 1966, "Rock"),
+    ("La Vie en rose", 1, 1947, "Chanson"), ("Greatest Hits", 1, None, "Chanson"), ("Vol. 2", 1, 1950, "Chanson"),
+    ("Vol. 10", 1, 1950, "Chanson"), ("Arrival", 2, 1976, "Pop"), ("Greatest Hits", 2, 1992, "Pop"),
+    ("The Album", 2, 1977, "Pop"), ("Hot Rats", 3, 1969, "Rock"), ("Apostrophe (')", 3, 1974, "Rock"),
+    ("Greatest Hits", 3, None, "Rock"), ("Sheik Yerbouti", 3, 1979, "Rock"), ("Joe's Garage", 3, 1979, "Rock"),
+    ("Zoot Allures", 3, 1976, "Rock"), ("Début", 0, 1963, "Pop"),
+]
+
+
+@pytest.fixture
+def library(library_manager):
+    """library_manager with ALBUMS in its database, one track each."""
+    conn = sqlite3.connect(library_manager.db_path)
+    conn.executemany("INSERT INTO artists (name, sort_name) VALUES (?, ?)", ((name, sort_key(name)) for name in ARTISTS))
+    for number, (name, artist_index, year, genre) in enumerate(ALBUMS):
+        cursor = conn.execute("INSERT INTO albums (name, artist_id, year, sort_name) VALUES (?, ?, ?, ?)",
+                              (name, artist_index + 1, year, sort_key(name)))
+        conn.execute("""INSERT INTO tracks (filepath, title, album_id, artist_id, genre, year, duration)
+                        VALUES (?, ?, ?, ?, ?, ?, 180)""",
+                     (f"/music/{number}.mp3", name, cursor.lastrowid, artist_index + 1, genre, year))
+    conn.commit()
+    conn.close()
+    return library_manager
+
+
+def _expected_order(sort, albums):
+    """Album ids of (album id, ALBUMS entry) pairs in the order get_albums_page documents for sort."""
+    def key(item):
+        album_id, (name, artist_index, year, _) = item
+        if sort == ALBUM_SORT_YEAR:
+            return (year if year is not None else 9999, sort_key(name), album_id)
+        if sort == ALBUM_SORT_ARTIST:
+            return (sort_key(ARTISTS[artist_index]), sort_key(name), album_id)
+        if sort == ALBUM_SORT_ADDED:
+            return (-album_id,)
+        return (sort_key(name), album_id)
+    return [album_id for album_id, _ in sorted(albums, key=key)]
+
+
+def _page_through(library, limit, **kwargs):
+    ids, cursor = [], None
+    while True:
+        albums, cursor = library.get_albums_page(after=cursor, limit=limit, **kwargs)
+        ids.extend(album["id"] for album in albums)
+        if cursor is None:
+            return ids
+        assert len(albums) == limit
+
+
+@pytest.mark.parametrize("sort", [ALBUM_SORT_NAME, ALBUM_SORT_YEAR, ALBUM_SORT_ADDED, ALBUM_SORT_ARTIST])
+@pytest.mark.parametrize("limit", [1, 3, len(ALBUMS)])
+def test_pages_cover_every_album_once_in_order(library, sort, limit):
+    expected = _expected_order(sort, enumerate(ALBUMS, start=1))
+    assert _page_through(library, limit, sort=sort) == expected
+
+
+@pytest.mark.parametrize("sort", [ALBUM_SORT_NAME, ALBUM_SORT_YEAR, ALBUM_SORT_ADDED, ALBUM_SORT_ARTIST, None])
+@pytest.mark.parametrize("filters, matches", [
+    ({"artist_id": 4}, lambda name, artist_index, year, genre: artist_index == 3),
+    ({"genre": "Rock"}, lambda name, artist_index, year, genre: genre == "Rock"),
+    ({"year": 1979}, lambda name, artist_index, year, genre: year == 1979),
+    ({"decade": 1960}, lambda name, artist_index, year, genre: year is not None and 1960 <= year <= 1969),
+])
+def test_filtered_pages_in_order(library, sort, filters, matches):
+    default_sort = ALBUM_SORT_YEAR if "decade" in filters else ALBUM_SORT_NAME
+    matching = [(album_id, album) for album_id, album in enumerate(ALBUMS, start=1) if matches(*album)]
+    expected = _expected_order(sort or default_sort, matching)
+    assert _page_through(library, 2, sort=sort, **filters) == expected
+
+
+def test_year_filters_skip_albums_without_a_year(library):
+    assert library.get_albums_page(year=9999) == ([], None)
+    assert library.get_albums_page(decade=9990) == ([], None)
@@ -0,0 +1,45 @@
+# dad_player/tests/test_db_maintenance.py
+import sqlite3
+
+from dad_player.core import db_maintenance
+from dad_player.core.db_maintenance import DatabaseMaintenance, OUTCOME_DONE, OUTCOME_PARTIAL
+
+
+def _checkable_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL%' ORDER BY name")]
+    finally:
+        conn.close()
+
+
+def _integrity_log(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT outcome, details FROM db_maintenance_log WHERE step = 'integrity_check' ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_integrity_check_resumes_where_the_time_box_stopped_it(library_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_maintenance, "MAINTENANCE_STEP_SECONDS", 0) # Every run stops after its first table
+    maintenance = DatabaseMaintenance(library_db, should_abort=lambda: False, art_cache_dir=tmp_path / "art")
+    runs = []
+    while not runs or runs[-1]["integrity_check"] != OUTCOME_DONE:
+        assert len(runs) < 100
+        runs.append(maintenance.run(["integrity_check", "art_cache"]))
+
+    tables = _checkable_tables(library_db) # Read afterwards: closing a connection can add sqlite_stat1
+    assert runs[:-1] == [{"integrity_check": OUTCOME_PARTIAL}] * (len(tables) - 1)
+    assert runs[-1] == {"integrity_check": OUTCOME_DONE, "art_cache": OUTCOME_DONE}
+    log = _integrity_log(library_db)
+    assert log[:-1] == [(OUTCOME_PARTIAL, f"checked through {table}") for table in tables[:-1]]
+    assert log[-1] == (OUTCOME_DONE, "ok")
+
+
+def test_integrity_check_restarts_after_a_completed_pass(library_db, tmp_path):
+    maintenance = DatabaseMaintenance(library_db, should_abort=lambda: False, art_cache_dir=tmp_path / "art")
+    for _ in range(2):
+        assert maintenance.run(["integrity_check", "art_cache"]) == {"integrity_check": OUTCOME_DONE, "art_cache": OUTCOME_DONE}
+    assert _integrity_log(library_db) == [(OUTCOME_DONE, "ok"), (OUTCOME_DONE, "ok")]
@@ -0,0 +1,172 @@
+# dad_player/tests/test_library_importer.py
+import io
+import sqlite3
+
+from dad_player.core.library_importer import (
+    LibraryImporter, parse_itunes_plist, parse_rhythmbox_xml,
+    IMPORT_TRACK, IMPORT_PLAYLIST_START, IMPORT_PLAYLIST_ITEM, IMPORT_PLAYLIST_END
+)
+
+
+def _itunes_playlist(name, track_ids, extra=""):
+    items = "".join(f"<dict><key>Track ID</key><integer>{track_id}</integer></dict>" for track_id in track_ids)
+    return (f"<dict><key>Name</key><string>{name}</string>{extra}"
+            f"<key>Playlist Items</key><array>{items}</array></dict>")
+
+
+ITUNES_LIBRARY = f"""<?xml version="1.0" encoding="UTF-8"?>
+<plist version="1.0">
+<dict>
+    <key>Major Version</key><integer>1</integer>
+    <key>Tracks</key>
+    <dict>
+        <key>101</key>
+        <dict>
+            <key>Track ID</key><integer>101</integer>
+            <key>Name</key><string>First</string>
+            <key>Play Count</key><integer>4</integer>
+            <key>Play Date UTC</key><date>2020-01-02T03:04:05Z</date>
+            <key>Location</key><string>file://localhost/music/A%20B/01%20First.mp3</string>
+        </dict>
+        <key>102</key>
+        <dict>
+            <key>Track ID</key><integer>102</integer>
+            <key>Name</key><string>Second</string>
+            <key>Skip Count</key><integer>2</integer>
+            <key>Location</key><string>file://localhost/music/A%20B/02%20Second.mp3</string>
+        </dict>
+        <key>103</key>
+        <dict>
+            <key>Track ID</key><integer>103</integer>
+            <key>Name</key><string>Stream</string>
+            <key>Location</key><string>file://nas/share/03.mp3</string>
+        </dict>
+    </dict>
+    <key>Playlists</key>
+    <array>
+        {_itunes_playlist("Library", [101, 102, 103], "<key>Master</key><true/>")}
+        {_itunes_playlist("Music", [101, 102], "<key>Distinguished Kind</key><integer>4</integer>")}
+        {_itunes_playlist("Top Rated", [101], "<key>Smart Info</key><data>AQEAAwAAAAIAAAAZ</data>")}
+        {_itunes_playlist("Road Trip", [102, 101, 103])}
+    </array>
+</dict>
+</plist>
+"""
+
+RHYTHMBOX_DB = """<?xml version="1.0"?>
+<rhythmdb version="2.0">
+    <entry type="song"><title>First</title><location>file:///music/A%20B/01%20First.mp3</location>
+        <play-count>3</play-count><last-played>1600000000</last-played></entry>
+    <entry type="iradio"><title>Radio</title><location>http://radio.example/stream</location></entry>
+    <entry type="song"><title>Second</title><location>file:///music/A%20B/02%20Second.mp3</location></entry>
+</rhythmdb>
+"""
+
+RHYTHMBOX_PLAYLISTS = """<?xml version="1.0"?>
+<rhythmdb-playlists>
+    <playlist name="Favourites" type="static">
+        <location>file:///music/A%20B/02%20Second.mp3</location>
+        <location>file:///music/A%20B/01%20First.mp3</location>
+    </playlist>
+    <playlist name="Recently Added" type="automatic"><conjunction/></playlist>
+    <playlist name="Play Queue" type="queue"/>
+</rhythmdb-playlists>
+"""
+
+
+def _parse(parser, text):
+    return list(parser(io.BytesIO(text.encode("utf-8"))))
+
+
+def test_itunes_tracks_and_stats():
+    tracks = [event for event in _parse(parse_itunes_plist, ITUNES_LIBRARY) if event[0] == IMPORT_TRACK]
+    assert tracks == [
+        (IMPORT_TRACK, 101, "/music/A B/01 First.mp3", 4, 0, 1577934245),
+        (IMPORT_TRACK, 102, "/music/A B/02 Second.mp3", 0, 2, None),
+        (IMPORT_TRACK, 103, None, 0, 0, None), # Remote files can't be in the library
+    ]
+
+
+def test_itunes_skips_builtin_and_smart_playlists():
+    playlist_events = [event for event in _parse(parse_itunes_plist, ITUNES_LIBRARY) if event[0] != IMPORT_TRACK]
+    assert playlist_events == [
+        (IMPORT_PLAYLIST_START, "Road Trip"),
+        (IMPORT_PLAYLIST_ITEM, 102),
+        (IMPORT_PLAYLIST_ITEM, 101),
+        (IMPORT_PLAYLIST_ITEM, 103),
+        (IMPORT_PLAYLIST_END,),
+    ]
+
+
+def test_rhythmbox_songs_only():
+    assert _parse(parse_rhythmbox_xml, RHYTHMBOX_DB) == [
+        (IMPORT_TRACK, None, "/music/A B/01 First.mp3", 3, 0, 1600000000.0),
+        (IMPORT_TRACK, None, "/music/A B/02 Second.mp3", 0, 0, None),
+    ]
+
+
+def test_rhythmbox_static_playlists_only():
+    assert _parse(parse_rhythmbox_xml, RHYTHMBOX_PLAYLISTS) == [
+        (IMPORT_PLAYLIST_START, "Favourites"),
+        (IMPORT_PLAYLIST_ITEM, "/music/A B/02 Second.mp3"),
+        (IMPORT_PLAYLIST_ITEM, "/music/A B/01 First.mp3"),
+        (IMPORT_PLAYLIST_END,),
+    ]
+
+
+def _add_tracks(db_path, filepaths):
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO tracks (filepath, title) VALUES (?, ?)", ((path, path) for path in filepaths))
+    conn.commit()
+    conn.close()
+
+
+def _library_state(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        stats = conn.execute("""SELECT t.filepath, s.play_count, s.skip_count, s.last_played FROM track_stats s
+                                JOIN tracks t ON t.id = s.track_id ORDER BY t.filepath""").fetchall()
+        playlists = conn.execute("""SELECT p.name, p.source, pt.position, t.filepath FROM playlists p
+                                    JOIN playlist_tracks pt ON pt.playlist_id = p.id JOIN tracks t ON t.id = pt.track_id
+                                    ORDER BY p.name, pt.position""").fetchall()
+        return stats, playlists
+    finally:
+        conn.close()
+
+
+def test_itunes_reimport_is_idempotent(library_db, tmp_path):
+    _add_tracks(library_db, ["/music/A B/01 First.mp3", "/music/A B/02 Second.mp3"])
+    export = tmp_path / "Library.xml"
+    export.write_text(ITUNES_LIBRARY, encoding="utf-8")
+
+    importer = LibraryImporter(library_db)
+    importer.run(str(export))
+    assert (importer.tracks_matched, importer.tracks_unmatched, importer.playlists_imported) == (2, 1, 1)
+    first_import = _library_state(library_db)
+    assert first_import == (
+        [("/music/A B/01 First.mp3", 4, 0, 1577934245), ("/music/A B/02 Second.mp3", 0, 2, None)],
+        [("Road Trip", "itunes", 0, "/music/A B/02 Second.mp3"), ("Road Trip", "itunes", 1, "/music/A B/01 First.mp3")],
+    )
+
+    LibraryImporter(library_db).run(str(export))
+    assert _library_state(library_db) == first_import
+
+
+def test_rhythmbox_reimport_is_idempotent(library_db, tmp_path):
+    _add_tracks(library_db, ["/music/A B/01 First.mp3", "/music/A B/02 Second.mp3"])
+    rhythmdb = tmp_path / "rhythmdb.xml"
+    rhythmdb.write_text(RHYTHMBOX_DB, encoding="utf-8")
+    playlists = tmp_path / "playlists.xml"
+    playlists.write_text(RHYTHMBOX_PLAYLISTS, encoding="utf-8")
+
+    for path in (rhythmdb, playlists):
+        LibraryImporter(library_db).run(str(path))
+    first_import = _library_state(library_db)
+    assert first_import == (
+        [("/music/A B/01 First.mp3", 3, 0, 1600000000.0)],
+        [("Favourites", "rhythmbox", 0, "/music/A B/02 Second.mp3"), ("Favourites", "rhythmbox", 1, "/music/A B/01 First.mp3")],
+    )
+
+    for path in (rhythmdb, playlists):
+        LibraryImporter(library_db).run(str(path))
+    assert _library_state(library_db) == first_import
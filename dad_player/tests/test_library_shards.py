@@ -0,0 +1,141 @@
+# dad_player/tests/test_library_shards.py
+import os
+import sqlite3
+
+import pytest
+
+from dad_player.constants import LIBRARY_SHARD_ID_SPAN
+from dad_player.core.library_scanner import LibraryScanner
+from dad_player.core.library_shards import create_shard, get_shards, shard_path
+from dad_player.core.play_history import PLAY_EVENT_FINISH
+from dad_player.core.sort_keys import sort_key
+
+
+def _add_album(db_path, root, artist, album, genre, titles):
+    """Adds an album with its artist and tracks below root; returns the track ids."""
+    conn = sqlite3.connect(db_path)
+    try:
+        artist_id = conn.execute("INSERT INTO artists (name, sort_name) VALUES (?, ?)", (artist, sort_key(artist))).lastrowid
+        album_id = conn.execute("INSERT INTO albums (name, artist_id, year, sort_name) VALUES (?, ?, 1970, ?)",
+                                (album, artist_id, sort_key(album))).lastrowid
+        track_ids = [conn.execute("""INSERT INTO tracks (filepath, title, album_id, artist_id, genre, track_number, duration)
+                                     VALUES (?, ?, ?, ?, ?, ?, 180)""",
+                                  (os.path.join(root, album, f"{number}.mp3"), title, album_id, artist_id, genre, number)).lastrowid
+                     for number, title in enumerate(titles, start=1)]
+        conn.commit()
+        return track_ids
+    finally:
+        conn.close()
+
+
+def _add_shard(library_manager, root):
+    conn = sqlite3.connect(library_manager.db_path)
+    try:
+        shard_id = create_shard(conn, library_manager.shards_dir, root)
+    finally:
+        conn.close()
+    library_manager._db.invalidate()
+    return shard_path(library_manager.shards_dir, shard_id)
+
+
+@pytest.fixture
+def library(library_manager, tmp_path):
+    """library_manager with one album in the library database and one in the database of the root tmp_path / "b"."""
+    root_b = str(tmp_path / "b")
+    main_ids = _add_album(library_manager.db_path, str(tmp_path / "a"), "ABBA", "Arrival", "Pop", ["Dancing Queen", "Money"])
+    shard_ids = _add_album(_add_shard(library_manager, root_b), root_b, "The Beatles", "Abbey Road", "Rock",
+                           ["Come Together", "Money"])
+    return library_manager, root_b, main_ids, shard_ids
+
+
+def test_root_databases_hand_out_their_own_ids(library):
+    _, _, main_ids, shard_ids = library
+    assert max(main_ids) < LIBRARY_SHARD_ID_SPAN
+    assert all(LIBRARY_SHARD_ID_SPAN < track_id < 2 * LIBRARY_SHARD_ID_SPAN for track_id in shard_ids)
+
+
+def test_browsing_and_search_cover_every_database(library):
+    manager, _, main_ids, shard_ids = library
+    albums, _ = manager.get_albums_page()
+    assert [album["name"] for album in albums] == ["Abbey Road", "Arrival"]
+    assert [artist["name"] for artist in manager.get_artists_page()[0]] == ["ABBA", "The Beatles"]
+    assert [album["name"] for album in manager.get_albums_page(genre="Rock")[0]] == ["Abbey Road"]
+    assert [genre["name"] for genre in manager.get_genres()] == ["Pop", "Rock"]
+
+    stats = manager.get_library_stats()
+    assert (stats["track_count"], stats["album_count"], stats["artist_count"]) == (4, 2, 2)
+
+    detail = manager.get_album_detail(albums[0]["id"])
+    assert [(track["title"], track["artist_name"]) for track in detail["tracks"]] == [
+        ("Come Together", "The Beatles"), ("Money", "The Beatles")]
+    details = manager.get_track_details_bulk([main_ids[0], shard_ids[0]])
+    assert details[shard_ids[0]]["album"] == "Abbey Road" and details[main_ids[0]]["artist"] == "ABBA"
+
+    assert [track["id"] for track in manager.search("together")] == [shard_ids[0]]
+    assert sorted((track["id"], track["album_name"]) for track in manager.search("money")) == [
+        (main_ids[1], "Arrival"), (shard_ids[1], "Abbey Road")]
+
+
+def test_statistics_and_smart_playlists_span_databases(library):
+    manager, _, main_ids, shard_ids = library
+    assert manager.record_play_events([(shard_ids[1], PLAY_EVENT_FINISH, 1000, 0), (main_ids[0], PLAY_EVENT_FINISH, 2000, 0)],
+                                      refresh_smart_playlists=False)
+    assert [track["id"] for track in manager.get_recently_played()] == [main_ids[0], shard_ids[1]]
+
+    playlist_id = manager.create_smart_playlist("1970", {"rules": [{"field": "year", "op": "=", "value": 1970}]})
+    assert [track["title"] for track in manager.get_smart_playlist_tracks(playlist_id)] == [
+        "Dancing Queen", "Money", "Come Together", "Money"] # By artist sort name: "abba", "beatles"
+    played_id = manager.create_smart_playlist("Played", {"rules": [{"field": "play_count", "op": ">", "value": 0}],
+                                                         "order_by": "title", "descending": True})
+    assert [track["id"] for track in manager.get_smart_playlist_tracks(played_id)] == [shard_ids[1], main_ids[0]] # Money, Dancing Queen
+
+
+def test_purging_a_root_deletes_its_database(library):
+    manager, root_b, main_ids, shard_ids = library
+    db_file = shard_path(manager.shards_dir, 1)
+    manager.record_play_events([(shard_ids[0], PLAY_EVENT_FINISH, 1000, 0)], refresh_smart_playlists=False)
+
+    manager._purge_root_thread_target(root_b, (), None)
+
+    assert not os.path.exists(db_file)
+    conn = sqlite3.connect(manager.db_path)
+    try:
+        assert get_shards(conn) == {}
+        assert conn.execute("SELECT COUNT(*) FROM track_stats").fetchone()[0] == 0
+    finally:
+        conn.close()
+    assert manager.get_library_stats()["track_count"] == 2
+    assert [album["name"] for album in manager.get_albums_page()[0]] == ["Arrival"]
+
+
+def test_scanner_writes_each_root_to_its_database(library_db, tmp_path):
+    shards_dir = tmp_path / "shards"
+    conn = sqlite3.connect(library_db)
+    try:
+        db_file = shard_path(shards_dir, create_shard(conn, shards_dir, str(tmp_path / "b")))
+    finally:
+        conn.close()
+    for root in ("a", "b"):
+        os.makedirs(tmp_path / root)
+        (tmp_path / root / "junk.mp3").write_bytes(b"not audio") # Unreadable, so quarantined where it belongs
+
+    def quarantined(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            return [row[0] for row in conn.execute("SELECT filepath FROM scan_quarantine")]
+        finally:
+            conn.close()
+
+    def scan(full_rescan=False):
+        scanner = LibraryScanner(library_db, tmp_path / "art", lambda kind, *payload: None, lambda: True,
+                                 shards={str(tmp_path / "b"): db_file})
+        scanner.run([str(tmp_path / "a"), str(tmp_path / "b")], full_rescan=full_rescan)
+
+    scan()
+    assert quarantined(library_db) == [str(tmp_path / "a" / "junk.mp3")]
+    assert quarantined(db_file) == [str(tmp_path / "b" / "junk.mp3")]
+
+    os.remove(tmp_path / "b" / "junk.mp3")
+    scan(full_rescan=True)
+    assert quarantined(db_file) == []
+    assert quarantined(library_db) == [str(tmp_path / "a" / "junk.mp3")]
@@ -0,0 +1,69 @@
+# dad_player/tests/test_play_history.py
+import sqlite3
+import time
+
+from kivy.clock import Clock
+
+from dad_player.core.library_manager import LibraryManager
+from dad_player.core.play_history import PLAY_EVENT_FINISH
+
+PLAYED_ONCE = {"match": "all", "rules": [{"field": "play_count", "op": ">=", "value": 1}]}
+
+
+def _add_tracks(library_manager, count):
+    conn = sqlite3.connect(library_manager.db_path)
+    conn.executemany("INSERT INTO tracks (filepath, title) VALUES (?, ?)",
+                     ((f"/music/{number}.mp3", f"Song {number}") for number in range(count)))
+    conn.commit()
+    conn.close()
+
+
+def _members(library_manager, playlist_id):
+    conn = sqlite3.connect(library_manager.db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT t.filepath FROM smart_playlist_tracks m JOIN tracks t ON t.id = m.track_id "
+            "WHERE m.playlist_id = ? ORDER BY t.filepath", (playlist_id,))]
+    finally:
+        conn.close()
+
+
+def _pump_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        Clock.tick()
+        time.sleep(0.01)
+
+
+def test_async_flush_refreshes_stats_smart_playlists(library_manager):
+    _add_tracks(library_manager, 3)
+    playlist_id = library_manager.create_smart_playlist("Played", PLAYED_ONCE)
+    assert _members(library_manager, playlist_id) == []
+
+    recorder = library_manager.play_history
+    recorder.record("/music/1.mp3", PLAY_EVENT_FINISH, 180000)
+    written = []
+    recorder._on_flushed = written.append # Called on the main thread once the query thread has written the batch
+    recorder.flush()
+    _pump_until(lambda: written)
+
+    assert written == [True]
+    assert _members(library_manager, playlist_id) == ["/music/1.mp3"]
+
+
+def test_shutdown_flush_leaves_the_refresh_to_the_next_read(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    library_manager = LibraryManager(settings_manager=None)
+    _add_tracks(library_manager, 3)
+    playlist_id = library_manager.create_smart_playlist("Played", PLAYED_ONCE)
+    library_manager.play_history.record("/music/2.mp3", PLAY_EVENT_FINISH, 180000)
+    library_manager.close() # Writes the buffered event on this thread without running any rules
+
+    assert _members(library_manager, playlist_id) == []
+    reopened = LibraryManager(settings_manager=None)
+    try:
+        assert [track["filepath"] for track in reopened.get_smart_playlist_tracks(playlist_id)] == ["/music/2.mp3"]
+        assert _members(reopened, playlist_id) == ["/music/2.mp3"]
+    finally:
+        reopened.close()
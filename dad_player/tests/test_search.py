@@ -0,0 +1,37 @@
+# dad_player/tests/test_search.py
+import sqlite3
+
+from dad_player.constants import SEARCH_RANK_CANDIDATES
+
+
+def _add_titles(library_manager, titles):
+    conn = sqlite3.connect(library_manager.db_path)
+    conn.executemany("INSERT INTO tracks (id, filepath, title) VALUES (?, ?, ?)",
+                     ((track_id, f"/music/{track_id}.mp3", title) for track_id, title in titles))
+    conn.commit()
+    conn.close()
+
+
+def _filler(track_id):
+    return f"Song number {track_id} with a rather long title"
+
+
+def test_ranking_is_exact_up_to_the_candidate_cap(library_manager):
+    count = SEARCH_RANK_CANDIDATES
+    _add_titles(library_manager, [(track_id, _filler(track_id)) for track_id in range(1, count)] + [(count, "Song")])
+    assert library_manager.search("song", limit=1)[0]["id"] == count # Shortest title ranks first, wherever it is
+
+
+def test_broad_queries_rank_only_the_first_candidates(library_manager):
+    best_in_cap = SEARCH_RANK_CANDIDATES // 2
+    best_overall = SEARCH_RANK_CANDIDATES + 500
+    titles = [(track_id, _filler(track_id)) for track_id in range(1, best_overall)]
+    titles[best_in_cap - 1] = (best_in_cap, "Song song")
+    _add_titles(library_manager, titles + [(best_overall, "Song")])
+
+    results = library_manager.search("song", limit=10)
+
+    # Documented approximation: the best match past SEARCH_RANK_CANDIDATES is not considered, the
+    # best among the candidates still comes first
+    assert results[0]["id"] == best_in_cap
+    assert all(track["id"] <= SEARCH_RANK_CANDIDATES for track in results)
@@ -0,0 +1,102 @@
+# dad_player/tests/test_smart_playlists.py
+import json
+import sqlite3
+
+import pytest
+
+from dad_player.core.smart_playlists import (
+    compile_rules, SmartPlaylistError, SMART_PLAYLIST_FROM, DEFAULT_ORDER
+)
+
+NOW = 1_700_000_000
+
+
+def test_nested_groups():
+    compiled = compile_rules({"match": "all", "rules": [
+        {"field": "genre", "op": "is", "value": "Jazz"},
+        {"match": "any", "rules": [
+            {"field": "year", "op": "<", "value": 1960},
+            {"field": "artist", "op": "contains", "value": "Davis"},
+        ]},
+    ]}, now=NOW)
+    assert compiled.where == "(t.genre = ? AND (COALESCE(t.year, al.year) < ? OR ar.name LIKE ? ESCAPE '\\'))"
+    assert compiled.params == ["Jazz", 1960.0, "%Davis%"]
+    assert not compiled.uses_stats and not compiled.time_relative
+    assert compiled.order_by == DEFAULT_ORDER
+
+
+def test_empty_group_matches_everything():
+    assert compile_rules({"rules": []}).where == "1"
+    assert compile_rules({"match": "any", "rules": [{"match": "all", "rules": []}]}).where == "(1)"
+
+
+def test_values_are_parameters_not_sql():
+    compiled = compile_rules({"rules": [
+        {"field": "title", "op": "starts_with", "value": "50%_off'; DROP TABLE tracks; --"},
+        {"field": "duration", "op": "between", "value": ["60", 300]},
+    ]})
+    assert "DROP" not in compiled.where and "50" not in compiled.where
+    assert compiled.params == ["50\\%\\_off'; DROP TABLE tracks; --%", 60.0, 300.0]
+
+
+def test_like_patterns_are_escaped_in_sqlite():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (title TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?)", [("100% Hits",), ("1000 Hits",), ("a_b",), ("axb",)])
+    for value, expected in (("100%", ["100% Hits"]), ("a_b", ["a_b"])):
+        compiled = compile_rules({"rules": [{"field": "title", "op": "contains", "value": value}]})
+        rows = conn.execute(f"SELECT title FROM t WHERE {compiled.where}", compiled.params).fetchall()
+        assert [row[0] for row in rows] == expected
+
+
+def test_stats_and_relative_dates():
+    compiled = compile_rules({"rules": [
+        {"field": "play_count", "op": ">=", "value": 5},
+        {"field": "last_played", "op": "not_in_last_days", "value": 30},
+    ]}, now=NOW)
+    assert compiled.uses_stats and compiled.time_relative
+    assert compiled.where == "(COALESCE(s.play_count, 0) >= ? AND (s.last_played IS NULL OR s.last_played < ?))"
+    assert compiled.params == [5.0, NOW - 30 * 86400]
+
+
+def test_rules_as_json_and_order_by():
+    compiled = compile_rules(json.dumps({"rules": [{"field": "genre", "op": "is_not", "value": "Podcast"}],
+                                         "order_by": "play_count", "descending": True}))
+    assert compiled.where == "((t.genre IS NULL OR t.genre != ?))"
+    assert compiled.order_by == "COALESCE(s.play_count, 0) DESC, t.id"
+
+
+@pytest.mark.parametrize("rules, message", [
+    ({"rules": [{"field": "rating", "op": "is", "value": 5}]}, "Unknown field 'rating'"),
+    ({"rules": [{"field": "t.title; --", "op": "is", "value": "x"}]}, "Unknown field"),
+    ({"rules": [{"field": "year", "op": "contains", "value": 19}]}, "Operator 'contains' does not apply to year"),
+    ({"rules": [{"field": "title", "op": "<", "value": "x"}]}, "Operator '<' does not apply to title"),
+    ({"rules": [{"field": "last_played", "op": "is", "value": 1}]}, "does not apply to last_played"),
+    ({"rules": [{"field": "year", "op": ">", "value": "recent"}]}, "Invalid value"),
+    ({"rules": [{"field": "year", "op": "between", "value": 1970}]}, "Invalid value"),
+    ({"match": "some", "rules": []}, "Unknown match mode 'some'"),
+    ({"rules": [{"match": "none", "rules": []}]}, "Unknown match mode 'none'"),
+    ({"rules": [], "order_by": "random()"}, "to order by"),
+    ("{not json", "not valid JSON"),
+    ([{"field": "year", "op": "<", "value": 1}], "must be a group"),
+])
+def test_rejects_malformed_rules(rules, message):
+    with pytest.raises(SmartPlaylistError, match=message.replace("(", "\\(")):
+        compile_rules(rules)
+
+
+def test_compiles_against_the_library_schema(library_db):
+    compiled = compile_rules({"match": "any", "rules": [
+        {"field": field, "op": op, "value": value} for field, op, value in (
+            ("title", "is", "x"), ("artist", "ends_with", "x"), ("album", "not_contains", "x"),
+            ("genre", "is", "x"), ("filepath", "starts_with", "/"), ("year", "=", 1),
+            ("duration", ">", 1), ("track_number", "<=", 1), ("disc_number", "!=", 1),
+            ("play_count", ">", 1), ("skip_count", "<", 1), ("last_played", "in_last_days", 1),
+        )
+    ], "order_by": "last_played"})
+    conn = sqlite3.connect(library_db)
+    try:
+        conn.execute(f"SELECT t.id FROM {SMART_PLAYLIST_FROM} WHERE {compiled.where} ORDER BY {compiled.order_by}",
+                     compiled.params).fetchall()
+    finally:
+        conn.close()
@@ -0,0 +1,51 @@
+# dad_player/tests/test_sort_keys.py
+import pytest
+
+from dad_player.core.sort_keys import sort_key
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("The Beatles", "beatles"),
+    ("A Tribe Called Quest", "tribe called quest"),
+    ("An Evening Wasted", "evening wasted"),
+    ("THE   WHO", "who"),
+    ("The", "the"), # Nothing left to sort by once the article is gone
+    ("Theatre of Tragedy", "theatre of tragedy"), # Only whole words are articles
+    ("Anthrax", "anthrax"),
+])
+def test_leading_articles(name, expected):
+    assert sort_key(name) == expected
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Édith Piaf", "edith piaf"),
+    ("Björk", "bjork"),
+    ("Sigur Rós", "sigur ros"),
+    ("MOTÖRHEAD", "motorhead"),
+    ("Straße", "strasse"),
+])
+def test_accents_and_case_are_folded(name, expected):
+    assert sort_key(name) == expected
+
+
+def test_leading_punctuation_is_ignored():
+    assert sort_key('"Heroes"') == 'heroes"'
+    assert sort_key("...And Justice for All") == "and justice for all"
+    assert sort_key("!!!") == "!!!" # All punctuation: keep it rather than sort as empty
+
+
+def test_numbers_are_padded():
+    assert sort_key("Vol. 2") == "vol. 0000000002"
+    names = ["Vol. 10", "Vol. 2", "Vol. 1", "Symphony No. 9", "Symphony No. 10", "1999", "200 Km/h"]
+    assert sorted(names, key=sort_key) == ["200 Km/h", "1999", "Symphony No. 9", "Symphony No. 10",
+                                           "Vol. 1", "Vol. 2", "Vol. 10"]
+
+
+def test_articles_and_accents_together_order_a_list():
+    names = ["The Zombies", "Édith Piaf", "ABBA", "a-ha", "The Beatles", "Eagles"]
+    assert sorted(names, key=sort_key) == ["a-ha", "ABBA", "The Beatles", "Eagles", "Édith Piaf", "The Zombies"]
+
+
+@pytest.mark.parametrize("name", [None, ""])
+def test_empty_names(name):
+    assert sort_key(name) == ""
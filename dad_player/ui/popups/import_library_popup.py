@@ -0,0 +1,65 @@
+# dad_player/ui/popups/import_library_popup.py
+import os
+from kivy.uix.popup import Popup
+from kivy.properties import ObjectProperty, StringProperty, NumericProperty, BooleanProperty
+from kivy.lang import Builder
+from kivy.logger import Logger
+from kivy.app import App
+
+from dad_player.constants import IMPORT_EXTENSIONS, SNAPSHOT_EXTENSION
+
+kv_path = os.path.join(os.path.dirname(__file__), "..", "..", "kv", "import_library_popup.kv")
+if os.path.exists(kv_path):
+    Builder.load_file(kv_path)
+else:
+    Logger.error(f"ImportLibraryPopup: KV file not found at {kv_path}")
+
+
+class ImportLibraryPopup(Popup):
+    """
+    Picks an iTunes/Rhythmbox XML export, an M3U playlist or a folder of playlists and imports it,
+    or restores a library snapshot exported from another machine.
+    """
+    library_manager = ObjectProperty(None)
+
+    status_message = StringProperty("Select an iTunes Library.xml, Rhythmbox rhythmdb.xml/playlists.xml, an M3U file, "
+                                    f"a folder of M3U files or a DaD Player library snapshot ({SNAPSHOT_EXTENSION}).")
+    import_progress = NumericProperty(0)
+    is_importing = BooleanProperty(False)
+
+    def __init__(self, library_manager, **kwargs):
+        super().__init__(**kwargs)
+        self.library_manager = library_manager
+        file_chooser_widget = self.ids.get('import_chooser_fc')
+        if file_chooser_widget:
+            file_chooser_widget.path = os.path.expanduser("~")
+
+    def is_importable(self, folder, filename):
+        """FileChooser filter: folders (for M3U collections) and supported export files."""
+        return os.path.isdir(os.path.join(folder, filename)) or filename.lower().endswith(IMPORT_EXTENSIONS + (SNAPSHOT_EXTENSION,))
+
+    def start_import(self):
+        file_chooser_widget = self.ids.get('import_chooser_fc')
+        selected_paths = file_chooser_widget.selection if file_chooser_widget else []
+        path = selected_paths[0] if selected_paths else (file_chooser_widget.path if file_chooser_widget else None)
+        if not path or not self.library_manager:
+            self.status_message = "Select a file or folder to import."
+            return
+        Logger.info(f"ImportLibraryPopup: Importing '{path}'.")
+        if path.lower().endswith(SNAPSHOT_EXTENSION):
+            start = self.library_manager.import_snapshot # Replaces the library
+        else:
+            start = self.library_manager.import_library_export
+        if start(path, progress_callback=self._import_progress_update):
+            self.is_importing = True
+            self.import_progress = 0
+            self.status_message = f"Importing {os.path.basename(path)}..."
+
+    def _import_progress_update(self, progress, message, is_done):
+        self.import_progress = progress
+        self.status_message = message
+        if is_done:
+            self.is_importing = False
+            app = App.get_running_app()
+            if app and hasattr(app, 'refresh_library_view_if_current'):
+                app.refresh_library_view_if_current()
@@ -1,15 +1,12 @@
 # dad_player/ui/popups/manage_folders_popup.py
 import os
 from kivy.uix.popup import Popup
-from kivy.uix.boxlayout import BoxLayout
 from kivy.properties import ObjectProperty, ListProperty, StringProperty
 from kivy.lang import Builder
 from kivy.logger import Logger
 from kivy.uix.filechooser import FileChooserListView
 from kivy.app import App
 
-from dad_player.utils import spx
-
 kv_path = os.path.join(os.path.dirname(__file__), "..", "..", "kv", "manage_folders_popup.kv")
 if os.path.exists(kv_path):
     Builder.load_file(kv_path)
@@ -85,6 +82,7 @@ class ManageFoldersPopup(Popup):
             else:
                 self.status_message = ""
             Logger.info(f"ManageFoldersPopup: Loaded music folders: {folders}")
+        else:
             Logger.error("ManageFoldersPopup: SettingsManager not available.")
             self.status_message = "Error: Settings manager unavailable."
 
@@ -122,10 +120,10 @@ class ManageFoldersPopup(Popup):
             Logger.info(f"ManageFoldersPopup: Folders after add attempt: {updated_folders}")
             
             if success:
-                self.status_message = f"Added: {os.path.basename(folder_path)}"
                 self.load_music_folders()
                 Logger.info(f"ManageFoldersPopup: music_folders_data after adding: {self.music_folders_data}")
-                self._ask_for_rescan("Folder added. Rescan library now?")
+                # The app starts a targeted scan of just this folder (see DadPlayerApp.on_config_change_custom)
+                self.status_message = f"Added: {os.path.basename(folder_path)}. Scanning folder in the background..."
             else:
                 error_message = getattr(self.settings_manager, 'last_error', "Unknown error")
                 self.status_message = f"Could not add: {os.path.basename(folder_path)}. {error_message}"
@@ -137,61 +135,14 @@ class ManageFoldersPopup(Popup):
         """Removes a folder, called from FolderListItem's button."""
         if self.settings_manager:
             if self.settings_manager.remove_music_folder(folder_path_to_remove):
-                self.status_message = f"Removed: {os.path.basename(folder_path_to_remove)}"
                 self.load_music_folders() 
-                self._ask_for_rescan("Folder removed. Rescan library now to reflect changes?")
+                # The app purges the folder's tracks in the background (see DadPlayerApp.on_config_change_custom)
+                self.status_message = f"Removed: {os.path.basename(folder_path_to_remove)}. Removing its tracks from the library..."
             else:
-                self.status_message = f"Folder not found: {os.basename(folder_path_to_remove)}"
+                self.status_message = f"Folder not found: {os.path.basename(folder_path_to_remove)}"
         else:
             self.status_message = "Error: Settings manager unavailable."
             
-    def _ask_for_rescan(self, message):
-        from kivy.uix.button import Button 
-        from kivy.uix.label import Label
-        
-        content = BoxLayout(orientation='vertical', spacing=spx(10), padding=spx(10))
-        content.add_widget(Label(text=message, halign='center', font_size=spx(14)))
-        
-        buttons_layout = BoxLayout(size_hint_y=None, height=spx(40), spacing=spx(10))
-        rescan_button = Button(text="Rescan Now (Full)")
-        no_button = Button(text="Later")
-        
-        buttons_layout.add_widget(rescan_button)
-        buttons_layout.add_widget(no_button)
-        content.add_widget(buttons_layout)
-        
-        confirm_popup = Popup(title="Rescan Library?", content=content, size_hint=(0.7, 0.3), auto_dismiss=False)
-        
-        def _do_rescan(instance):
-            confirm_popup.dismiss()
-            app = App.get_running_app()
-            if app and app.library_manager and not app.library_manager.is_scanning:
-                try:
-                    Logger.info("ManageFoldersPopup: Triggering full rescan via app's LibraryManager.")
-                    if hasattr(app.library_manager, 'start_scan_music_library'):
-                        app.library_manager.start_scan_music_library(
-                            progress_callback=app.scan_progress_update_global,
-                            full_rescan=True
-                        )
-                        self.dismiss()
-                    else:
-                        Logger.error("ManageFoldersPopup: LibraryManager missing start_scan_music_library method.")
-                        self.status_message = "Error: Library scan method not available."
-                except Exception as e:
-                    Logger.error(f"ManageFoldersPopup: Unexpected error during rescan: {e}")
-                    self.status_message = "Error: Could not trigger rescan."
-            elif app and app.library_manager and app.library_manager.is_scanning:
-                Logger.info("ManageFoldersPopup: Scan already in progress (triggered from rescan prompt).")
-                self.status_message = "Scan already in progress."
-            else:
-                Logger.error("ManageFoldersPopup: Could not trigger rescan - App or LibraryManager unavailable.")
-                self.status_message = "Error: Could not trigger rescan."
-
-        rescan_button.bind(on_release=_do_rescan)
-        no_button.bind(on_release=confirm_popup.dismiss)
-        confirm_popup.open()
-
-
     def _simple_scan_status_update(self, progress, message, is_done):
         self.status_message = message
         if is_done:
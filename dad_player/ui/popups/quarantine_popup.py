@@ -0,0 +1,54 @@
+# dad_player/ui/popups/quarantine_popup.py
+import os
+import time
+from kivy.uix.popup import Popup
+from kivy.properties import ObjectProperty, ListProperty, StringProperty
+from kivy.lang import Builder
+from kivy.logger import Logger
+
+kv_path = os.path.join(os.path.dirname(__file__), "..", "..", "kv", "quarantine_popup.kv")
+if os.path.exists(kv_path):
+    Builder.load_file(kv_path)
+else:
+    Logger.error(f"QuarantinePopup: KV file not found at {kv_path}")
+
+
+class QuarantinePopup(Popup):
+    """Lists files the scanner could not parse. They are skipped by scans until they change."""
+    library_manager = ObjectProperty(None)
+
+    quarantined_data = ListProperty([])
+    status_message = StringProperty("")
+
+    def __init__(self, library_manager, **kwargs):
+        super().__init__(**kwargs)
+        self.library_manager = library_manager
+        self.load_quarantined_files()
+
+    def load_quarantined_files(self):
+        if not self.library_manager:
+            Logger.error("QuarantinePopup: LibraryManager not available.")
+            self.status_message = "Error: Library manager unavailable."
+            return
+
+        entries = self.library_manager.get_quarantined_files()
+        self.quarantined_data = [
+            {
+                'path': entry['filepath'],
+                'error_text': entry['error'] or "Unknown error",
+                'failed_at_text': time.strftime("%Y-%m-%d %H:%M", time.localtime(entry['failed_at'])) if entry['failed_at'] else ""
+            } for entry in entries
+        ]
+        self.status_message = f"{len(entries)} unreadable files are skipped until they change." if entries else "No unreadable files."
+
+        quarantine_rv = self.ids.get('quarantine_rv')
+        if quarantine_rv:
+            quarantine_rv.data = self.quarantined_data
+            quarantine_rv.refresh_from_data()
+
+    def retry_all(self):
+        if self.library_manager and self.library_manager.clear_quarantined_files():
+            self.load_quarantined_files()
+            self.status_message = "List cleared. These files will be retried on the next scan."
+        else:
+            self.status_message = "Error: Could not clear the list."
@@ -1,5 +1,6 @@
 # dad_player/ui/popups/settings_popup.py
 import os
+import time
 from kivy.uix.popup import Popup
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
@@ -11,7 +12,7 @@ from kivy.app import App
 
 from dad_player.utils import spx
 from dad_player.constants import (
-    APP_VERSION, REPEAT_NONE, REPEAT_SONG, REPEAT_PLAYLIST, REPEAT_MODES_TEXT
+    APP_VERSION, REPEAT_NONE, REPEAT_SONG, REPEAT_PLAYLIST, REPEAT_MODES_TEXT, SNAPSHOT_EXTENSION
 )
 kv_path = os.path.join(os.path.dirname(__file__), "..", "..", "kv", "settings_popup.kv")
 if os.path.exists(kv_path):
@@ -28,6 +29,8 @@ class PlayerSettingsPopup(Popup):
     # Properties to bind to UI elements in KV
     autoplay_active = BooleanProperty(False)
     shuffle_active = BooleanProperty(False)
+    scan_in_subprocess_active = BooleanProperty(False)
+    database_per_root_active = BooleanProperty(False)
     repeat_mode_text = StringProperty("Repeat: Off")
     current_repeat_mode = NumericProperty(0)
 
@@ -62,6 +65,8 @@ class PlayerSettingsPopup(Popup):
         if self.settings_manager:
             self.autoplay_active = self.settings_manager.get_autoplay()
             self.shuffle_active = self.settings_manager.get_shuffle()
+            self.scan_in_subprocess_active = self.settings_manager.get_scan_in_subprocess()
+            self.database_per_root_active = self.settings_manager.get_database_per_root()
             self.current_repeat_mode = self.settings_manager.get_repeat_mode()
             self.repeat_mode_text = REPEAT_MODES_TEXT.get(self.current_repeat_mode, "Repeat: Unknown")
         else:
@@ -109,6 +114,17 @@ class PlayerSettingsPopup(Popup):
                 self.player_engine.set_shuffle_mode(value)
 
 
+    def on_scan_in_subprocess_active(self, instance, value):
+        if self.settings_manager:
+            self.settings_manager.set_scan_in_subprocess(value)
+            Logger.info(f"SettingsPopup: Scan in separate process set to {value}")
+
+    def on_database_per_root_active(self, instance, value):
+        if self.settings_manager:
+            self.settings_manager.set_database_per_root(value)
+            Logger.info(f"SettingsPopup: Database per music folder set to {value}")
+
+
     def cycle_repeat_mode(self):
         if self.settings_manager:
             new_mode = (self.current_repeat_mode + 1) % 3 
@@ -135,6 +151,37 @@ class PlayerSettingsPopup(Popup):
         else:
             Logger.error("SettingsPopup: Cannot open Manage Folders, core components missing.")
 
+    def open_quarantine_popup(self):
+        Logger.info("SettingsPopup: Opening Unreadable Files Popup.")
+        from .quarantine_popup import QuarantinePopup
+
+        if self.library_manager:
+            QuarantinePopup(library_manager=self.library_manager).open()
+        else:
+            Logger.error("SettingsPopup: Cannot open Unreadable Files, LibraryManager missing.")
+
+    def open_import_library_popup(self):
+        Logger.info("SettingsPopup: Opening Import Library Popup.")
+        from .import_library_popup import ImportLibraryPopup
+
+        if self.library_manager:
+            ImportLibraryPopup(library_manager=self.library_manager).open()
+        else:
+            Logger.error("SettingsPopup: Cannot open Import Library, LibraryManager missing.")
+
+    def export_library_snapshot(self):
+        """Exports the library to a snapshot file in the home folder, to import on another machine."""
+        if not self.library_manager:
+            Logger.error("SettingsPopup: Cannot export, LibraryManager missing.")
+            return
+        dest_path = os.path.join(os.path.expanduser("~"), f"DaD_Player_Library_{time.strftime('%Y%m%d-%H%M%S')}{SNAPSHOT_EXTENSION}")
+        Logger.info(f"SettingsPopup: Exporting library snapshot to {dest_path}.")
+        if self.library_manager.export_snapshot(dest_path, progress_callback=self._snapshot_export_progress):
+            self.scan_status_text = "Exporting library snapshot..."
+
+    def _snapshot_export_progress(self, progress, message, is_done):
+        self.scan_status_text = message
+
     def start_library_scan(self, full_rescan=False):
         if self.library_manager and not self.library_manager.is_scanning:
             self.scan_status_text = "Scan starting..."
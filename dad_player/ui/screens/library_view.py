@@ -8,6 +8,7 @@ from kivy.clock import Clock
 from kivy.app import App
 from dad_player.utils import format_duration, dp, sp
 from dad_player.core.image_utils import get_placeholder_album_art_path
+from dad_player.constants import SEARCH_DEBOUNCE_SECONDS, BROWSE_PREFETCH_SCROLL, ALBUM_SORT_NAME, ALBUM_SORT_TEXT
 
 KV_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "kv", "library_view.kv")
 if os.path.exists(KV_FILE):
@@ -20,6 +21,11 @@ from dad_player.ui.widgets.artist_list_item import ArtistListItem
 from dad_player.ui.widgets.album_grid_item import AlbumGridItem
 from dad_player.ui.widgets.song_list_item import SongListItem
 
+# Browse-by list modes and the album field each one filters on
+FACET_LIST_KINDS = {"genres": "genre", "years": "year", "decades": "decade"}
+FACET_LIST_MODES = {kind: mode for mode, kind in FACET_LIST_KINDS.items()}
+FACET_LIST_TITLES = {"genres": "Genres", "years": "Years", "decades": "Decades"}
+
 
 class LibraryView(BoxLayout):
     player_engine = ObjectProperty(None)
@@ -29,14 +35,21 @@ class LibraryView(BoxLayout):
     artists_data = ListProperty([])
     albums_data = ListProperty([])
     songs_data = ListProperty([])
+    facets_data = ListProperty([]) # Genres, years or decades
 
     current_view_mode = StringProperty("all_albums")
     current_artist_id = NumericProperty(None, allownone=True)
     current_artist_name = StringProperty("")
     current_album_id = NumericProperty(None, allownone=True)
     current_album_name = StringProperty("")
+    current_facet_kind = StringProperty("") # "genre", "year" or "decade" while browsing by one
+    current_facet_value = ObjectProperty(None, allownone=True)
+
+    search_query = StringProperty("")
+    album_sort = StringProperty(ALBUM_SORT_NAME) # Order of the album grids, one of ALBUM_SORT_TEXT's keys
 
     status_text = StringProperty("Loading library...")
+    is_loading = BooleanProperty(False) # A library query for the current view is in flight
     _was_scanning = BooleanProperty(False)
     _display_path_text = StringProperty("All Albums")
 
@@ -45,6 +58,17 @@ class LibraryView(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._placeholder_art = None
+        self._mode_before_search = "all_albums"
+        self._search_trigger = Clock.create_trigger(self._run_search, SEARCH_DEBOUNCE_SECONDS)
+        # Keyset paging state for the artists/albums lists (see _load_next_page)
+        self._page_kind = None
+        self._page_artist_id = None
+        self._page_artist_name = ""
+        self._page_filters = {} # genre/year/decade keyword arguments for get_albums_page
+        self._page_cursor = None
+        self._has_more_pages = False
+        self._next_page_trigger = Clock.create_trigger(self._load_next_page)
+        self._pending_query = None # QueryRequest whose result the current view is waiting for
         Logger.info("LibraryView [INIT]: Initializing LibraryView.")
 
         Clock.schedule_once(self._post_init_setup, 0.1)
@@ -117,6 +141,12 @@ class LibraryView(BoxLayout):
             self._display_path_text = "All Artists"
         elif self.current_view_mode == 'all_albums': # Default view
             self._display_path_text = "All Albums"
+        elif self.current_view_mode == 'search_results':
+            self._display_path_text = f'Search: "{self.search_query}"'
+        elif self.current_view_mode in FACET_LIST_TITLES:
+            self._display_path_text = FACET_LIST_TITLES[self.current_view_mode]
+        elif self.current_view_mode == 'albums_for_facet':
+            self._display_path_text = self._facet_label(self.current_facet_kind, self.current_facet_value)
         else:
             self._display_path_text = "Library" # Fallback
         Logger.debug(f"LibraryView [_update_display_path_text]: Display path set to: '{self._display_path_text}' (Mode: {self.current_view_mode})")
@@ -146,9 +176,18 @@ class LibraryView(BoxLayout):
             self._placeholder_art = get_placeholder_album_art_path(icons_dir)
             Logger.warning(f"LibraryView [_post_init_setup]: Using fallback placeholder art path logic for icons_dir. Path: {self._placeholder_art}")
 
+        for rv_id in ('albums_rv', 'artists_rv'):
+            rv = self.ids.get(rv_id)
+            if rv:
+                rv.bind(scroll_y=self._on_browse_scroll)
+
+        if self.settings_manager:
+            self.album_sort = self.settings_manager.get_album_sort()
+
         if self.library_manager:
             self._was_scanning = self.library_manager.is_scanning # Store initial state
-            self.library_manager.bind(is_scanning=self.on_library_manager_scanning_change)
+            self.library_manager.bind(is_scanning=self.on_library_manager_scanning_change,
+                                      on_library_changed=self.on_library_manager_library_changed)
             # Logger.info("LibraryView [_post_init_setup]: Bound to LibraryManager.is_scanning.")
         else:
             Logger.error("LibraryView [_post_init_setup]: LibraryManager NOT AVAILABLE for binding.")
@@ -160,16 +199,20 @@ class LibraryView(BoxLayout):
 
         # Initial status message based on library content
         if self.library_manager and self.settings_manager:
-            albums_exist = self.library_manager.get_albums_by_artist(artist_id=None) # Check if any albums exist at all
-            folders_set = self.settings_manager.get_music_folders()
-            if not albums_exist and folders_set:
-                self.status_text = "Library is empty. Consider scanning in Settings."
-            elif not folders_set:
-                self.status_text = "No music folders configured. Please add folders in Settings."
+            # Not through _query, which would supersede the album load started above
+            self.library_manager.query_async(self.library_manager.get_library_stats, on_result=self._show_initial_status)
         elif not self.library_manager:
             self.status_text = "Library manager unavailable."
         Logger.info("LibraryView [_post_init_setup]: Post-init setup finished.")
 
+    def _show_initial_status(self, stats):
+        library_empty = stats["album_count"] == 0 # Maintained counter, no table scan
+        folders_set = self.settings_manager.get_music_folders()
+        if library_empty and folders_set:
+            self.status_text = "Library is empty. Consider scanning in Settings."
+        elif not folders_set:
+            self.status_text = "No music folders configured. Please add folders in Settings."
+
 
     def on_library_manager_scanning_change(self, instance, current_is_scanning_value):
         Logger.info(f"LibraryView [on_library_manager_scanning_change]: Scanning state changed from {self._was_scanning} to {current_is_scanning_value}")
@@ -178,6 +221,11 @@ class LibraryView(BoxLayout):
             Clock.schedule_once(lambda dt: self.refresh_library_view(), 0.2)
         self._was_scanning = current_is_scanning_value # Update the tracking state
 
+    def on_library_manager_library_changed(self, instance, changes):
+        if changes.get('reload'): # e.g. a snapshot import; the ids the current view was showing are gone
+            Logger.info("LibraryView [on_library_manager_library_changed]: Library replaced. Reloading all albums.")
+            self.load_all_albums()
+
     def refresh_library_view(self):
         """Refreshes the content of the currently active library view."""
         Logger.info(f"LibraryView [refresh_library_view]: Refreshing view. Mode: {self.current_view_mode}, ArtistID: {self.current_artist_id}, AlbumID: {self.current_album_id}")
@@ -194,6 +242,12 @@ class LibraryView(BoxLayout):
             else: # Fallback if context was lost
                 Logger.warning("LibraryView [refresh_library_view]: 'albums_for_artist' mode but current_artist_id is None. Defaulting to all_albums.")
                 self.load_all_albums()
+        elif current_mode_before_refresh == "search_results":
+            self._run_search()
+        elif current_mode_before_refresh in FACET_LIST_TITLES:
+            self.load_facets(FACET_LIST_KINDS[current_mode_before_refresh])
+        elif current_mode_before_refresh == "albums_for_facet":
+            self.load_albums_for_facet(self.current_facet_kind, self.current_facet_value)
         elif current_mode_before_refresh == "songs_for_album":
             if self.current_album_id is not None:
                 self.load_songs_for_album(self.current_album_id, self.current_album_name)
@@ -214,6 +268,8 @@ class LibraryView(BoxLayout):
             return lambda *args: self.on_album_selected(item_id, item_name_or_title)
         elif item_type == "song":
             return lambda *args: self.on_song_selected(item_id, item_name_or_title)
+        elif item_type in FACET_LIST_KINDS.values():
+            return lambda *args: self.load_albums_for_facet(item_type, item_id)
         return None # Should not happen if item_type is always valid
 
     def load_all_albums(self):
@@ -223,6 +279,8 @@ class LibraryView(BoxLayout):
         self.current_artist_name = ""
         self.current_album_id = None
         self.current_album_name = ""
+        self.current_facet_kind = ""
+        self.current_facet_value = None
         self.albums_data = [] # Clear previous data
 
         if not self.library_manager:
@@ -232,22 +290,7 @@ class LibraryView(BoxLayout):
             self._update_display_path_text() # Update breadcrumb
             return
 
-        all_albums_from_db = self.library_manager.get_albums_by_artist(artist_id=None)
-        if all_albums_from_db:
-            temp_albums_data = [
-                {
-                    'album_id': album['id'],
-                    'album_name': album['name'], # Should always exist
-                    'artist_name': album.get('artist_name', 'Unknown Artist'), # Handle if artist_name is missing
-                    'art_path': album.get('art_path') or self._placeholder_art, # Use placeholder if art_path missing/None
-                    'on_press_callback': self._create_press_action("album", album['id'], album['name'])
-                } for album in all_albums_from_db
-            ]
-            self.albums_data = temp_albums_data
-            # Logger.debug(f"LibraryView [load_all_albums]: Loaded {len(self.albums_data)} albums.")
-        # else:
-            # Logger.info("LibraryView [load_all_albums]: No albums found in the database.")
-        self.update_status_and_recycleview_refresh('albums_rv')
+        self._start_paging("albums")
         self._update_display_path_text() # Update breadcrumb
 
 
@@ -258,6 +301,8 @@ class LibraryView(BoxLayout):
         self.current_artist_name = ""
         self.current_album_id = None
         self.current_album_name = ""
+        self.current_facet_kind = ""
+        self.current_facet_value = None
         self.artists_data = [] # Clear previous
 
         if not self.library_manager:
@@ -267,20 +312,7 @@ class LibraryView(BoxLayout):
             self._update_display_path_text()
             return
 
-        artists_from_db = self.library_manager.get_all_artists()
-        if artists_from_db:
-            temp_artists_data = [
-                {
-                    'artist_id': artist['id'],
-                    'artist_name': artist['name'], # Should always exist
-                    'on_press_callback': self._create_press_action("artist", artist['id'], artist['name'])
-                } for artist in artists_from_db
-            ]
-            self.artists_data = temp_artists_data
-            # Logger.debug(f"LibraryView [load_artists]: Loaded {len(self.artists_data)} artists.")
-        # else:
-            # Logger.info("LibraryView [load_artists]: No artists found in the database.")
-        self.update_status_and_recycleview_refresh('artists_rv')
+        self._start_paging("artists")
         self._update_display_path_text()
 
     def load_albums_for_artist(self, artist_id, artist_name):
@@ -290,6 +322,8 @@ class LibraryView(BoxLayout):
         self.current_artist_name = artist_name
         self.current_album_id = None # Reset deeper context
         self.current_album_name = ""
+        self.current_facet_kind = ""
+        self.current_facet_value = None
         self.albums_data = [] # Clear previous
 
         if not self.library_manager:
@@ -299,19 +333,76 @@ class LibraryView(BoxLayout):
             self._update_display_path_text()
             return
 
-        albums_from_db = self.library_manager.get_albums_by_artist(artist_id)
-        if albums_from_db:
-            temp_albums_data = [
-                {
-                    'album_id': album['id'],
-                    'album_name': album['name'],
-                    'artist_name': album.get('artist_name', artist_name), # Fallback to passed artist_name if DB is missing it
-                    'art_path': album.get('art_path') or self._placeholder_art,
-                    'on_press_callback': self._create_press_action("album", album['id'], album['name'])
-                } for album in albums_from_db
-            ]
-            self.albums_data = temp_albums_data
-        self.update_status_and_recycleview_refresh('albums_rv')
+        self._start_paging("albums", artist_id=artist_id, artist_name=artist_name)
+        self._update_display_path_text()
+
+    # --- Genre, year and decade browsing ---
+    @staticmethod
+    def _facet_label(kind, value):
+        if kind == "decade":
+            return f"{value}s"
+        if kind == "year":
+            return f"Year: {value}"
+        return f"Genre: {value}"
+
+    def load_facets(self, kind):
+        """Lists genres, years or decades with their album and track counts."""
+        Logger.info(f"LibraryView [load_facets]: Loading {kind} list...")
+        self.current_view_mode = FACET_LIST_MODES[kind]
+        self.current_artist_id = None
+        self.current_artist_name = ""
+        self.current_album_id = None
+        self.current_album_name = ""
+        self.current_facet_kind = kind
+        self.current_facet_value = None
+        self.facets_data = []
+
+        if not self.library_manager:
+            Logger.error("LibraryView [load_facets]: LibraryManager is None.")
+            self.status_text = "Error: Library manager not available."
+            self.update_status_and_recycleview_refresh('facets_rv')
+            self._update_display_path_text()
+            return
+
+        fetch = {"genre": self.library_manager.get_genres, "year": self.library_manager.get_years,
+                 "decade": self.library_manager.get_decades}[kind]
+        self._next_page_trigger.cancel()
+        self._has_more_pages = False
+        self._query(fetch, on_result=lambda rows: self._on_facets_loaded(kind, rows))
+        self._update_display_path_text()
+
+    def _on_facets_loaded(self, kind, rows):
+        value_key = "name" if kind == "genre" else kind
+        self.facets_data = [
+            {
+                'artist_id': None,
+                'artist_name': f"{row[value_key]}{'s' if kind == 'decade' else ''}"
+                               f"  ·  {row['album_count']} album{'' if row['album_count'] == 1 else 's'}, "
+                               f"{row['track_count']} track{'' if row['track_count'] == 1 else 's'}",
+                'on_press_callback': self._create_press_action(kind, row[value_key], None)
+            } for row in rows
+        ]
+        self.update_status_and_recycleview_refresh('facets_rv')
+
+    def load_albums_for_facet(self, kind, value):
+        Logger.info(f"LibraryView [load_albums_for_facet]: {kind} = {value!r}.")
+        self.current_view_mode = "albums_for_facet"
+        self.current_artist_id = None
+        self.current_artist_name = ""
+        self.current_album_id = None
+        self.current_album_name = ""
+        self.current_facet_kind = kind
+        self.current_facet_value = value
+        self.albums_data = []
+
+        if not self.library_manager:
+            Logger.error("LibraryView [load_albums_for_facet]: LibraryManager is None.")
+            self.status_text = "Error: Library manager not available."
+            self.update_status_and_recycleview_refresh('albums_rv')
+            self._update_display_path_text()
+            return
+
+        self._start_paging("albums", filters={kind: value})
         self._update_display_path_text()
 
     def load_songs_for_album(self, album_id, album_name):
@@ -323,9 +414,6 @@ class LibraryView(BoxLayout):
         self.current_album_name = album_name
         self.songs_data = [] # Clear previous
 
-        album_art_for_list = self._placeholder_art # Default
-        target_album_info = None # To store details of the current album
-
         if not self.library_manager:
             Logger.error(f"LibraryView [load_songs_for_album]: LibraryManager is None. Cannot load songs.")
             self.status_text = "Error: Library manager not available."
@@ -333,21 +421,21 @@ class LibraryView(BoxLayout):
             self._update_display_path_text()
             return
 
-        if self.library_manager:
-            all_albums_from_db = self.library_manager.get_albums_by_artist(artist_id=None) # Get all albums to find the current one
-            if all_albums_from_db: # Check if the list is not empty
-                target_album_info = next((album_dict for album_dict in all_albums_from_db if album_dict['id'] == album_id), None)
-                if target_album_info: # Found the album
-                    Logger.info(f"LibraryView: Found target_album_info for Album ID {album_id}: {target_album_info}")
-                    if target_album_info.get('art_path'):
-                        album_art_for_list = target_album_info['art_path']
-                        Logger.info(f"LibraryView: Using specific art_path '{album_art_for_list}' for Album ID {album_id}.")
-                    else:
-                        Logger.warning(f"LibraryView: No 'art_path' in target_album_info for Album ID {album_id}. Using placeholder: {self._placeholder_art}")
-                else:
-                    Logger.warning(f"LibraryView: Could not find target_album_info for Album ID {album_id} in all_albums_from_db. Using placeholder art and hoping for the best for artist name.")
-            else: # No albums returned at all
-                Logger.warning(f"LibraryView: Could not fetch any albums from DB to find details for Album ID {album_id}. Using placeholder art.")
+        self._query(self.library_manager.get_album_detail, album_id,
+                    on_result=lambda album: self._on_album_songs_loaded(album_id, album, album["tracks"] if album else []))
+        self._update_display_path_text()
+
+    def _on_album_songs_loaded(self, album_id, target_album_info, tracks):
+        album_art_for_list = self._placeholder_art # Default
+        if target_album_info: # Found the album
+            Logger.info(f"LibraryView: Found target_album_info for Album ID {album_id}: {target_album_info}")
+            if target_album_info.get('art_path'):
+                album_art_for_list = target_album_info['art_path']
+                Logger.info(f"LibraryView: Using specific art_path '{album_art_for_list}' for Album ID {album_id}.")
+            else:
+                Logger.warning(f"LibraryView: No 'art_path' in target_album_info for Album ID {album_id}. Using placeholder: {self._placeholder_art}")
+        else:
+            Logger.warning(f"LibraryView: Could not find target_album_info for Album ID {album_id}. Using placeholder art and hoping for the best for artist name.")
         
         # Determine the primary artist for this album
         album_primary_artist_name = "Unknown Artist" # Default
@@ -365,8 +453,6 @@ class LibraryView(BoxLayout):
         else:
             Logger.info(f"LibraryView: album_primary_artist_name defaulted/remained 'Unknown Artist'. target_album_info_artist: {target_album_info.get('artist_name') if target_album_info else 'N/A'}, self.current_artist_name: {self.current_artist_name}")
 
-
-        tracks = self.library_manager.get_tracks_by_album(album_id)
         if tracks:
             temp_songs_data = []
             for i, track in enumerate(tracks):
@@ -413,10 +499,190 @@ class LibraryView(BoxLayout):
         self._update_display_path_text()
 
 
+    # --- Background library queries ---
+    def _query(self, fn, *args, on_result, **kwargs):
+        """
+        Runs a LibraryManager read on its query thread and hands the result to on_result on the
+        main thread. Only one query is pending per view; starting another supersedes it.
+        """
+        self._cancel_pending_query()
+        self.is_loading = True
+        self.update_status_text()
+
+        def finish(result):
+            self._pending_query = None
+            self.is_loading = False
+            on_result(result)
+
+        def fail(error):
+            self._pending_query = None
+            self.is_loading = False
+            self.status_text = "Error: Could not read the library."
+
+        self._pending_query = self.library_manager.query_async(fn, *args, on_result=finish, on_error=fail, **kwargs)
+
+    def _cancel_pending_query(self):
+        if self._pending_query:
+            self._pending_query.cancel()
+            self._pending_query = None
+        self.is_loading = False
+
+    # --- Lazy paging of the artists/albums lists ---
+    def _start_paging(self, kind, artist_id=None, artist_name="", filters=None):
+        """Loads the first page of artists or albums; later pages load as the list is scrolled."""
+        self._page_kind = kind
+        self._page_artist_id = artist_id
+        self._page_artist_name = artist_name
+        self._page_filters = filters or {}
+        self._page_cursor = None
+        self._has_more_pages = True
+        self._next_page_trigger.cancel()
+        self._cancel_pending_query()
+        self._load_next_page()
+
+    def _page_items(self, rows):
+        if self._page_kind == "artists":
+            return [
+                {
+                    'artist_id': artist['id'],
+                    'artist_name': artist['name'], # Should always exist
+                    'on_press_callback': self._create_press_action("artist", artist['id'], artist['name'])
+                } for artist in rows
+            ]
+        return [
+            {
+                'album_id': album['id'],
+                'album_name': album['name'], # Should always exist
+                'artist_name': album.get('artist_name') or self._page_artist_name or 'Unknown Artist',
+                'art_path': album.get('art_path') or self._placeholder_art, # Use placeholder if art_path missing/None
+                'details_text': self._album_details_text(album),
+                'on_press_callback': self._create_press_action("album", album['id'], album['name'])
+            } for album in rows
+        ]
+
+    @staticmethod
+    def _album_details_text(album):
+        parts = []
+        if album.get('year'):
+            parts.append(str(album['year']))
+        track_count = album.get('track_count') or 0
+        parts.append(f"{track_count} track{'' if track_count == 1 else 's'}")
+        if album.get('total_duration'):
+            parts.append(format_duration(album['total_duration']))
+        return " · ".join(parts)
+
+    def _load_next_page(self, dt=None):
+        if not self._has_more_pages or not self.library_manager or self._pending_query:
+            return
+        first_page = self._page_cursor is None
+        if self._page_kind == "artists":
+            self._query(self.library_manager.get_artists_page, after=self._page_cursor,
+                        on_result=lambda result: self._on_page_loaded(first_page, result))
+        else:
+            # Genre, year and decade grids keep their own order, which their indexes serve directly
+            sort = None if self._page_filters else self.album_sort
+            self._query(self.library_manager.get_albums_page, artist_id=self._page_artist_id, after=self._page_cursor,
+                        sort=sort, on_result=lambda result: self._on_page_loaded(first_page, result),
+                        **self._page_filters)
+
+    def _on_page_loaded(self, first_page, result):
+        rows, self._page_cursor = result
+        self._has_more_pages = self._page_cursor is not None
+        Logger.debug(f"LibraryView [_on_page_loaded]: {len(rows)} {self._page_kind} loaded (more: {self._has_more_pages}).")
+        rv_id, data = ('artists_rv', self.artists_data) if self._page_kind == "artists" else ('albums_rv', self.albums_data)
+
+        if first_page:
+            data[:] = self._page_items(rows)
+            self.update_status_and_recycleview_refresh(rv_id)
+            return
+        rv = self.ids.get(rv_id)
+        distance_from_top = self._scroll_distance_from_top(rv)
+        data.extend(self._page_items(rows))
+        self.update_status_and_recycleview_refresh(rv_id)
+        # scroll_y is relative to the content height, so keep the rows on screen where they were
+        Clock.schedule_once(lambda dt: self._restore_scroll_distance_from_top(rv, distance_from_top))
+
+    @staticmethod
+    def _scroll_distance_from_top(rv):
+        if not rv or not rv.layout_manager:
+            return 0
+        return (1 - rv.scroll_y) * max(rv.layout_manager.height - rv.height, 0)
+
+    @staticmethod
+    def _restore_scroll_distance_from_top(rv, distance_from_top):
+        if not rv or not rv.layout_manager:
+            return
+        scrollable = rv.layout_manager.height - rv.height
+        if scrollable > 0:
+            rv.scroll_y = max(0.0, min(1.0, 1 - distance_from_top / scrollable))
+
+    def _on_browse_scroll(self, rv, scroll_y):
+        if scroll_y > BROWSE_PREFETCH_SCROLL or not self._has_more_pages:
+            return
+        paged_rv = self.ids.get(  # ids holds weak proxies, so compare with ==
+            'artists_rv' if self._page_kind == "artists" else 'albums_rv')
+        if rv == paged_rv and self.current_view_mode in ('artists', 'all_albums', 'albums_for_artist', 'albums_for_facet'):
+            self._next_page_trigger()
+
+    # --- Search ---
+    def on_search_text(self, text):
+        """Bound to the search field. Restarts the debounce timer on every keystroke."""
+        self.search_query = text.strip()
+        self._search_trigger.cancel()
+        if self.search_query:
+            self._search_trigger()
+        elif self.current_view_mode == "search_results":
+            self.clear_search()
+
+    def _run_search(self, dt=None):
+        if not self.library_manager or not self.search_query:
+            return
+        if self.current_view_mode != "search_results":
+            self._mode_before_search = self.current_view_mode
+        self.status_text = "Searching..."
+        self.library_manager.search_async(self.search_query, self._on_search_results)
+
+    def _on_search_results(self, query, results):
+        if query != self.search_query:
+            return # The field changed again; a newer search is on its way
+        self._cancel_pending_query() # Don't let a browse result land on top of the search results
+        self.current_view_mode = "search_results"
+        self.songs_data = [
+            {
+                'track_id': track['id'],
+                'song_title_text': track.get('title') or os.path.basename(track['filepath']),
+                'track_number_text': "",
+                'artist_name_text': " - ".join(name for name in (track.get('artist_name'), track.get('album_name')) if name),
+                'duration_text': format_duration(track.get('duration') or 0),
+                'art_path': self._placeholder_art,
+                'on_press_callback': self._create_press_action("song", track['id'], track.get('title')),
+                'filepath': track.get('filepath')
+            } for track in results
+        ]
+        self.update_status_and_recycleview_refresh('songs_rv')
+        self._update_display_path_text()
+
+    def clear_search(self):
+        self._search_trigger.cancel()
+        self.search_query = ""
+        search_input = self.ids.get('library_search_input')
+        if search_input and search_input.text:
+            search_input.text = ""
+        if self.current_view_mode == "search_results":
+            self.current_view_mode = self._mode_before_search
+            self.refresh_library_view()
+
     def update_status_text(self):
         """Updates the status_text based on current view and data."""
+        current_data = {
+            "all_albums": self.albums_data, "albums_for_artist": self.albums_data, "artists": self.artists_data,
+            "songs_for_album": self.songs_data, "search_results": self.songs_data, "albums_for_facet": self.albums_data,
+            "genres": self.facets_data, "years": self.facets_data, "decades": self.facets_data
+        }.get(self.current_view_mode)
         # Check if data lists are empty for the current view mode
-        if self.current_view_mode == "all_albums" and not self.albums_data:
+        if self.is_loading and not current_data:
+            self.status_text = "Loading..."
+        elif self.current_view_mode == "all_albums" and not self.albums_data:
             self.status_text = "No albums found. Scan your library in Settings."
         elif self.current_view_mode == "artists" and not self.artists_data:
             self.status_text = "No artists found. Scan your library in Settings."
@@ -426,9 +692,16 @@ class LibraryView(BoxLayout):
         elif self.current_view_mode == "songs_for_album" and not self.songs_data:
             # Only show "No songs for album" if an album is actually selected
             self.status_text = f"No songs found in {self.current_album_name}." if self.current_album_name else "No songs found."
-        elif (self.albums_data and self.current_view_mode in ["all_albums", "albums_for_artist"]) or \
+        elif self.current_view_mode == "search_results" and not self.songs_data:
+            self.status_text = f'No matches for "{self.search_query}".'
+        elif self.current_view_mode in FACET_LIST_TITLES and not self.facets_data:
+            self.status_text = f"No {FACET_LIST_TITLES[self.current_view_mode].lower()} found. Tag your music and rescan."
+        elif self.current_view_mode == "albums_for_facet" and not self.albums_data:
+            self.status_text = f"No albums found for {self._facet_label(self.current_facet_kind, self.current_facet_value)}."
+        elif (self.albums_data and self.current_view_mode in ["all_albums", "albums_for_artist", "albums_for_facet"]) or \
              (self.artists_data and self.current_view_mode == "artists") or \
-             (self.songs_data and self.current_view_mode == "songs_for_album"):
+             (self.facets_data and self.current_view_mode in FACET_LIST_TITLES) or \
+             (self.songs_data and self.current_view_mode in ["songs_for_album", "search_results"]):
              self.status_text = "" # Clear status if data is present for the current view
         # else: # If none of the above, could be an initial state or undefined view mode
             # self.status_text = "Loading..." # Or some other generic message
@@ -452,10 +725,13 @@ class LibraryView(BoxLayout):
         if self.current_view_mode == 'artists':
             actual_rv_id_to_use = 'artists_rv'
             data_to_assign = self.artists_data
-        elif self.current_view_mode == 'all_albums' or self.current_view_mode == 'albums_for_artist':
+        elif self.current_view_mode in ('all_albums', 'albums_for_artist', 'albums_for_facet'):
             actual_rv_id_to_use = 'albums_rv'
             data_to_assign = self.albums_data
-        elif self.current_view_mode == 'songs_for_album':
+        elif self.current_view_mode in FACET_LIST_TITLES:
+            actual_rv_id_to_use = 'facets_rv'
+            data_to_assign = self.facets_data
+        elif self.current_view_mode in ('songs_for_album', 'search_results'):
             actual_rv_id_to_use = 'songs_rv' # Corrected from songs_rv_data
             data_to_assign = self.songs_data
         # else: No RV to update for other modes or if mode is not set
@@ -497,12 +773,20 @@ class LibraryView(BoxLayout):
             Logger.error("LibraryView [on_song_selected]: PlayerEngine or LibraryManager not available.")
             return
 
-        filepath = self.library_manager.get_track_filepath(track_id)
+        # The listed rows normally carry the path already; otherwise it is looked up off the main thread
+        filepath = next((song.get('filepath') for song in self.songs_data if song.get('track_id') == track_id), None)
+        if filepath:
+            self._play_selected_song(track_id, filepath)
+        else:
+            self.library_manager.query_async(self.library_manager.get_track_filepath, track_id,
+                                             on_result=lambda path: self._play_selected_song(track_id, path))
+
+    def _play_selected_song(self, track_id, filepath):
         if not filepath:
             Logger.error(f"LibraryView [on_song_selected]: Filepath not found for track ID {track_id}")
             return
 
-        if self.current_view_mode == "songs_for_album" and self.songs_data:
+        if self.current_view_mode in ("songs_for_album", "search_results") and self.songs_data:
             all_filepaths_in_album = [s['filepath'] for s in self.songs_data if 'filepath' in s and s.get('filepath')]
             if not all_filepaths_in_album:
                 Logger.warning("LibraryView [on_song_selected]: songs_data present, but no filepaths found. Playing selected song only.")
@@ -541,10 +825,15 @@ class LibraryView(BoxLayout):
 
     def go_back_library_navigation(self):
         Logger.info(f"LibraryView [go_back_library_navigation]: Back. Current mode: {self.current_view_mode}, Artist ID: {self.current_artist_id}, Album ID: {self.current_album_id}")
+        if self.current_view_mode == "search_results":
+            self.clear_search()
+            return
         if self.current_view_mode == "songs_for_album":
             if self.current_artist_id is not None and self.current_artist_name:
                 self.current_view_mode = "albums_for_artist"
                 self.load_albums_for_artist(self.current_artist_id, self.current_artist_name)
+            elif self.current_facet_kind and self.current_facet_value is not None:
+                self.load_albums_for_facet(self.current_facet_kind, self.current_facet_value)
             else:
                 self.current_view_mode = "all_albums"
                 self.load_all_albums()
@@ -552,6 +841,9 @@ class LibraryView(BoxLayout):
             # From an artist's album list, back goes to the list of all artists.
             self.current_view_mode = "artists"
             self.load_artists()
+        elif self.current_view_mode == "albums_for_facet":
+            # From a genre's, year's or decade's albums, back goes to the list they were picked from.
+            self.load_facets(self.current_facet_kind)
         elif self.current_view_mode == "artists":
             # From all artists, back goes to all albums.
             self.current_view_mode = "all_albums"
@@ -587,3 +879,16 @@ class LibraryView(BoxLayout):
         self.load_all_albums()
         self._update_display_path_text()
 
+    def cycle_album_sort(self):
+        """Switches the album and artist album grids to the next sort order and reloads the one on screen."""
+        sort_orders = list(ALBUM_SORT_TEXT)
+        self.album_sort = sort_orders[(sort_orders.index(self.album_sort) + 1) % len(sort_orders)]
+        Logger.info(f"LibraryView [cycle_album_sort]: Albums now sorted by {self.album_sort}.")
+        if self.settings_manager:
+            self.settings_manager.set_album_sort(self.album_sort)
+        if self.current_view_mode in ('all_albums', 'albums_for_artist'):
+            self.refresh_library_view()
+
+    def show_facets(self, kind):
+        Logger.info(f"LibraryView [show_facets]: Navigating to browse by {kind}.")
+        self.load_facets(kind)
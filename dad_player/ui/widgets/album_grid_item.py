@@ -11,6 +11,7 @@ class AlbumGridItem(BoxLayout):
     album_id = NumericProperty(None)
     album_name = StringProperty("Unknown Album")
     artist_name = StringProperty("Unknown Artist")
+    details_text = StringProperty("") # e.g. "1997 · 12 tracks · 48:10"
     art_path = StringProperty(None)
     on_press_callback = ObjectProperty(None)
 
@@ -6,13 +6,14 @@ import re
 
 from kivy.logger import Logger
 from kivy.metrics import sp, dp
-from kivy.core.window import Window
 
 DEFAULT_DENSITY_FALLBACK = 1.0
 SPX_DEBUG_LOGGING = True
 
 def spx(value_in_pixels):
     global SPX_DEBUG_LOGGING
+    # Imported here so non-UI processes (e.g. the library scanner process) can use utils without opening a window.
+    from kivy.core.window import Window
     try:
         if Window and hasattr(Window, 'density') and Window.density > 0:
             scaled_value = value_in_pixels * (DEFAULT_DENSITY_FALLBACK / Window.density)